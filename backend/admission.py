@@ -0,0 +1,176 @@
+import asyncio
+import collections
+import math
+import time
+from starlette.responses import JSONResponse
+import metrics, auth_utils
+from database import settings
+
+# Admission control in front of the database pool.
+#
+# 1. Per-client token buckets: RATE_LIMIT_PER_SECOND sustained with bursts
+#    of RATE_LIMIT_BURST (off unless RATE_LIMIT_PER_SECOND is set). The key
+#    is the user behind the bearer token when auth_utils has already
+#    verified and cached it, else the client address, so neither a forged
+#    token nor a fresh one per request gets its own bucket. No JWT is
+#    decoded here. An empty bucket gets an immediate 429.
+# 2. A global concurrency limit sized to the pool (pool_size + max_overflow
+#    unless ADMISSION_CONCURRENCY says otherwise). Requests beyond it wait
+#    in a FIFO queue of at most ADMISSION_QUEUE_SIZE for up to
+#    ADMISSION_QUEUE_TIMEOUT_SECONDS, then get a 503. Waiting here instead
+#    of on the pool keeps the pool's own timeout out of the picture and
+#    sheds load before any work is done.
+#
+# Both are per process. The slot is held until the response body is fully
+# sent, so streaming exports count against it; the SSE stream releases its
+# session straight away and is only rate limited.
+
+UNLIMITED_PATHS = {"/metrics", "/docs", "/redoc", "/openapi.json"}
+UNQUEUED_PATHS = {"/analytics/stream"}
+
+shed = metrics.registry.add(metrics.Counter("admission_shed_total", "Requests rejected by admission control, by reason"))
+queue_wait = metrics.registry.add(metrics.Histogram("admission_queue_wait_seconds", "Time admitted requests waited for a slot"))
+
+class Shed(Exception):
+    def __init__(self, reason: str, status_code: int, retry_after: int, detail: str):
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+class TokenBuckets:
+    def __init__(self, rate: float, burst: int, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = {}   # key -> [tokens, last refill (monotonic)]
+
+    def take(self, key: str):
+        # Returns 0 when admitted, else the seconds until a token is available
+        if self.rate <= 0:
+            return 0
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            bucket = self._buckets[key] = [float(self.burst), now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0
+        return (1 - bucket[0]) / self.rate
+
+    def _prune(self, now: float):
+        # Buckets that have refilled completely behave like new ones
+        full_after = self.burst / self.rate
+        for key in [k for k, (_, updated) in self._buckets.items() if now - updated >= full_after]:
+            del self._buckets[key]
+        if len(self._buckets) >= self.max_keys:
+            # Still full of active clients: forget the oldest half
+            for key in list(self._buckets)[:len(self._buckets) // 2]:
+                del self._buckets[key]
+
+    def stats(self):
+        return {"tracked_clients": len(self._buckets)}
+
+class ConcurrencyLimiter:
+    def __init__(self, limit: int, max_queued: int):
+        self.limit = limit
+        self.max_queued = max_queued
+        self.active = 0
+        self.admitted = 0
+        self._waiters = collections.deque()
+
+    async def acquire(self, timeout: float):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queued:
+            raise Shed("queue_full", 503, 1, "Server is busy, try again shortly")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            if not (waiter.done() and not waiter.cancelled()):
+                raise Shed("queue_timeout", 503, max(1, math.ceil(timeout)), "Server is busy, try again shortly")
+        except BaseException:
+            # Cancelled (client went away) after the slot was handed over
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+        self.admitted += 1
+
+    def release(self):
+        # Hand the slot straight to the next live waiter, keeping FIFO order
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "in_flight": self.active,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+        }
+
+def client_key(scope):
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                user = auth_utils.principal_cache.peek(token)
+                if user is not None:
+                    return f"user:{user.id}"
+            break
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+buckets = TokenBuckets(settings.RATE_LIMIT_PER_SECOND, settings.RATE_LIMIT_BURST)
+limiter = ConcurrencyLimiter(
+    settings.ADMISSION_CONCURRENCY or settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW,
+    settings.ADMISSION_QUEUE_SIZE
+)
+
+class AdmissionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in UNLIMITED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        try:
+            retry_after = buckets.take(client_key(scope))
+            if retry_after:
+                raise Shed("rate_limited", 429, math.ceil(retry_after), "Too many requests")
+            if scope["path"] in UNQUEUED_PATHS:
+                await self.app(scope, receive, send)
+                return
+            started = time.perf_counter()
+            await limiter.acquire(settings.ADMISSION_QUEUE_TIMEOUT_SECONDS)
+        except Shed as e:
+            shed.inc(reason=e.reason)
+            response = JSONResponse(
+                {"detail": e.detail}, status_code=e.status_code, headers={"Retry-After": str(e.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+        queue_wait.observe(time.perf_counter() - started)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
@@ -0,0 +1,431 @@
+import argparse
+import asyncio
+import calendar
+import itertools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+from sqlalchemy import select, delete, text
+from sqlalchemy.ext.asyncio import AsyncSession
+import models, stats, rollups, search, similarity, leader
+from database import AsyncSessionLocal, engine, settings
+
+# Cold storage for old reviewed decisions.
+#
+#   python archive.py --months 24
+#
+# Decisions reviewed more than N months ago move, with their options,
+# assumptions and review, out of the hot tables into immutable segment
+# files under ARCHIVE_DIR: Arrow IPC with zstd-compressed record batches,
+# one row per decision with the children as nested columns. Rows are
+# grouped by user and each user's rows form their own batches, so reading
+# one user's history memory-maps the segment and decompresses only those
+# batches. manifest.json lists the segments with each user's batch range,
+# id range and totals.
+#
+# Archived rows leave user_stats and decision_rollups too, so the hot
+# aggregates (and their rebuilds) only cover the hot tables. Read paths
+# that take include_archived=true add the archive back: the overview from
+# the manifest totals alone, calibration and time series from the user's
+# batches, and GET /decisions/{id} from the segment holding that id.
+#
+# A segment is written and listed as "written" before the hot rows are
+# deleted, and marked "committed" after; readers only see committed ones.
+# The rows are read and the file written without holding any lock; the
+# delete then runs in a short transaction that locks the rows again and
+# checks they still match the segment. If anything changed meanwhile the
+# segment is discarded and the next pass rebuilds it.
+# The next run settles a segment left "written" by a crash: if its rows are
+# still in the database the file is discarded, otherwise it is committed.
+#
+# Archived decisions are not re-scored by scoring.py, exported, searched or
+# offered as similar decisions.
+
+BATCH_ROWS = 10_000   # max rows per record batch
+ID_CHUNK = 1000       # ids per IN list
+MAX_RETRIES = 3       # segments in a row discarded because their rows changed
+
+OPTION = pa.struct([("id", pa.int64()), ("option_name", pa.string()), ("reasoning", pa.string())])
+ASSUMPTION = pa.struct([("id", pa.int64()), ("assumption_text", pa.string()), ("status", pa.string())])
+REVIEW = pa.struct([
+    ("id", pa.int64()), ("outcome_rating", pa.int32()), ("outcome_notes", pa.string()),
+    ("lessons_learned", pa.string()), ("reviewed_at", pa.timestamp("us")),
+])
+SCHEMA = pa.schema([
+    ("id", pa.int64()), ("user_id", pa.int64()), ("title", pa.string()), ("category", pa.string()),
+    ("description", pa.string()), ("confidence_score", pa.int32()), ("expected_outcome", pa.string()),
+    ("decision_date", pa.timestamp("us")), ("review_date", pa.timestamp("us")),
+    ("created_at", pa.timestamp("us")), ("decision_quality", pa.string()), ("outcome_quality", pa.string()),
+    ("scoring_version", pa.int32()),
+    ("options", pa.list_(OPTION)), ("assumptions", pa.list_(ASSUMPTION)), ("review", REVIEW),
+])
+DECISION_COLUMNS = tuple(SCHEMA.names[:13])
+
+def _path(name: str):
+    return os.path.join(settings.ARCHIVE_DIR, name)
+
+def _chunks(ids):
+    for start in range(0, len(ids), ID_CHUNK):
+        yield ids[start:start + ID_CHUNK]
+
+# Manifest and segment readers
+
+_lock = threading.Lock()
+_manifest = {"stamp": None, "data": {"segments": []}}
+_readers = {}   # segment name -> RecordBatchFileReader over a memory map
+
+def _read_manifest():
+    try:
+        with open(_path("manifest.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"segments": []}
+
+def _save_manifest(manifest: dict):
+    tmp = _path("manifest.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, _path("manifest.json"))
+
+def committed_segments():
+    # Re-read only when the file changed (e.g. the leader archived more)
+    try:
+        stat = os.stat(_path("manifest.json"))
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        stamp = None
+    with _lock:
+        if stamp != _manifest["stamp"]:
+            _manifest["data"] = _read_manifest() if stamp else {"segments": []}
+            _manifest["stamp"] = stamp
+        return [s for s in _manifest["data"]["segments"] if s["state"] == "committed"]
+
+def _reader(name: str):
+    with _lock:
+        reader = _readers.get(name)
+        if reader is None:
+            reader = _readers[name] = ipc.open_file(pa.memory_map(_path(name)))
+        return reader
+
+def _user_table(user_id: int, decision_id: int = None):
+    batches = []
+    for segment in committed_segments():
+        entry = segment["users"].get(str(user_id))
+        if entry is None:
+            continue
+        if decision_id is not None and not entry["min_id"] <= decision_id <= entry["max_id"]:
+            continue
+        reader = _reader(segment["name"])
+        batches.extend(reader.get_batch(i) for i in range(*entry["batches"]))
+    return pa.Table.from_batches(batches, schema=SCHEMA)
+
+def _find(user_id: int, decision_id: int):
+    table = _user_table(user_id, decision_id)
+    rows = table.filter(pc.equal(table["id"], decision_id)).to_pylist()
+    if not rows:
+        return None
+    row = rows[0]
+    # Shape of schemas.Decision
+    for child in row["options"] + row["assumptions"]:
+        child["decision_id"] = decision_id
+    if row["review"] is not None:
+        row["review"]["decision_id"] = decision_id
+    return row
+
+def _calibration_rows(user_id: int):
+    table = _user_table(user_id)
+    rating = pc.struct_field(table["review"], "outcome_rating")
+    keep = pc.and_(pc.is_valid(table["confidence_score"]), pc.is_valid(rating))
+    groups = pa.table({
+        "confidence_score": table["confidence_score"].filter(keep),
+        "outcome_rating": rating.filter(keep),
+        "category": table["category"].filter(keep),
+        "year": pc.year(table["decision_date"]).filter(keep),
+    }).group_by(["confidence_score", "outcome_rating", "category", "year"], use_threads=False).aggregate([([], "count_all")])
+    return list(zip(*(groups[name].to_pylist() for name in
+                      ("confidence_score", "outcome_rating", "category", "year", "count_all"))))
+
+def _rollup_deltas(rows, sign: int = 1):
+    deltas = []
+    for row in rows:
+        if row["decision_date"] is not None:
+            deltas.append(rollups.decision_delta(
+                row["user_id"], row["category"], row["decision_date"], row["confidence_score"], sign
+            ))
+        review = row["review"]
+        if review is not None and review["reviewed_at"] is not None:
+            deltas.append(rollups.review_delta(
+                row["user_id"], row["category"], review["reviewed_at"], review["outcome_rating"], sign
+            ))
+    return rollups.fold_old(deltas)
+
+def _rollup_rows(user_id: int):
+    table = _user_table(user_id).select(["user_id", "category", "decision_date", "confidence_score", "review"])
+    return _rollup_deltas(table.to_pylist())
+
+async def get_decision(user_id: int, decision_id: int):
+    return await asyncio.to_thread(_find, user_id, decision_id)
+
+def totals(user_id: int):
+    # user_stats-shaped totals of the user's archived rows (manifest only)
+    result = dict.fromkeys(stats.STAT_COLUMNS, 0)
+    for segment in committed_segments():
+        entry = segment["users"].get(str(user_id))
+        if entry is not None:
+            for name in stats.STAT_COLUMNS:
+                result[name] += entry["totals"][name]
+    return result
+
+async def calibration_rows(user_id: int):
+    # (confidence_score, outcome_rating, category, year, count) groups like the hot query
+    return await asyncio.to_thread(_calibration_rows, user_id)
+
+async def rollup_rows(user_id: int):
+    # Bucket rows for rollups.read_series(extra=...)
+    return await asyncio.to_thread(_rollup_rows, user_id)
+
+# Archiving
+
+def _months_ago(now: datetime, months: int):
+    year, month = divmod(now.year * 12 + now.month - 1 - months, 12)
+    day = min(now.day, calendar.monthrange(year, month + 1)[1])
+    return now.replace(year=year, month=month + 1, day=day)
+
+def _totals(rows):
+    return {
+        "total_decisions": len(rows),
+        "reviewed_decisions": sum(1 for row in rows if row["decision_quality"] is not None),
+        "confidence_sum": sum(row["confidence_score"] or 0 for row in rows),
+        "review_count": sum(1 for row in rows if row["review"] is not None),
+        "outcome_sum": sum((row["review"] or {}).get("outcome_rating") or 0 for row in rows),
+    }
+
+def _write_segment(path: str, rows):
+    # rows are sorted by (user_id, id); every user gets their own batches
+    users = {}
+    batches = []
+    for user_id, group in itertools.groupby(rows, key=lambda row: row["user_id"]):
+        group = list(group)
+        first = len(batches)
+        for start in range(0, len(group), BATCH_ROWS):
+            batches.append(pa.RecordBatch.from_pylist(group[start:start + BATCH_ROWS], schema=SCHEMA))
+        users[user_id] = {
+            "batches": [first, len(batches)],
+            "min_id": group[0]["id"],
+            "max_id": group[-1]["id"],
+            "totals": _totals(group),
+        }
+    tmp = path + ".tmp"
+    options = ipc.IpcWriteOptions(compression="zstd")
+    with pa.OSFile(tmp, "wb") as sink, ipc.new_file(sink, SCHEMA, options=options) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+    with open(tmp, "rb+") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return users
+
+async def _candidates(db: AsyncSession, cutoff: datetime, limit: int):
+    result = await db.execute(
+        select(models.Decision.id)
+        .join(models.Review, models.Review.decision_id == models.Decision.id)
+        .filter(models.Review.reviewed_at < cutoff)
+        .order_by(models.Decision.id)
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+async def _load(db: AsyncSession, ids, lock: bool = False):
+    # lock: FOR UPDATE (Postgres) on the decisions and all their children,
+    # held until the caller's transaction ends, so no edit lands between
+    # this read and the delete
+    def query(statement):
+        return statement.with_for_update() if lock else statement
+
+    rows = {}
+    for chunk in _chunks(ids):
+        result = await db.execute(query(
+            select(*(getattr(models.Decision, name) for name in DECISION_COLUMNS))
+            .filter(models.Decision.id.in_(chunk))
+        ))
+        for row in result.mappings():
+            rows[row["id"]] = dict(row, options=[], assumptions=[], review=None)
+        result = await db.execute(query(
+            select(models.Option.decision_id, models.Option.id, models.Option.option_name, models.Option.reasoning)
+            .filter(models.Option.decision_id.in_(chunk))
+            .order_by(models.Option.id)
+        ))
+        for decision_id, *values in result:
+            rows[decision_id]["options"].append(dict(zip(("id", "option_name", "reasoning"), values)))
+        result = await db.execute(query(
+            select(models.Assumption.decision_id, models.Assumption.id,
+                   models.Assumption.assumption_text, models.Assumption.status)
+            .filter(models.Assumption.decision_id.in_(chunk))
+            .order_by(models.Assumption.id)
+        ))
+        for decision_id, *values in result:
+            rows[decision_id]["assumptions"].append(dict(zip(("id", "assumption_text", "status"), values)))
+        result = await db.execute(query(
+            select(models.Review.decision_id, models.Review.id, models.Review.outcome_rating,
+                   models.Review.outcome_notes, models.Review.lessons_learned, models.Review.reviewed_at)
+            .filter(models.Review.decision_id.in_(chunk))
+        ))
+        for decision_id, *values in result:
+            rows[decision_id]["review"] = dict(zip(
+                ("id", "outcome_rating", "outcome_notes", "lessons_learned", "reviewed_at"), values
+            ))
+    return sorted(rows.values(), key=lambda row: (row["user_id"], row["id"]))
+
+async def _delete(db: AsyncSession, ids):
+    for chunk in _chunks(ids):
+        for model in (models.Option, models.Assumption, models.Review):
+            await db.execute(
+                delete(model).filter(model.decision_id.in_(chunk)).execution_options(synchronize_session=False)
+            )
+        await db.execute(
+            delete(models.Decision).filter(models.Decision.id.in_(chunk)).execution_options(synchronize_session=False)
+        )
+        await search.refresh(db, chunk)
+
+def _discard(manifest: dict, segment: dict):
+    if os.path.exists(_path(segment["name"])):
+        os.remove(_path(segment["name"]))
+    manifest["segments"].remove(segment)
+
+async def _reconcile(manifest: dict):
+    # Settle segments a crashed run left "written" (see the header comment).
+    # A segment's rows are deleted in one transaction, so checking one id
+    # tells whether that transaction committed.
+    pending = [s for s in manifest["segments"] if s["state"] == "written"]
+    if not pending:
+        return
+    async with AsyncSessionLocal() as db:
+        for segment in pending:
+            still_hot = (await db.execute(
+                select(models.Decision.id).filter(models.Decision.id == segment["min_id"])
+            )).first()
+            if still_hot:
+                _discard(manifest, segment)
+            else:
+                segment["state"] = "committed"
+            print(f"--- [ARCHIVE] Settled interrupted {segment['name']}: "
+                  f"{'discarded' if still_hot else 'committed'} ---")
+    _save_manifest(manifest)
+
+async def _archive_segment(manifest: dict, cutoff: datetime, limit: int):
+    # Decisions archived, or None if their rows changed while the segment
+    # was being written
+    async with AsyncSessionLocal() as db:
+        rows = await _load(db, await _candidates(db, cutoff, limit))
+    if not rows:
+        return 0
+    ids = sorted(row["id"] for row in rows)
+    number = max((int(s["name"][8:14]) for s in manifest["segments"]), default=0) + 1
+    name = f"segment-{number:06d}.arrow"
+    users = await asyncio.to_thread(_write_segment, _path(name), rows)
+    segment = {
+        "name": name, "state": "written", "created_at": datetime.utcnow().isoformat(),
+        "cutoff": cutoff.isoformat(), "rows": len(rows), "min_id": ids[0], "max_id": ids[-1],
+        "users": {str(user_id): entry for user_id, entry in users.items()},
+    }
+    manifest["segments"].append(segment)
+    _save_manifest(manifest)
+
+    async with AsyncSessionLocal() as db:
+        if await _load(db, ids, lock=True) != rows:
+            await db.rollback()
+            _discard(manifest, segment)
+            _save_manifest(manifest)
+            print(f"--- [ARCHIVE] Rows changed while {name} was written; discarded ---")
+            return None
+        await _delete(db, ids)
+        for user_id, entry in users.items():
+            await stats.subtract(db, user_id, entry["totals"])
+        deltas = _rollup_deltas(rows, sign=-1)
+        for start in range(0, len(deltas), 500):
+            await rollups.apply(db, deltas[start:start + 500])
+        await db.commit()
+
+    segment["state"] = "committed"
+    _save_manifest(manifest)
+    await similarity.invalidate(users)
+    return len(rows)
+
+async def _analyze():
+    # The hot tables just shrank; refresh the planner statistics now rather
+    # than when autoanalyze gets round to it. Dead tuples are left to
+    # autovacuum. SQLite reuses the freed pages as is.
+    if engine.dialect.name != "postgresql":
+        return
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for table in ("decisions", "options", "assumptions", "reviews", "decision_rollups"):
+            await conn.execute(text(f"ANALYZE {table}"))
+
+async def archive(months: int = None, segment_rows: int = None):
+    months = months or settings.ARCHIVE_AFTER_MONTHS
+    if months <= 0:
+        raise ValueError("Set ARCHIVE_AFTER_MONTHS (or pass --months) to archive")
+    segment_rows = segment_rows or settings.ARCHIVE_SEGMENT_ROWS
+    os.makedirs(settings.ARCHIVE_DIR, exist_ok=True)
+    lock = leader.FileLock(_path(".lock"))
+    if not await lock.acquire():
+        print("--- [ARCHIVE] Another archive run is in progress ---")
+        return 0
+    try:
+        manifest = _read_manifest()
+        await _reconcile(manifest)
+        cutoff = _months_ago(datetime.utcnow(), months)
+        started = time.perf_counter()
+        archived = 0
+        retries = 0
+        while True:
+            count = await _archive_segment(manifest, cutoff, segment_rows)
+            if count is None:
+                retries += 1
+                if retries >= MAX_RETRIES:
+                    print("--- [ARCHIVE] Rows keep changing; stopping until the next run ---")
+                    break
+                continue
+            if not count:
+                break
+            retries = 0
+            archived += count
+            print(f"--- [ARCHIVE] {manifest['segments'][-1]['name']}: {count} decision(s) ---")
+        if archived:
+            await _analyze()
+        print(f"--- [ARCHIVE] Archived {archived} decision(s) reviewed before {cutoff:%Y-%m-%d} "
+              f"in {time.perf_counter() - started:.1f}s ---")
+        return archived
+    finally:
+        await lock.release()
+
+def print_status():
+    manifest = _read_manifest()
+    total = 0
+    for segment in manifest["segments"]:
+        path = _path(segment["name"])
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        total += size
+        print(f"{segment['name']}: {segment['state']} | {segment['rows']} decisions | "
+              f"{len(segment['users'])} users | ids {segment['min_id']}-{segment['max_id']} | "
+              f"{size / 1e6:.1f} MB | {segment['created_at']}")
+    print(f"{len(manifest['segments'])} segment(s), {total / 1e6:.1f} MB in {settings.ARCHIVE_DIR}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old reviewed decisions to cold storage")
+    parser.add_argument("--months", type=int, help="archive decisions reviewed more than this many months ago")
+    parser.add_argument("--segment-rows", type=int, help="decisions per segment file")
+    parser.add_argument("--status", action="store_true", help="list segments and exit")
+    args = parser.parse_args()
+    if args.status:
+        print_status()
+    else:
+        asyncio.run(archive(args.months, args.segment_rows))
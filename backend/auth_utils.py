@@ -1,9 +1,15 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 import models, database, schemas
@@ -20,6 +26,95 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+class PasswordWorkerPool:
+    # Runs bcrypt hashing/verification on a bounded thread pool so it never
+    # blocks the event loop (bcrypt releases the GIL while it works). At most
+    # `max_pending` calls may be running or queued; beyond that callers get a
+    # 503 instead of piling up behind a login burst.
+
+    def __init__(self, size: int, max_pending: int):
+        self.size = size
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.run_seconds_total = 0.0
+        self.run_seconds_max = 0.0
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="password")
+        return self._executor
+
+    def _timed(self, fn, args, submitted_at):
+        started = time.perf_counter()
+        with self._lock:
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.running -= 1
+                self.wait_seconds_total += started - submitted_at
+                self.run_seconds_total += elapsed
+                self.run_seconds_max = max(self.run_seconds_max, elapsed)
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self._get_executor(), self._timed, fn, args, time.perf_counter()
+            )
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        return result
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "pending": self.pending,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "wait_seconds_total": self.wait_seconds_total,
+            "run_seconds_total": self.run_seconds_total,
+            "run_seconds_max": self.run_seconds_max,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+password_pool = PasswordWorkerPool(
+    database.settings.PASSWORD_POOL_SIZE, database.settings.PASSWORD_POOL_MAX_PENDING
+)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await password_pool.run(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -30,12 +125,106 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, database.settings.SECRET_KEY, algorithm=database.settings.ALGORITHM)
     return encoded_jwt
 
+class PrincipalCache:
+    # In-process TTL + LRU cache of resolved users, keyed by bearer token.
+    # An entry never outlives its token's `exp`, and is dropped when the
+    # user's row is updated or deleted (see the mapper events below).
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # token -> (expires_at, email, user)
+        self._tokens_by_email = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, token: str):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, email, user = entry
+            if expires_at <= time.monotonic():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return user
+
+    def peek(self, token: str):
+        # Like get(), for callers outside authentication (admission.py):
+        # no stats, no LRU bump, no eviction
+        entry = self._entries.get(token)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[2]
+
+    def put(self, token: str, user: models.User, token_exp: Optional[int] = None):
+        expires_at = time.monotonic() + self.ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, time.monotonic() + (token_exp - time.time()))
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (expires_at, user.email, user)
+            self._tokens_by_email.setdefault(user.email, set()).add(token)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_email(self, email: str):
+        with self._lock:
+            for token in list(self._tokens_by_email.get(email, ())):
+                self._remove(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_email.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, token: str):
+        _, email, _ = self._entries.pop(token)
+        tokens = self._tokens_by_email.get(email)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_email[email]
+
+principal_cache = PrincipalCache(
+    database.settings.PRINCIPAL_CACHE_SIZE, database.settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_cached_principal(mapper, connection, target):
+    # Covers ORM flushes of a User; bulk UPDATE statements bypass these events
+    emails = {target.email, *inspect(target).attrs.email.history.deleted}
+    for email in emails:
+        if email:
+            principal_cache.invalidate_email(email)
+
 async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    user = principal_cache.get(token)
+    if user is not None:
+        return user
+
     try:
         payload = jwt.decode(token, database.settings.SECRET_KEY, algorithms=[database.settings.ALGORITHM])
         email: str = payload.get("sub")
@@ -49,4 +238,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     user = result.scalars().first()
     if user is None:
         raise credentials_exception
+
+    # Detach so the cached instance is not tied to this request's session
+    db.expunge(user)
+    principal_cache.put(token, user, payload.get("exp"))
     return user
+
+async def get_read_db(current_user: models.User = Depends(get_current_user)):
+    # Session for read-only endpoints: the replica, unless this user wrote
+    # within READ_YOUR_WRITES_SECONDS (see database.read_sessionmaker)
+    async with database.read_sessionmaker(current_user.id)() as session:
+        yield session
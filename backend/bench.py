@@ -0,0 +1,292 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import metrics
+
+# In-process load and latency benchmark.
+# Drives the FastAPI app through httpx's ASGI transport (no server, no
+# network) against a local SQLite file or a throwaway Postgres database,
+# runs concurrent scenarios and reports throughput, latency percentiles and
+# queries per request (from the X-DB-Queries header, see metrics.py).
+#
+#   python bench.py --scenario all --concurrency 16 --duration 10 --output bench.json
+#   python bench.py --output new.json --baseline bench.json --max-regression 0.2
+#
+# The schema at --database-url is dropped and recreated: never point it at a
+# database you care about. With --baseline the exit code is 1 when any
+# scenario regressed by more than --max-regression, so it can gate a release.
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///./bench.db"
+CATEGORIES = ["Career", "Finance", "Health", "Personal", "Business", "Education"]
+PASSWORD = "bench-password"
+
+def _succeeded(status: int):
+    # 304 is the expected answer to the pollers' If-None-Match
+    return 200 <= status < 300 or status == 304
+
+class Recorder:
+    def __init__(self):
+        self.requests = {}     # "METHOD /route" -> list of (seconds, queries, status)
+        self.recording = False
+
+    async def call(self, client, name: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - started
+        if self.recording:
+            queries = int(response.headers.get("x-db-queries", 0))
+            self.requests.setdefault(name, []).append((elapsed, queries, response.status_code))
+        return response
+
+def _summarize(samples, elapsed_seconds: float):
+    failed = sum(1 for sample in samples if not _succeeded(sample[2]))
+    latencies = np.array([sample[0] for sample in samples]) * 1000
+    queries = np.array([sample[1] for sample in samples])
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    bounds_ms = [bound * 1000 for bound in metrics.DURATION_BUCKETS]
+    counts = np.bincount(np.searchsorted(bounds_ms, latencies), minlength=len(bounds_ms) + 1)
+    histogram = {f"le_{bound:g}ms": int(count) for bound, count in zip(bounds_ms, counts)}
+    histogram["le_inf"] = int(counts[-1])
+    return {
+        "requests": len(samples),
+        "failed": failed,
+        "error_rate": round(failed / len(samples), 4),
+        "throughput_rps": round(len(samples) / elapsed_seconds, 2),
+        "latency_ms": {
+            "mean": round(float(latencies.mean()), 3),
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "max": round(float(latencies.max()), 3),
+        },
+        "histogram": histogram,
+        "queries_per_request": {
+            "mean": round(float(queries.mean()), 2),
+            "max": int(queries.max()),
+        },
+        "statuses": {str(code): int(count) for code, count in
+                     zip(*np.unique([sample[2] for sample in samples], return_counts=True))},
+    }
+
+def _decision_payload(rng: random.Random, index: int, review_date=None):
+    return {
+        "title": f"Benchmark decision {index}",
+        "category": rng.choice(CATEGORIES),
+        "description": "Generated by bench.py to exercise the decision endpoints.",
+        "confidence_score": rng.randint(10, 95),
+        "expected_outcome": "Whatever the benchmark expects.",
+        "decision_date": (datetime(2024, 1, 1) + timedelta(minutes=rng.randint(0, 800_000))).isoformat(),
+        "review_date": review_date,
+        "options": [{"option_name": f"Option {n}", "reasoning": "Because."} for n in range(rng.randint(1, 3))],
+        "assumptions": [{"assumption_text": f"Assumption {n}"} for n in range(rng.randint(0, 2))],
+    }
+
+# Scenarios: each call is one user-level operation made of one or more requests
+
+async def login_storm(client, recorder, user, rng, state):
+    await recorder.call(
+        client, "POST /auth/login", "POST", "/auth/login",
+        data={"username": user["email"], "password": PASSWORD}
+    )
+
+async def list_paging(client, recorder, user, rng, state):
+    params = {"limit": 50}
+    if rng.random() < 0.5:
+        params["view"] = "summary"
+    for _ in range(5):
+        response = await recorder.call(
+            client, "GET /decisions/", "GET", "/decisions/", params=params, headers=user["headers"]
+        )
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+        params["cursor"] = cursor
+
+async def create_review(client, recorder, user, rng, state):
+    review_date = (datetime.utcnow() + timedelta(days=30)).isoformat()
+    response = await recorder.call(
+        client, "POST /decisions/", "POST", "/decisions/",
+        json=_decision_payload(rng, rng.randint(0, 10**6), review_date), headers=user["headers"]
+    )
+    if response.status_code != 200 or rng.random() < 0.5:
+        return
+    await recorder.call(
+        client, "POST /decisions/{id}/review", "POST", f"/decisions/{response.json()['id']}/review",
+        json={"outcome_rating": rng.randint(1, 5), "lessons_learned": "Benchmark review."},
+        headers=user["headers"]
+    )
+
+async def analytics_polling(client, recorder, user, rng, state):
+    # Pollers resend the last ETag they saw, as a dashboard would
+    for path in ("/analytics/overview", "/analytics/calibration", "/analytics/timeseries"):
+        key = (user["email"], path)
+        headers = dict(user["headers"])
+        if key in state:
+            headers["If-None-Match"] = state[key]
+        response = await recorder.call(client, f"GET {path}", "GET", path, headers=headers)
+        if "etag" in response.headers:
+            state[key] = response.headers["etag"]
+
+SCENARIOS = {
+    "login_storm": login_storm,
+    "list_paging": list_paging,
+    "create_review": create_review,
+    "analytics_polling": analytics_polling,
+}
+
+async def seed(client, users: int, decisions_per_user: int, rng: random.Random):
+    seeded = []
+    for n in range(users):
+        email = f"bench{n}@example.com"
+        response = await client.post(
+            "/auth/register", json={"email": email, "name": f"Bench {n}", "password": PASSWORD}
+        )
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        payload = [_decision_payload(rng, i) for i in range(decisions_per_user)]
+        if payload:
+            response = await client.post("/decisions/bulk", json=payload, headers=headers)
+            response.raise_for_status()
+        seeded.append({"email": email, "headers": headers})
+    return seeded
+
+async def run_scenario(client, scenario, users, args):
+    recorder = Recorder()
+    state = {}
+
+    async def worker(worker_id: int, until: float):
+        rng = random.Random(args.seed * 1000 + worker_id)
+        while time.perf_counter() < until:
+            await scenario(client, recorder, rng.choice(users), rng, state)
+
+    if args.warmup > 0:
+        until = time.perf_counter() + args.warmup
+        await asyncio.gather(*(worker(n, until) for n in range(args.concurrency)))
+
+    recorder.recording = True
+    started = time.perf_counter()
+    until = started + args.duration
+    await asyncio.gather(*(worker(n, until) for n in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    samples = [sample for endpoint in recorder.requests.values() for sample in endpoint]
+    if not samples:
+        return {"requests": 0, "errors": 0}
+    result = _summarize(samples, elapsed)
+    result["errors"] = result["failed"]
+    result["endpoints"] = {
+        name: _summarize(endpoint, elapsed) for name, endpoint in sorted(recorder.requests.items())
+    }
+    return result
+
+def compare(baseline, current, tolerance: float):
+    # Regressions beyond `tolerance` (a fraction) in p95 latency, throughput or
+    # queries per request, and any new failed requests, for scenarios present
+    # in both runs
+    failures = []
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before or not before.get("requests") or not now.get("requests"):
+            continue
+        if now.get("errors", 0) > before.get("errors", 0):
+            failures.append(f"{name}: failed requests {before.get('errors', 0)} -> {now['errors']}")
+        if now["latency_ms"]["p95"] > before["latency_ms"]["p95"] * (1 + tolerance):
+            failures.append(f"{name}: p95 {before['latency_ms']['p95']} -> {now['latency_ms']['p95']} ms")
+        if now["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            failures.append(f"{name}: throughput {before['throughput_rps']} -> {now['throughput_rps']} req/s")
+        if now["queries_per_request"]["mean"] > before["queries_per_request"]["mean"] * (1 + tolerance):
+            failures.append(
+                f"{name}: queries/request {before['queries_per_request']['mean']}"
+                f" -> {now['queries_per_request']['mean']}"
+            )
+    return failures
+
+def _print_report(report):
+    print(f"\n--- Benchmark ({report['database']}, concurrency {report['concurrency']}, "
+          f"{report['duration_seconds']}s per scenario) ---")
+    print(f"{'scenario':<20}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'q/req':>8}{'errors':>8}")
+    for name, result in report["scenarios"].items():
+        if not result["requests"]:
+            print(f"{name:<20}{'(no requests)':>10}")
+            continue
+        latency = result["latency_ms"]
+        print(f"{name:<20}{result['throughput_rps']:>10}{latency['p50']:>10}{latency['p95']:>10}"
+              f"{latency['p99']:>10}{result['queries_per_request']['mean']:>8}{result['errors']:>8}")
+
+async def main(args):
+    os.environ["DATABASE_URL"] = args.database_url
+    # Every bench user hammers from one address: measure capacity, not the
+    # per-client rate limit (the concurrency limit stays on)
+    os.environ.setdefault("RATE_LIMIT_PER_SECOND", "0")
+    if args.database_url.startswith("sqlite"):
+        path = args.database_url.split(":///", 1)[-1]
+        if path and path != ":memory:" and os.path.exists(path):
+            os.remove(path)
+
+    import httpx
+    from main import app
+    from database import engine, Base
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+    selected = list(SCENARIOS) if args.scenario == ["all"] else args.scenario
+    report = {
+        "started_at": datetime.utcnow().isoformat(),
+        "database": engine.dialect.name,
+        "concurrency": args.concurrency,
+        "duration_seconds": args.duration,
+        "users": args.users,
+        "decisions_per_user": args.decisions_per_user,
+        "seed": args.seed,
+        "python": sys.version.split()[0],
+        "scenarios": {},
+    }
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            users = await seed(client, args.users, args.decisions_per_user, random.Random(args.seed))
+            for name in selected:
+                print(f"Running {name}...")
+                report["scenarios"][name] = await run_scenario(client, SCENARIOS[name], users, args)
+
+    _print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(json.load(f), report, args.max_regression)
+        if failures:
+            print(f"\n{len(failures)} regression(s) against {args.baseline}:")
+            for failure in failures:
+                print(f"   - {failure}")
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="In-process API benchmark")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--scenario", nargs="+", default=["all"], choices=["all", *SCENARIOS])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=1.0, help="unrecorded seconds per scenario")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--decisions-per-user", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="earlier JSON results to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,185 @@
+import argparse
+import gzip
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+import brotli
+import orjson
+import calibration, encoding, schemas
+
+# Serialization cost per response, before and after encoding.py.
+#
+#   python bench_serialization.py --items 100 --output serialization.json
+#
+# Builds representative payloads in memory (no database, no HTTP) and
+# times only the step that turns a handler's return value into body bytes:
+#
+#   decisions_full     GET /decisions/ (response_model): FastAPI renders it
+#                      with pydantic's Rust serializer either way; shown for
+#                      reference, with the cost of MessagePack transcoding
+#   decisions_summary  GET /decisions/?view=summary
+#   decisions_fields   GET /decisions/?fields=...
+#   calibration        GET /analytics/calibration
+#   timeseries         GET /analytics/timeseries?by_category=true
+#
+# "before" is jsonable_encoder + JSONResponse (json.dumps), "after" is
+# encoding.FastJSONResponse (orjson). Compression columns are the extra
+# cost of the gzip/br step for clients that ask for it.
+
+CATEGORIES = ["Career", "Finance", "Health", "Personal", "Business", "Education", "Relationships"]
+
+def _decisions(rng: np.random.Generator, items: int):
+    now = datetime(2025, 1, 1)
+    rows = []
+    for i in range(items):
+        decided = now - timedelta(minutes=int(rng.integers(0, 500_000)))
+        rows.append({
+            "id": i + 1, "user_id": 1, "title": f"Decision {i + 1}",
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "description": "Weighing the options for a decision. " * 4,
+            "confidence_score": int(rng.integers(5, 100)),
+            "expected_outcome": "An outcome in line with the stated confidence.",
+            "decision_date": decided, "review_date": decided + timedelta(days=60), "created_at": decided,
+            "decision_quality": "Good", "outcome_quality": "Average",
+            "options": [
+                {"id": i * 10 + k, "decision_id": i + 1, "option_name": f"Option {k + 1}",
+                 "reasoning": "Reasoning for this option. " * 3}
+                for k in range(int(rng.integers(1, 5)))
+            ],
+            "assumptions": [
+                {"id": i * 10 + k, "decision_id": i + 1, "assumption_text": f"Assumption {k + 1} holds",
+                 "status": "pending"}
+                for k in range(int(rng.integers(0, 4)))
+            ],
+            "review": {"id": i + 1, "decision_id": i + 1, "outcome_rating": int(rng.integers(1, 6)),
+                       "outcome_notes": None, "lessons_learned": "Lesson learned. " * 5,
+                       "reviewed_at": decided + timedelta(days=70)},
+        })
+    return rows
+
+def _calibration(rng: np.random.Generator, items: int):
+    n = items * 20
+    confidence = rng.integers(5, 100, size=n)
+    rating = np.clip(np.rint(1 + 4 * confidence / 100 + rng.normal(0, 0.8, size=n)), 1, 5)
+    years = rng.integers(2019, 2025, size=n)
+    rows = [
+        (int(c), int(r), CATEGORIES[i % len(CATEGORIES)], int(y))
+        for i, (c, r, y) in enumerate(zip(confidence, rating, years))
+    ]
+    return calibration.compute(*calibration.to_arrays(rows))
+
+def _timeseries(rng: np.random.Generator, months: int = 36):
+    series = []
+    for m in range(months):
+        for category in CATEGORIES:
+            decisions, reviews = int(rng.integers(1, 30)), int(rng.integers(0, 20))
+            series.append({
+                "bucket": datetime(2022 + m // 12, m % 12 + 1, 1), "granularity": "month",
+                "decisions": decisions, "reviews": reviews,
+                "average_confidence": round(float(rng.uniform(30, 90)), 1),
+                "average_outcome": round(float(rng.uniform(1, 5)), 1) if reviews else None,
+                "category": category,
+            })
+    return series
+
+def _time(fn, repeat: int):
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+def measure(before, after, repeat: int, msgpack_fn=None):
+    body = after()
+    result = {
+        "before_ms": round(_time(before, repeat), 4) if before else None,
+        "after_ms": round(_time(after, repeat), 4),
+        "json_bytes": len(body),
+        "gzip_ms": round(_time(lambda: encoding.compress(body, "gzip"), repeat), 4),
+        "gzip_bytes": len(gzip.compress(body, compresslevel=encoding.GZIP_LEVEL)),
+        "br_ms": round(_time(lambda: encoding.compress(body, "br"), repeat), 4),
+        "br_bytes": len(brotli.compress(body, quality=encoding.BROTLI_QUALITY)),
+    }
+    msgpack_fn = msgpack_fn or (lambda: encoding.pack(orjson.loads(body)))
+    result["msgpack_ms"] = round(_time(msgpack_fn, repeat), 4)
+    result["msgpack_bytes"] = len(msgpack_fn())
+    if before:
+        result["saved_ms"] = round(result["before_ms"] - result["after_ms"], 4)
+        result["speedup"] = round(result["before_ms"] / result["after_ms"], 1)
+    return result
+
+def run(args):
+    rng = np.random.default_rng(args.seed)
+    decisions = _decisions(rng, args.items)
+    summary_rows = [{name: row[name] for name in schemas.DecisionSummary.model_fields} for row in decisions]
+    field_rows = [{name: row[name] for name in ("id", "title", "decision_date")} for row in decisions]
+    calibration_payload = _calibration(rng, args.items)
+    timeseries_payload = _timeseries(rng)
+    full = TypeAdapter(List[schemas.Decision])
+
+    def old(content):
+        return lambda: JSONResponse(jsonable_encoder(content)).body
+
+    def new(content):
+        return lambda: encoding.FastJSONResponse(content).body
+
+    results = {
+        # Same path before and after: validate, then pydantic's dump_json
+        "decisions_full": measure(
+            None, lambda: full.dump_json(full.validate_python(decisions)), args.repeat,
+            msgpack_fn=lambda: encoding.pack(orjson.loads(full.dump_json(full.validate_python(decisions))))
+        ),
+        "decisions_summary": measure(
+            # Before: each row went through DecisionSummary.model_validate too
+            lambda: JSONResponse(jsonable_encoder(
+                [schemas.DecisionSummary.model_validate(row) for row in summary_rows]
+            )).body,
+            new(summary_rows), args.repeat
+        ),
+        "decisions_fields": measure(old(field_rows), new(field_rows), args.repeat),
+        "calibration": measure(old(calibration_payload), new(calibration_payload), args.repeat),
+        "timeseries": measure(old(timeseries_payload), new(timeseries_payload), args.repeat),
+    }
+    return {
+        "started_at": datetime.utcnow().isoformat(),
+        "items": args.items,
+        "repeat": args.repeat,
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+
+def _print_report(report):
+    print(f"--- Serialization per response ({report['items']} items, ms) ---")
+    print(f"{'payload':<20}{'before':>9}{'after':>9}{'saved':>9}{'x':>6}{'json KB':>9}"
+          f"{'gzip':>15}{'br':>15}{'msgpack':>15}")
+    for name, r in report["results"].items():
+        before = f"{r['before_ms']:.3f}" if r["before_ms"] is not None else "-"
+        saved = f"{r['saved_ms']:.3f}" if "saved_ms" in r else "-"
+        speedup = f"{r['speedup']}" if "speedup" in r else "-"
+        print(f"{name:<20}{before:>9}{r['after_ms']:>9.3f}{saved:>9}{speedup:>6}{r['json_bytes'] / 1024:>9.1f}"
+              f"{r['gzip_ms']:>7.3f}/{r['gzip_bytes'] / 1024:>5.1f}KB"
+              f"{r['br_ms']:>7.3f}/{r['br_bytes'] / 1024:>5.1f}KB"
+              f"{r['msgpack_ms']:>7.3f}/{r['msgpack_bytes'] / 1024:>5.1f}KB")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Response serialization micro-benchmark")
+    parser.add_argument("--items", type=int, default=100, help="decisions per page")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the results as JSON")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run(args)
+    _print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.output}")
@@ -0,0 +1,118 @@
+import numpy as np
+import scoring
+
+# Calibration analytics: how well confidence_score predicted the outcome.
+# The query groups reviewed decisions by (confidence, rating, category,
+# year) and the maths works on those groups with their counts as weights,
+# so the Python side handles at most a few thousand rows however many
+# decisions a user has reviewed. Everything below works on whole columns.
+
+# Same thresholds the current scoring rule uses for decision_quality
+_rule = scoring.get_rule()
+HIGH_CONFIDENCE = _rule.high_confidence
+LOW_CONFIDENCE = _rule.low_confidence
+GOOD_RATING = _rule.good_rating
+POOR_RATING = _rule.poor_rating
+
+BUCKETS = 10
+
+def to_arrays(rows):
+    # rows: (confidence_score, outcome_rating, category, decision_year, count)
+    # groups. Each column goes straight into a typed array; categories are
+    # factorized into integer codes, sorted with None ("Uncategorized") last.
+    n = len(rows)
+    confidence = np.fromiter((row[0] for row in rows), np.float64, n)
+    rating = np.fromiter((row[1] for row in rows), np.float64, n)
+    year = np.fromiter((-1 if row[3] is None else row[3] for row in rows), np.int64, n)
+    weight = np.fromiter((row[4] for row in rows), np.float64, n)
+    first_seen = {}
+    codes = np.fromiter((first_seen.setdefault(row[2], len(first_seen)) for row in rows), np.int64, n)
+    labels = sorted(first_seen, key=lambda c: (c is None, c or ""))
+    sorted_code = np.empty(len(labels), dtype=np.int64)
+    sorted_code[[first_seen[label] for label in labels]] = np.arange(len(labels))
+    labels = [label if label is not None else "Uncategorized" for label in labels]
+    return confidence, rating, (labels, sorted_code[codes]), year, weight
+
+def _summary(confidence, rating, weight):
+    # Shared metrics for any slice of the data
+    n = weight.sum()
+    p = confidence / 100.0
+    success = rating >= GOOD_RATING
+
+    def mean(values):
+        return float(np.dot(values, weight) / n)
+
+    return {
+        "count": int(n),
+        "mean_confidence": round(mean(confidence), 1),
+        "success_rate": round(mean(success), 3),
+        "mean_outcome": round(mean(rating), 2),
+        "brier_score": round(mean((p - success) ** 2), 4),
+        "overconfident_rate": round(mean((confidence >= HIGH_CONFIDENCE) & (rating <= POOR_RATING)), 3),
+        "underconfident_rate": round(mean((confidence <= LOW_CONFIDENCE) & (rating >= GOOD_RATING)), 3),
+    }
+
+def _grouped(labels, inverse, confidence, rating, weight):
+    counts = np.bincount(inverse, weights=weight, minlength=len(labels))
+    p = confidence / 100.0
+    success = (rating >= GOOD_RATING).astype(np.float64)
+    sums = {
+        "confidence": np.bincount(inverse, weights=confidence * weight),
+        "success": np.bincount(inverse, weights=success * weight),
+        "rating": np.bincount(inverse, weights=rating * weight),
+        "brier": np.bincount(inverse, weights=(p - success) ** 2 * weight),
+    }
+    return [
+        {
+            "key": label,
+            "count": int(counts[i]),
+            "mean_confidence": round(float(sums["confidence"][i] / counts[i]), 1),
+            "success_rate": round(float(sums["success"][i] / counts[i]), 3),
+            "mean_outcome": round(float(sums["rating"][i] / counts[i]), 2),
+            "brier_score": round(float(sums["brier"][i] / counts[i]), 4),
+        }
+        for i, label in enumerate(labels)
+        if counts[i]
+    ]
+
+def compute(confidence, rating, category, year, weight):
+    if confidence.size == 0:
+        return {"count": 0, "curve": [], "by_category": [], "by_year": []}
+
+    result = _summary(confidence, rating, weight)
+
+    # Calibration curve per confidence decile (100 falls into the top bucket)
+    bucket = np.clip(confidence // (100 // BUCKETS), 0, BUCKETS - 1).astype(np.int64)
+    counts = np.bincount(bucket, weights=weight, minlength=BUCKETS)
+    conf_sums = np.bincount(bucket, weights=confidence * weight, minlength=BUCKETS)
+    success_sums = np.bincount(bucket, weights=(rating >= GOOD_RATING) * weight, minlength=BUCKETS)
+    rating_sums = np.bincount(bucket, weights=rating * weight, minlength=BUCKETS)
+    filled = counts > 0
+    mean_conf = np.divide(conf_sums, counts, out=np.zeros(BUCKETS), where=filled)
+    success_rate = np.divide(success_sums, counts, out=np.zeros(BUCKETS), where=filled)
+    mean_rating = np.divide(rating_sums, counts, out=np.zeros(BUCKETS), where=filled)
+
+    # Expected calibration error: count-weighted gap between confidence and hit rate
+    result["calibration_error"] = round(float(np.sum(counts * np.abs(mean_conf / 100.0 - success_rate)) / weight.sum()), 4)
+    step = 100 // BUCKETS
+    result["curve"] = [
+        {
+            "bucket": f"{b * step}-{100 if b == BUCKETS - 1 else b * step + step - 1}",
+            "count": int(counts[b]),
+            "mean_confidence": round(float(mean_conf[b]), 1),
+            "success_rate": round(float(success_rate[b]), 3),
+            "mean_outcome": round(float(mean_rating[b]), 2),
+        }
+        for b in np.flatnonzero(filled)
+    ]
+
+    labels, codes = category
+    result["by_category"] = [
+        dict(row, category=row.pop("key")) for row in _grouped(labels, codes, confidence, rating, weight)
+    ]
+    dated = year >= 0
+    years, year_codes = np.unique(year[dated], return_inverse=True)
+    result["by_year"] = [
+        dict(row, year=int(row.pop("key"))) for row in _grouped(years, year_codes, confidence[dated], rating[dated], weight[dated])
+    ]
+    return result
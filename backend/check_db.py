@@ -1,6 +1,8 @@
 import asyncio
-from sqlalchemy import select
-from database import AsyncSessionLocal
+import sys
+from sqlalchemy import select, func, text
+from sqlalchemy.exc import DBAPIError
+from database import AsyncSessionLocal, Base
 from models import User, Decision
 
 async def check_data():
@@ -30,5 +32,40 @@ async def check_data():
             print(f"     Expected Outcome: {d.expected_outcome}")
             print("")
 
+async def _table_size(db, table: str):
+    # Bytes on disk including indexes; None where the backend can't tell
+    if db.bind.dialect.name == "postgresql":
+        return (await db.execute(text("SELECT pg_total_relation_size(:t)"), {"t": table})).scalar()
+    try:
+        result = await db.execute(
+            text("SELECT sum(pgsize) FROM dbstat WHERE name = :t OR tbl_name = :t"), {"t": table}
+        )
+    except DBAPIError:
+        # SQLite built without the dbstat virtual table
+        await db.rollback()
+        return None
+    return result.scalar()
+
+def _format_size(size):
+    if size is None:
+        return "?"
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+async def summarize():
+    # Counts and sizes only, for databases too big to print row by row
+    async with AsyncSessionLocal() as db:
+        print("\n--- 📊 Database Summary ---\n")
+        print(f"   {'table':<20}{'rows':>14}{'size':>12}")
+        for table in Base.metadata.sorted_tables:
+            count = (await db.execute(select(func.count()).select_from(table))).scalar()
+            size = await _table_size(db, table.name)
+            print(f"   {table.name:<20}{count:>14,}{_format_size(size):>12}")
+
 if __name__ == "__main__":
-    asyncio.run(check_data())
+    if "--summary" in sys.argv:
+        asyncio.run(summarize())
+    else:
+        asyncio.run(check_data())
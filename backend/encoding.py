@@ -0,0 +1,166 @@
+import contextvars
+import gzip
+import brotli
+import msgpack
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from database import settings
+
+# Response encodings for the API routers.
+#
+# Serialization: endpoints with a response_model are already rendered to
+# JSON bytes by pydantic's Rust core (FastAPI's fast path), so they keep the
+# default response class. Endpoints producing plain dicts and lists
+# (analytics, projected decision lists) return a FastJSONResponse, which
+# skips FastAPI's jsonable_encoder pass and renders with orjson. See
+# bench_serialization.py for the numbers.
+#
+# Formats: a client sending "Accept: application/msgpack" gets MessagePack.
+# EncodingMiddleware records the choice in a context variable, so
+# FastJSONResponse packs dicts directly and etags.py can tag the variant;
+# JSON bodies from response_model routes are transcoded by the middleware.
+#
+# Compression: buffered bodies of at least COMPRESSION_MIN_BYTES are sent
+# br or gzip, whichever the client prefers. Streamed responses (exports,
+# the SSE stream) pass through untouched.
+
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK, "application/x-msgpack")
+COMPRESSIBLE = ("application/json", MSGPACK, "text/")
+BROTLI_QUALITY = 4   # close to gzip -6 in speed, noticeably smaller
+GZIP_LEVEL = 6
+
+_format = contextvars.ContextVar("response_format", default="json")
+
+def response_format():
+    return _format.get()
+
+def _default(value):
+    # msgpack has no datetime type the JSON clients would agree on
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not serializable")
+
+def pack(content):
+    return msgpack.packb(content, default=_default, datetime=False)
+
+class FastJSONResponse(JSONResponse):
+    def __init__(self, content=None, *args, **kwargs):
+        if response_format() == "msgpack":
+            self.media_type = MSGPACK
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content):
+        if self.media_type == MSGPACK:
+            return pack(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+def respond(content, response: Response):
+    # Headers set on the injected `response` (e.g. the ETag) are only merged
+    # into responses FastAPI builds itself, so carry them over
+    return FastJSONResponse(content, headers=dict(response.headers))
+
+def _qualities(header: str):
+    # {"gzip": 1.0, "br": 0.5, ...} from an Accept / Accept-Encoding header
+    result = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            result[name.strip().lower()] = q
+    return result
+
+def negotiate_format(accept: str):
+    if not accept:
+        return "json"
+    q = _qualities(accept)
+    msgpack_q = max(q.get(name, 0.0) for name in MSGPACK_TYPES)
+    json_q = max(q.get("application/json", 0.0), q.get("application/*", 0.0), q.get("*/*", 0.0))
+    return "msgpack" if msgpack_q > 0 and msgpack_q >= json_q else "json"
+
+def negotiate_encoding(accept_encoding: str):
+    q = _qualities(accept_encoding or "")
+    br_q = q.get("br", q.get("*", 0.0))
+    gzip_q = q.get("gzip", q.get("*", 0.0))
+    if br_q > 0 and br_q >= gzip_q:
+        return "br"
+    return "gzip" if gzip_q > 0 else None
+
+def compress(body: bytes, coding: str):
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+class EncodingMiddleware:
+    def __init__(self, app, minimum_size: int = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_BYTES if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = {name: value.decode("latin-1") for name, value in scope["headers"]
+                   if name in (b"accept", b"accept-encoding")}
+        wanted = negotiate_format(headers.get(b"accept"))
+        coding = negotiate_encoding(headers.get(b"accept-encoding"))
+        token = _format.set(wanted)
+        start = None
+        passthrough = False
+
+        async def send_encoded(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            if message.get("more_body", False):
+                # Streaming: send the held start and everything after as is
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            await self._send_buffered(start, message.get("body", b""), wanted, coding, send)
+
+        try:
+            await self.app(scope, receive, send_encoded)
+        finally:
+            _format.reset(token)
+
+    async def _send_buffered(self, start, body, wanted, coding, send):
+        if not body:
+            # 304s, HEAD and empty bodies go out unchanged
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+        headers = [(name, value) for name, value in start["headers"]
+                   if name not in (b"content-length", b"vary")]
+        header_map = dict(headers)
+        content_type = header_map.get(b"content-type", b"").decode("latin-1")
+        vary = [value.strip() for name, value in start["headers"] if name == b"vary" for value in value.split(b",")]
+        vary += [value for value in (b"Accept", b"Accept-Encoding") if value not in vary]
+
+        if wanted == "msgpack" and content_type.startswith("application/json"):
+            body = pack(orjson.loads(body))
+            headers = [(n, v) for n, v in headers if n != b"content-type"] + [(b"content-type", MSGPACK.encode())]
+            content_type = MSGPACK
+
+        if (coding and len(body) >= self.minimum_size and b"content-encoding" not in header_map
+                and content_type.startswith(COMPRESSIBLE)):
+            body = compress(body, coding)
+            headers.append((b"content-encoding", coding.encode()))
+
+        headers.append((b"vary", b", ".join(vary)))
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send(dict(start, headers=headers))
+        await send({"type": "http.response.body", "body": body})
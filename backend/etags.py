@@ -0,0 +1,35 @@
+from typing import Optional
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+import models, encoding
+
+# Conditional GET for per-user data.
+# The ETag is the user's data_version from user_stats, which every write in
+# routers/decisions.py bumps. A matching If-None-Match gets a 304 after one
+# primary-key lookup, before any listing or aggregate query runs.
+# MessagePack responses (see encoding.py) get their own tag; gzip/br bodies
+# share the weak tag of the uncompressed representation.
+
+async def current_etag(db: AsyncSession, user_id: int):
+    row = await db.get(models.UserStats, user_id)
+    version = row.data_version if row is not None else 0
+    suffix = "-msgpack" if encoding.response_format() == "msgpack" else ""
+    return f'W/"{user_id}-{version}{suffix}"'
+
+def _matches(if_none_match: Optional[str], etag: str):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored on both sides
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+async def check_not_modified(request: Request, response: Response, db: AsyncSession, user: models.User):
+    # Returns a ready 304 response, or None after tagging `response`
+    etag = await current_etag(db, user.id)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,109 @@
+import asyncio
+import itertools
+import json
+from datetime import datetime
+from database import settings
+import stats
+
+# In-process pub/sub for live dashboard updates (GET /analytics/stream).
+# The write handlers publish small per-user events after they commit; each
+# open stream owns a bounded queue. A subscriber that falls QUEUE_SIZE
+# events behind is dropped rather than buffered without limit: it gets a
+# final "resync" event and reconnects with a fresh snapshot.
+#
+# Events only reach streams in the process that handled the write. The
+# stream's periodic "version" heartbeat (one user_stats lookup) lets a
+# client on another worker notice that its data moved and refetch.
+
+class Subscriber:
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+class EventHub:
+    def __init__(self, queue_size: int):
+        self._queue_size = queue_size
+        self._subscribers = {}   # user_id -> set of Subscriber
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: int):
+        subscriber = Subscriber(user_id, self._queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscribers = self._subscribers.get(subscriber.user_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[subscriber.user_id]
+
+    def publish(self, user_id: int, event_type: str, data: dict):
+        subscribers = self._subscribers.get(user_id)
+        if not subscribers:
+            return
+        event = (next(self._ids), event_type, data)
+        self.published += 1
+        for subscriber in list(subscribers):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: drop it instead of holding events for it
+                subscriber.dropped = True
+                self.dropped += 1
+                self.unsubscribe(subscriber)
+
+    def stats(self):
+        return {
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def format_event(event_type: str, data: dict, event_id: int = None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, default=_default)}")
+    return "\n".join(lines) + "\n\n"
+
+async def stream(subscriber: Subscriber, hub: EventHub, snapshot: dict, current_version, heartbeat_seconds: float):
+    # SSE body: a snapshot, then events as they are published, with a
+    # version heartbeat whenever the stream has been idle for a while.
+    # current_version() is an async callable returning the user's data_version.
+    try:
+        yield "retry: 3000\n\n"
+        yield format_event("snapshot", snapshot)
+        while True:
+            try:
+                event_id, event_type, data = await asyncio.wait_for(subscriber.queue.get(), heartbeat_seconds)
+            except asyncio.TimeoutError:
+                if subscriber.dropped:
+                    yield format_event("resync", {"reason": "slow consumer"})
+                    return
+                yield format_event("version", {"version": await current_version()})
+                continue
+            yield format_event(event_type, data, event_id)
+            if subscriber.dropped and subscriber.queue.empty():
+                yield format_event("resync", {"reason": "slow consumer"})
+                return
+    finally:
+        hub.unsubscribe(subscriber)
+
+hub = EventHub(settings.EVENT_QUEUE_SIZE)
+
+def publish_delta(user_id: int, event_type: str, totals: dict, **data):
+    # totals: the user_stats row returned by the stats.* helpers, so the
+    # event carries the new aggregates without another query
+    hub.publish(user_id, event_type, dict(
+        data, version=totals["data_version"], overview=stats.overview_of(totals)
+    ))
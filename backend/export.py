@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import select
+import models
+from database import AsyncSessionLocal, settings
+
+# Streaming export of a user's decisions.
+# Decisions are read through a server-side cursor in chunks of
+# EXPORT_CHUNK_SIZE; the children of each chunk are fetched with one IN query
+# per table on a second connection, so memory stays flat however many rows
+# the user has.
+
+DECISION_FIELDS = (
+    "id", "user_id", "title", "category", "description", "confidence_score",
+    "expected_outcome", "decision_date", "review_date", "created_at",
+    "decision_quality", "outcome_quality",
+)
+OPTION_FIELDS = ("id", "option_name", "reasoning")
+ASSUMPTION_FIELDS = ("id", "assumption_text", "status")
+REVIEW_FIELDS = ("id", "outcome_rating", "outcome_notes", "lessons_learned", "reviewed_at")
+
+CSV_HEADER = DECISION_FIELDS + tuple(f"review_{name}" for name in REVIEW_FIELDS[1:]) + ("options", "assumptions")
+
+def _columns(model, names):
+    return [getattr(model, name) for name in names]
+
+def _jsonable(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _row(mapping, names):
+    return {name: _jsonable(mapping[name]) for name in names}
+
+async def _children(db, decision_ids):
+    options, assumptions, reviews = {}, {}, {}
+    result = await db.execute(
+        select(models.Option.decision_id, *_columns(models.Option, OPTION_FIELDS))
+        .filter(models.Option.decision_id.in_(decision_ids))
+        .order_by(models.Option.id)
+    )
+    for row in result.mappings():
+        options.setdefault(row["decision_id"], []).append(_row(row, OPTION_FIELDS))
+    result = await db.execute(
+        select(models.Assumption.decision_id, *_columns(models.Assumption, ASSUMPTION_FIELDS))
+        .filter(models.Assumption.decision_id.in_(decision_ids))
+        .order_by(models.Assumption.id)
+    )
+    for row in result.mappings():
+        assumptions.setdefault(row["decision_id"], []).append(_row(row, ASSUMPTION_FIELDS))
+    result = await db.execute(
+        select(models.Review.decision_id, *_columns(models.Review, REVIEW_FIELDS))
+        .filter(models.Review.decision_id.in_(decision_ids))
+    )
+    for row in result.mappings():
+        reviews[row["decision_id"]] = _row(row, REVIEW_FIELDS)
+    return options, assumptions, reviews
+
+async def iter_decision_chunks(user_id: int, sessions=AsyncSessionLocal):
+    # Yields lists of decision dicts with nested options/assumptions/review.
+    # `sessions` is the session factory (the router passes the read one).
+    async with sessions() as db, sessions() as children_db:
+        result = await db.stream(
+            select(*_columns(models.Decision, DECISION_FIELDS))
+            .filter(models.Decision.user_id == user_id)
+            .order_by(models.Decision.id)
+            .execution_options(yield_per=settings.EXPORT_CHUNK_SIZE)
+        )
+        async for partition in result.mappings().partitions():
+            decisions = [_row(row, DECISION_FIELDS) for row in partition]
+            options, assumptions, reviews = await _children(children_db, [d["id"] for d in decisions])
+            for d in decisions:
+                d["options"] = options.get(d["id"], [])
+                d["assumptions"] = assumptions.get(d["id"], [])
+                d["review"] = reviews.get(d["id"])
+            yield decisions
+
+async def stream_ndjson(user_id: int, sessions=AsyncSessionLocal):
+    async for decisions in iter_decision_chunks(user_id, sessions):
+        yield "".join(json.dumps(d) + "\n" for d in decisions)
+
+async def stream_csv(user_id: int, sessions=AsyncSessionLocal):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    async for decisions in iter_decision_chunks(user_id, sessions):
+        for d in decisions:
+            review = d["review"] or {}
+            writer.writerow(
+                [d[name] for name in DECISION_FIELDS]
+                + [review.get(name) for name in REVIEW_FIELDS[1:]]
+                + [json.dumps(d["options"]), json.dumps(d["assumptions"])]
+            )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,187 @@
+import asyncio
+import contextlib
+import os
+import tempfile
+import traceback
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from database import settings
+
+# Leader election between worker processes (uvicorn --workers N).
+# Exactly one process holds the leader lock and runs the background jobs;
+# the others keep polling and take over when it dies. Schema setup runs in
+# every worker before it serves, one at a time (startup_lock()).
+#
+# Postgres: a session-level advisory lock on a dedicated connection. The
+# server drops it as soon as that connection goes away, so a crashed or
+# killed leader is replaced on the next poll.
+# Anything else (SQLite): an exclusive lock on a file next to the database,
+# released by the OS when the holding process exits.
+
+ADVISORY_LOCK_KEY = 0x44415301  # arbitrary, but fixed for every worker
+STARTUP_LOCK_KEY = 0x44415302
+
+class AdvisoryLock:
+    def __init__(self, url: str, key: int = ADVISORY_LOCK_KEY):
+        # Own engine so the lock never occupies a slot in the request pool
+        self._engine = create_async_engine(url, poolclass=NullPool)
+        self._key = key
+        self._conn = None
+
+    async def acquire(self):
+        conn = await self._engine.connect()
+        try:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            acquired = (await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self._key})).scalar()
+        except Exception:
+            await conn.close()
+            raise
+        if not acquired:
+            await conn.close()
+            return False
+        self._conn = conn
+        return True
+
+    async def alive(self):
+        try:
+            await self._conn.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            return False
+
+    async def release(self):
+        if self._conn is not None:
+            try:
+                await self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self._key})
+            except Exception:
+                pass
+            await self._conn.close()
+            self._conn = None
+
+    async def dispose(self):
+        await self._engine.dispose()
+
+class FileLock:
+    def __init__(self, path: str):
+        self._path = path
+        self._file = None
+
+    def _try_lock(self, file):
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    async def acquire(self):
+        file = open(self._path, "a+")
+        try:
+            file.seek(0)
+            self._try_lock(file)
+        except OSError:
+            file.close()
+            return False
+        file.truncate(0)
+        file.write(str(os.getpid()))
+        file.flush()
+        self._file = file
+        return True
+
+    async def alive(self):
+        return self._file is not None
+
+    async def release(self):
+        if self._file is not None:
+            # Closing the descriptor releases the lock on every platform
+            self._file.close()
+            self._file = None
+
+    async def dispose(self):
+        pass
+
+def _default_lock_path(url: str):
+    database = make_url(url).database
+    if database and database != ":memory:":
+        return os.path.abspath(database) + ".leader"
+    return os.path.join(tempfile.gettempdir(), "decision-analytics.leader")
+
+def make_lock(url: str, key: int = ADVISORY_LOCK_KEY, suffix: str = ""):
+    if make_url(url).get_backend_name() == "postgresql":
+        return AdvisoryLock(url, key)
+    return FileLock((settings.LEADER_LOCK_FILE or _default_lock_path(url)) + suffix)
+
+@contextlib.asynccontextmanager
+async def startup_lock(poll_seconds: float = 0.2):
+    # Serializes startup work (schema setup) between workers starting at
+    # the same time; released as soon as the block is done
+    lock = make_lock(settings.DATABASE_URL, STARTUP_LOCK_KEY, ".startup")
+    try:
+        while not await lock.acquire():
+            await asyncio.sleep(poll_seconds)
+        yield
+    finally:
+        await lock.release()
+        await lock.dispose()
+
+class LeaderElection:
+    def __init__(self, on_elected, on_demoted, poll_seconds: float):
+        self._on_elected = on_elected
+        self._on_demoted = on_demoted
+        self._poll_seconds = poll_seconds
+        self._lock = make_lock(settings.DATABASE_URL)
+        self._task = None
+        self.is_leader = False
+
+    async def _attempt(self):
+        if self.is_leader:
+            if await self._lock.alive():
+                return
+            print(f"--- [LEADER] Worker {os.getpid()} lost the leader lock ---")
+            await self._demote()
+        try:
+            acquired = await self._lock.acquire()
+        except Exception:
+            # Database unreachable: stay a follower and retry on the next poll
+            traceback.print_exc()
+            return
+        if acquired:
+            self.is_leader = True
+            print(f"--- [LEADER] Worker {os.getpid()} is now the leader ---")
+            try:
+                await self._on_elected()
+            except Exception:
+                traceback.print_exc()
+                await self._demote()
+
+    async def _demote(self):
+        self.is_leader = False
+        try:
+            await self._on_demoted()
+        except Exception:
+            traceback.print_exc()
+        await self._lock.release()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._poll_seconds)
+            await self._attempt()
+
+    async def start(self):
+        # The first attempt is awaited, so a lone worker is ready on startup
+        await self._attempt()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.is_leader:
+            await self._demote()
+        await self._lock.dispose()
@@ -1,7 +1,10 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from routers import auth, decisions, analytics
-from database import engine, Base, AsyncSessionLocal
+from database import engine, read_engine
+import admission, encoding
 
 app = FastAPI(
     title="Decision Analytics System",
@@ -15,55 +18,131 @@ origins = [
     "http://localhost:8000",
 ]
 
+# MessagePack negotiation and compression (encoding.py), innermost so the
+# chosen format is known to the handlers and compression time is measured
+app.add_middleware(encoding.EncodingMiddleware)
+
+# Rate limits and load shedding (admission.py). Added before CORS so it runs
+# inside it (rejections stay readable by the browser) and inside the
+# metrics middleware (shed requests are counted and timed).
+app.add_middleware(admission.AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-DB-Queries", "Server-Timing", "Retry-After"],
 )
 
+# Per-request DB instrumentation (metrics.py). Routes are labelled by their
+# template, not the raw path, to keep the series count bounded.
+import metrics
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    token = metrics.start_request()
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        stats = metrics.finish_request(token)
+    elapsed = time.perf_counter() - started
+    route = request.scope.get("route")
+    route_path = route.path if route is not None else "unmatched"
+    metrics.observe_request(
+        request.method, route_path, response.status_code, elapsed, stats, settings.N_PLUS_ONE_THRESHOLD
+    )
+    response.headers["X-DB-Queries"] = str(stats.queries)
+    response.headers["Server-Timing"] = (
+        f"db;dur={stats.db_seconds * 1000:.1f}, app;dur={elapsed * 1000:.1f}"
+    )
+    return response
+
 # Include Routers
 app.include_router(auth.router)
 app.include_router(decisions.router)
 app.include_router(analytics.router)
 
-# Scheduler for Review Reminders
+# Review reminders fire from an in-memory deadline heap (reminders.py).
+# Review dates written on other workers reach it through the outbox poll;
+# the hourly resync is only a safety net that fills gaps in the heap from
+# the pending-review index.
+#
+# Every worker sets up the schema before serving. With several workers
+# only the elected leader (leader.py) runs the reminder loop and the
+# scheduled jobs; followers just serve requests and take over if the
+# leader dies.
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from sqlalchemy import select
-from datetime import datetime
-import models
+from database import settings
+import auth_utils, reminders, rollups, leader, scoring, events, archive, migrations
 
 scheduler = AsyncIOScheduler()
 
-async def check_due_reviews():
-    # In a real app, this would send emails.
-    # Here we just log or tag them.
-    # For MVP: We print to console.
-    async with AsyncSessionLocal() as db:
-        result = await db.execute(
-            select(models.Decision.title, models.User.email)
-            .join(models.User)
-            .filter(
-                models.Decision.review_date <= datetime.utcnow(),
-                models.Decision.review == None
-            )
-        )
-        due_decisions = result.fetchall()
-        if due_decisions:
-            print(f"--- [REMINDER] Found {len(due_decisions)} decisions due for review! ---")
-            for title, email in due_decisions:
-                print(f"User: {email} | Decision: {title}")
+async def on_elected():
+    await reminders.scheduler.start()
+    # Finish an interrupted re-score, or start one after a rule change
+    scheduler.add_job(scoring.run_pending, id="rescore", replace_existing=True)
+    scheduler.resume()
+
+async def on_demoted():
+    scheduler.pause()
+    await reminders.scheduler.stop()
+
+election = leader.LeaderElection(on_elected, on_demoted, settings.LEADER_POLL_SECONDS)
+
+pools = {"primary": engine.pool}
+if read_engine is not engine:
+    pools["read"] = read_engine.pool
+metrics.registry.register_collector(metrics.pool_collector(pools))
+metrics.registry.register_collector(metrics.stats_collector(
+    "principal_cache", "Principal cache", auth_utils.principal_cache.stats,
+    counters=("hits", "misses", "evictions")
+))
+metrics.registry.register_collector(metrics.stats_collector(
+    "password_pool", "Password hashing pool", auth_utils.password_pool.stats,
+    counters=("completed", "failed", "rejected", "wait_seconds_total", "run_seconds_total")
+))
+metrics.registry.register_collector(metrics.stats_collector(
+    "reminders", "Review reminders", lambda: {"sent": reminders.scheduler.sent}, counters=("sent",)
+))
+metrics.registry.register_collector(metrics.stats_collector(
+    "events", "Live analytics stream", events.hub.stats, counters=("published", "dropped")
+))
+metrics.registry.register_collector(metrics.stats_collector(
+    "admission", "Admission control", lambda: admission.limiter.stats() | admission.buckets.stats(),
+    counters=("admitted",)
+))
+metrics.registry.register_collector(metrics.stats_collector(
+    "worker", "Worker role", lambda: {"is_leader": int(election.is_leader)}
+))
 
 @app.on_event("startup")
 async def startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    
-    # Start Scheduler
-    scheduler.add_job(check_due_reviews, "interval", minutes=60)
-    scheduler.start()
+    async with leader.startup_lock():
+        async with engine.begin() as conn:
+            await migrations.create_schema(conn)
+    # Jobs are registered everywhere but only run while this worker leads
+    scheduler.add_job(reminders.scheduler.poll_outbox, "interval", seconds=settings.REMINDER_POLL_SECONDS,
+                      id="reminder-outbox", replace_existing=True)
+    scheduler.add_job(reminders.scheduler.resync, "interval", minutes=settings.REMINDER_RESYNC_MINUTES,
+                      id="reminder-resync", replace_existing=True)
+    scheduler.add_job(rollups.run_compaction, "cron", hour=3, id="rollup-compaction", replace_existing=True)
+    if settings.ARCHIVE_AFTER_MONTHS > 0:
+        scheduler.add_job(archive.archive, "cron", hour=4, id="archive", replace_existing=True)
+    scheduler.start(paused=True)
+    await election.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await election.stop()
+    scheduler.shutdown(wait=False)
+    auth_utils.password_pool.shutdown()
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/")
 async def root():
@@ -0,0 +1,231 @@
+import contextvars
+import re
+import time
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Per-request database instrumentation and a tiny Prometheus registry.
+# SQLAlchemy cursor events count statements and DB time into the current
+# request's RequestStats (a context variable set by the middleware in
+# main.py); the middleware then folds them into per-route series that
+# /metrics renders in the Prometheus text format.
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + body + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    def __init__(self, name: str, kind: str, help: str):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.values = {}
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, labels, value
+
+class Counter(Metric):
+    def __init__(self, name: str, help: str):
+        super().__init__(name, "counter", help)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    def __init__(self, name: str, help: str):
+        super().__init__(name, "gauge", help)
+
+    def set(self, value, **labels):
+        self.values[tuple(sorted(labels.items()))] = value
+
+    def set_max(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        self.values[key] = max(self.values.get(key, 0), value)
+
+class Histogram(Metric):
+    def __init__(self, name: str, help: str, buckets=DURATION_BUCKETS):
+        super().__init__(name, "histogram", help)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        entry = self.values.get(key)
+        if entry is None:
+            entry = self.values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry["counts"][i] += 1
+                break
+        entry["sum"] += value
+        entry["count"] += 1
+
+    def samples(self):
+        for labels, entry in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry["counts"]):
+                cumulative += count
+                yield self.name + "_bucket", labels + (("le", _format_value(bound)),), cumulative
+            yield self.name + "_sum", labels, entry["sum"]
+            yield self.name + "_count", labels, entry["count"]
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def add(self, metric: Metric):
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        # collector() returns Metric objects built fresh at scrape time
+        self.collectors.append(collector)
+
+    def render(self):
+        lines = []
+        metrics = list(self.metrics)
+        for collector in self.collectors:
+            metrics.extend(collector())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+http_requests = registry.add(Counter("http_requests_total", "HTTP requests by route and status"))
+http_duration = registry.add(Histogram("http_request_duration_seconds", "HTTP request latency by route"))
+db_queries = registry.add(Counter("db_queries_total", "SQL statements executed, by route"))
+db_seconds = registry.add(Counter("db_query_seconds_total", "Time spent executing SQL, by route"))
+db_slowest = registry.add(Gauge("db_slowest_query_seconds", "Slowest single statement seen, by route"))
+db_n_plus_one = registry.add(Counter("db_n_plus_one_requests_total", "Requests repeating one statement shape, by route"))
+pool_wait = registry.add(Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection"))
+
+# Request-scoped statement accounting
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "slowest_seconds", "slowest_statement", "shapes")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement = None
+        self.shapes = {}
+
+    def repeated_shapes(self, threshold: int):
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+_current = contextvars.ContextVar("request_db_stats", default=None)
+
+# Expanded IN lists vary in length; collapse them so they count as one shape
+_PARAM_LIST = re.compile(r"\(\s*(?:\?|\$\d+|%s|%\(\w+\)s)(?:\s*,\s*(?:\?|\$\d+|%s|%\(\w+\)s))*\s*\)")
+
+def statement_shape(statement: str):
+    return _PARAM_LIST.sub("(?)", " ".join(statement.split()))
+
+def start_request():
+    return _current.set(RequestStats())
+
+def finish_request(token):
+    stats = _current.get()
+    _current.reset(token)
+    return stats
+
+def instrument_engine(engine, slow_query_seconds: float):
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+            shape = statement_shape(statement)
+            stats.shapes[shape] = stats.shapes.get(shape, 0) + 1
+            if elapsed > stats.slowest_seconds:
+                stats.slowest_seconds = elapsed
+                stats.slowest_statement = shape
+        if elapsed >= slow_query_seconds:
+            print(f"--- [DB] Slow statement ({elapsed * 1000:.0f} ms): {statement_shape(statement)[:500]}")
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+def observe_request(method: str, route: str, status: int, elapsed: float, stats: RequestStats,
+                    n_plus_one_threshold: int):
+    http_requests.inc(method=method, route=route, status=status)
+    http_duration.observe(elapsed, route=route)
+    if stats is None or not stats.queries:
+        return
+    db_queries.inc(stats.queries, route=route)
+    db_seconds.inc(stats.db_seconds, route=route)
+    db_slowest.set_max(stats.slowest_seconds, route=route)
+    repeated = stats.repeated_shapes(n_plus_one_threshold)
+    if repeated:
+        db_n_plus_one.inc(route=route)
+        shape, count = max(repeated.items(), key=lambda item: item[1])
+        print(f"--- [DB] Possible N+1 on {method} {route}: {count}x {shape[:300]}")
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    # Records how long each checkout waited for a free connection
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait.observe(time.perf_counter() - started)
+
+def pool_collector(pools):
+    # pools: {"primary": engine.pool, ...}, labelled by name
+    def collect():
+        size = Gauge("db_pool_size", "Configured pool size")
+        checked_out = Gauge("db_pool_checked_out", "Connections currently checked out")
+        overflow = Gauge("db_pool_overflow", "Connections open beyond the pool size")
+        for name, pool in pools.items():
+            if isinstance(pool, AsyncAdaptedQueuePool):
+                size.set(pool.size(), pool=name)
+                checked_out.set(pool.checkedout(), pool=name)
+                overflow.set(max(pool.overflow(), 0), pool=name)
+        return [size, checked_out, overflow]
+    return collect
+
+def stats_collector(prefix: str, help: str, read_stats, counters=()):
+    # Exposes a dict of numbers (e.g. PrincipalCache.stats()) as gauges/counters
+    def collect():
+        metrics = []
+        for name, value in read_stats().items():
+            if name in counters:
+                suffix = "" if name.endswith("_total") else "_total"
+                metric = Counter(f"{prefix}_{name}{suffix}", f"{help}: {name}")
+                metric.inc(value)
+            else:
+                metric = Gauge(f"{prefix}_{name}", f"{help}: {name}")
+                metric.set(value)
+            metrics.append(metric)
+        return metrics
+    return collect
@@ -0,0 +1,85 @@
+from datetime import datetime
+from sqlalchemy import exists, inspect, insert, literal, select, text
+import models, search, stats
+from database import Base
+
+# Schema setup and in-place upgrades.
+#
+# create_all only creates missing tables; it never changes one that already
+# exists. Anything a later version needs on an existing table (new columns,
+# backfills) is a step below. Each step runs once per database and is
+# recorded in schema_migrations; steps are written to be safe to re-run, so
+# a fresh database (where create_all already made the columns) just records
+# them. Everything runs in the caller's transaction, before serving.
+
+def _backfill_decision_dates(conn):
+    # Keyset pagination orders on decision_date; PUT used to accept null
+    conn.execute(text("UPDATE decisions SET decision_date = created_at WHERE decision_date IS NULL"))
+
+def _columns(conn, table: str):
+    return {column["name"] for column in inspect(conn).get_columns(table)}
+
+def _add_search_vector(conn):
+    # Postgres only: decisions.search_vector and its GIN index. SQLite
+    # searches the decision_search FTS5 table that create_all makes, so
+    # there is nothing to change and the step is just recorded.
+    if not models.SEARCH_VECTOR:
+        return
+    if "search_vector" not in _columns(conn, "decisions"):
+        conn.execute(text("ALTER TABLE decisions ADD COLUMN search_vector TSVECTOR"))
+    for index in models.Decision.__table__.indexes:
+        if index.name == "ix_decisions_search_vector":
+            index.create(conn, checkfirst=True)
+
+def _index_existing_decisions(conn):
+    # Search documents for decisions written before search existed, on
+    # either backend (search.backfill only touches rows without one)
+    indexed = search.backfill(conn)
+    if indexed:
+        print(f"--- [SCHEMA] Indexed {indexed} existing decision(s) for search ---")
+
+def _add_scoring_version(conn):
+    # NULL means "scored before versioning"; scoring.run_pending re-scores
+    # those rows on the next start
+    if "scoring_version" not in _columns(conn, "decisions"):
+        conn.execute(text("ALTER TABLE decisions ADD COLUMN scoring_version INTEGER"))
+
+def _backfill_user_stats(conn):
+    # Registration creates the row; users from before that get theirs here,
+    # so /analytics/overview never has to write
+    missing = stats._grouped_query().where(
+        ~exists().where(models.UserStats.user_id == models.User.id)
+    ).add_columns(literal(1).label("data_version"))
+    conn.execute(insert(models.UserStats.__table__).from_select(
+        ["user_id", *stats.STAT_COLUMNS, "data_version"], missing
+    ))
+
+# Append only: names are the record of what has been applied
+STEPS = [
+    ("0001_backfill_decision_dates", _backfill_decision_dates),
+    ("0002_decisions_search_vector", _add_search_vector),
+    ("0003_decisions_scoring_version", _add_scoring_version),
+    ("0004_backfill_user_stats", _backfill_user_stats),
+    ("0005_index_existing_decisions", _index_existing_decisions),
+]
+
+def upgrade(conn):
+    applied = set(conn.execute(select(models.SchemaMigration.name)).scalars())
+    for name, step in STEPS:
+        if name in applied:
+            continue
+        step(conn)
+        conn.execute(insert(models.SchemaMigration).values(name=name, applied_at=datetime.utcnow()))
+        print(f"--- [SCHEMA] Applied {name} ---")
+
+def _create_missing_indexes(conn):
+    # Like tables, create_all skips indexes declared on a table that already
+    # exists; a cheap catalog check per index on every start
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+async def create_schema(conn):
+    await conn.run_sync(Base.metadata.create_all)
+    await conn.run_sync(upgrade)
+    await conn.run_sync(_create_missing_indexes)
@@ -1,7 +1,14 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, Float, Index
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.engine import make_url
 from datetime import datetime
-from database import Base
+from database import Base, settings
+
+# Postgres keeps each decision's search document in decisions.search_vector;
+# SQLite has no such column and searches the decision_search FTS5 table
+# (search.py) instead
+SEARCH_VECTOR = make_url(settings.DATABASE_URL).get_backend_name() == "postgresql"
 
 class User(Base):
     __tablename__ = "users"
@@ -31,17 +38,36 @@ class Decision(Base):
     # Derived fields for logic later
     decision_quality = Column(String, nullable=True) # good / poor
     outcome_quality = Column(String, nullable=True) # good / poor
+    # Version of the scoring.py rule that produced the two fields above
+    scoring_version = Column(Integer, nullable=True)
+
+    if SEARCH_VECTOR:
+        # Full-text document, maintained by search.refresh()
+        search_vector = deferred(Column(TSVECTOR(), nullable=True))
 
     owner = relationship("User", back_populates="decisions")
     options = relationship("Option", back_populates="decision")
     assumptions = relationship("Assumption", back_populates="decision")
     review = relationship("Review", back_populates="decision", uselist=False)
 
+    __table_args__ = (
+        # Keyset pagination: GET /decisions/ walks (decision_date, id) per user
+        Index("ix_decisions_user_date_id", "user_id", "decision_date", "id"),
+        # Review reminders: only unreviewed decisions with a review date
+        Index(
+            "ix_decisions_pending_review",
+            "review_date",
+            postgresql_where=review_date.isnot(None) & decision_quality.is_(None),
+            sqlite_where=review_date.isnot(None) & decision_quality.is_(None),
+        ),
+        *([Index("ix_decisions_search_vector", "search_vector", postgresql_using="gin")] if SEARCH_VECTOR else []),
+    )
+
 class Option(Base):
     __tablename__ = "options"
 
     id = Column(Integer, primary_key=True, index=True)
-    decision_id = Column(Integer, ForeignKey("decisions.id"))
+    decision_id = Column(Integer, ForeignKey("decisions.id"), index=True)
     option_name = Column(String)
     reasoning = Column(Text, nullable=True)
 
@@ -51,7 +77,7 @@ class Assumption(Base):
     __tablename__ = "assumptions"
 
     id = Column(Integer, primary_key=True, index=True)
-    decision_id = Column(Integer, ForeignKey("decisions.id"))
+    decision_id = Column(Integer, ForeignKey("decisions.id"), index=True)
     assumption_text = Column(String)
     status = Column(String, default="pending") # pending / true / false
 
@@ -61,10 +87,70 @@ class Review(Base):
     __tablename__ = "reviews"
 
     id = Column(Integer, primary_key=True, index=True)
-    decision_id = Column(Integer, ForeignKey("decisions.id"))
+    decision_id = Column(Integer, ForeignKey("decisions.id"), index=True)
     outcome_rating = Column(Integer) # 1-5
     outcome_notes = Column(Text, nullable=True)
     lessons_learned = Column(Text, nullable=True)
     reviewed_at = Column(DateTime, default=datetime.utcnow)
 
     decision = relationship("Decision", back_populates="review")
+
+class UserStats(Base):
+    __tablename__ = "user_stats"
+
+    # Running totals behind /analytics/overview, kept in step with the
+    # decision write paths (see stats.py)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_decisions = Column(Integer, default=0, nullable=False)
+    reviewed_decisions = Column(Integer, default=0, nullable=False)
+    confidence_sum = Column(Integer, default=0, nullable=False)
+    review_count = Column(Integer, default=0, nullable=False)
+    outcome_sum = Column(Integer, default=0, nullable=False)
+    # Bumped by every decision write; the ETag of the user's read endpoints
+    data_version = Column(Integer, default=0, nullable=False)
+
+class DecisionRollup(Base):
+    __tablename__ = "decision_rollups"
+
+    # Time-series buckets per user and category (see rollups.py). Writes add
+    # to "day" buckets; compaction folds old days into "month" buckets.
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    category = Column(String, primary_key=True)
+    granularity = Column(String, primary_key=True)  # day / month
+    bucket_start = Column(DateTime, primary_key=True)
+    decisions = Column(Integer, default=0, nullable=False)
+    confidence_sum = Column(Integer, default=0, nullable=False)
+    reviews = Column(Integer, default=0, nullable=False)
+    outcome_sum = Column(Integer, default=0, nullable=False)
+
+class RescoreRun(Base):
+    __tablename__ = "rescore_runs"
+
+    # Progress of a batch re-scoring pass (see scoring.py); a run resumes
+    # after last_decision_id
+    id = Column(Integer, primary_key=True, index=True)
+    rule_version = Column(Integer, nullable=False)
+    status = Column(String, default="running", nullable=False)  # running / done / abandoned
+    last_decision_id = Column(Integer, default=0, nullable=False)
+    total = Column(Integer, default=0, nullable=False)
+    processed = Column(Integer, default=0, nullable=False)
+    changed = Column(Integer, default=0, nullable=False)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+class ReminderOutbox(Base):
+    __tablename__ = "reminder_outbox"
+
+    # Review dates written by workers that don't run the reminder heap;
+    # the leader drains this table (see reminders.py)
+    id = Column(Integer, primary_key=True)
+    decision_id = Column(Integer, nullable=False)
+    review_date = Column(DateTime, nullable=True)
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+
+    # Upgrade steps already applied to this database (see migrations.py)
+    name = Column(String, primary_key=True)
+    applied_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,19 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+# Opaque keyset cursors for listing decisions newest-first.
+# A cursor is the (decision_date, id) of the last row on the previous page.
+
+def encode_cursor(decision_date: Optional[datetime], id: int) -> str:
+    raw = json.dumps([decision_date.isoformat() if decision_date else None, id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        decision_date, id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(decision_date) if decision_date is not None else None, int(id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
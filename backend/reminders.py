@@ -0,0 +1,221 @@
+import asyncio
+import heapq
+import traceback
+from datetime import datetime, timezone
+from sqlalchemy import select, insert, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from database import AsyncSessionLocal
+
+# Event-driven review reminders.
+# Pending review deadlines live in an in-memory min-heap; the run loop sleeps
+# until the earliest one is due. The decision write paths keep the heap in
+# step via schedule()/cancel(); load() reads the pending set from the
+# ix_decisions_pending_review partial index at startup, and an infrequent
+# resync() fills in anything those calls missed.
+#
+# Only the leader worker (leader.py) runs the heap. Writes handled by any
+# other worker go through notify(), which queues the new review date in
+# reminder_outbox as part of the write; the leader drains it every
+# REMINDER_POLL_SECONDS with poll_outbox().
+
+MAX_SLEEP_SECONDS = 300
+OUTBOX_BATCH = 1000
+
+def _utc_naive(value: datetime):
+    # Decisions store naive UTC; clients may send aware datetimes
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+async def send_reminders(decision_ids):
+    # In a real app, this would send emails.
+    # For MVP: We print to console.
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.Decision.title, models.User.email)
+            .join(models.User)
+            .filter(
+                models.Decision.id.in_(decision_ids),
+                models.Decision.decision_quality.is_(None)
+            )
+        )
+        due_decisions = result.fetchall()
+    if due_decisions:
+        print(f"--- [REMINDER] Found {len(due_decisions)} decisions due for review! ---")
+        for title, email in due_decisions:
+            print(f"User: {email} | Decision: {title}")
+    return len(due_decisions)
+
+async def notify(db: AsyncSession, changes):
+    # changes: (decision_id, review_date) pairs, in the write's transaction.
+    # The leader schedules them itself after commit (schedule()); anywhere
+    # else they go to the outbox. Reviews need nothing: send_reminders()
+    # skips decisions that have been reviewed.
+    if scheduler.running:
+        return
+    rows = [dict(decision_id=decision_id, review_date=review_date) for decision_id, review_date in changes]
+    if rows:
+        await db.execute(insert(models.ReminderOutbox), rows)
+
+class ReviewScheduler:
+    def __init__(self):
+        self._heap = []        # (due_at, decision_id); stale entries are skipped lazily
+        self._due = {}         # decision_id -> due_at currently scheduled
+        self._reminded = {}    # decision_id -> due_at already reminded about
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.sent = 0
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def schedule(self, decision_id: int, review_date):
+        if not self.running:
+            return
+        if review_date is None:
+            self.cancel(decision_id)
+            return
+        due_at = _utc_naive(review_date)
+        if self._due.get(decision_id) == due_at or self._reminded.get(decision_id) == due_at:
+            return
+        self._reminded.pop(decision_id, None)
+        self._due[decision_id] = due_at
+        heapq.heappush(self._heap, (due_at, decision_id))
+        if self._heap[0] == (due_at, decision_id):
+            self._wakeup.set()
+
+    def cancel(self, decision_id: int):
+        self._due.pop(decision_id, None)
+        self._reminded.pop(decision_id, None)
+
+    async def _read_pending(self):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(models.Decision.id, models.Decision.review_date)
+                .filter(
+                    models.Decision.review_date.isnot(None),
+                    models.Decision.decision_quality.is_(None)
+                )
+            )
+            return {decision_id: _utc_naive(review_date) for decision_id, review_date in result}
+
+    async def load(self):
+        before = dict(self._due)
+        pending = await self._read_pending()
+        # Keep anything schedule()d while the query was in flight
+        for decision_id, due_at in self._due.items():
+            if before.get(decision_id) != due_at:
+                pending[decision_id] = due_at
+
+        self._reminded = {
+            decision_id: due_at for decision_id, due_at in self._reminded.items()
+            if pending.get(decision_id) == due_at
+        }
+        self._due = {
+            decision_id: due_at for decision_id, due_at in pending.items()
+            if self._reminded.get(decision_id) != due_at
+        }
+        self._heap = [(due_at, decision_id) for decision_id, due_at in self._due.items()]
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    async def resync(self):
+        # Periodic safety net for writes that never reached schedule() or
+        # cancel(). Unlike load() it leaves the heap alone: it only pushes
+        # deadlines that are missing and forgets ones no longer pending.
+        if not self.running:
+            return
+        before = dict(self._due)
+        pending = await self._read_pending()
+        added = 0
+        for decision_id, due_at in pending.items():
+            if self._due.get(decision_id) != due_at and self._reminded.get(decision_id) != due_at:
+                self.schedule(decision_id, due_at)
+                added += 1
+        for decision_id, due_at in before.items():
+            # Untouched since the query started and gone from the pending set
+            if decision_id not in pending and self._due.get(decision_id) == due_at:
+                del self._due[decision_id]
+        for decision_id in [d for d in self._reminded if d not in pending]:
+            del self._reminded[decision_id]
+        if added:
+            print(f"--- [REMINDER] Resync scheduled {added} missed review date(s) ---")
+
+    async def poll_outbox(self):
+        # Changes queued by other workers, oldest first
+        if not self.running:
+            return
+        async with AsyncSessionLocal() as db:
+            while True:
+                result = await db.execute(
+                    select(models.ReminderOutbox.id, models.ReminderOutbox.decision_id,
+                           models.ReminderOutbox.review_date)
+                    .order_by(models.ReminderOutbox.id)
+                    .limit(OUTBOX_BATCH)
+                )
+                rows = result.all()
+                if not rows:
+                    return
+                for _, decision_id, review_date in rows:
+                    self.schedule(decision_id, review_date)
+                # By id, not a range: a lower id may still be uncommitted
+                await db.execute(delete(models.ReminderOutbox).where(models.ReminderOutbox.id.in_([row.id for row in rows])))
+                await db.commit()
+                if len(rows) < OUTBOX_BATCH:
+                    return
+
+    def _pop_due(self, now: datetime):
+        due_ids = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, decision_id = heapq.heappop(self._heap)
+            if self._due.get(decision_id) != due_at:
+                continue
+            del self._due[decision_id]
+            self._reminded[decision_id] = due_at
+            due_ids.append(decision_id)
+        return due_ids
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            due_ids = self._pop_due(datetime.utcnow())
+            if due_ids:
+                try:
+                    self.sent += await send_reminders(due_ids)
+                except Exception:
+                    traceback.print_exc()
+                continue
+
+            while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            timeout = MAX_SLEEP_SECONDS
+            if self._heap:
+                delay = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+                timeout = min(max(delay, 0), MAX_SLEEP_SECONDS)
+            # asyncio.timeout rather than wait_for: wait_for runs the wait in
+            # an inner task, and a stop() landing as that task is woken
+            # could leave the loop stuck in cancellation
+            try:
+                async with asyncio.timeout(timeout):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+
+    async def start(self):
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+        await self.load()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+scheduler = ReviewScheduler()
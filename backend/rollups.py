@@ -0,0 +1,234 @@
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from database import AsyncSessionLocal, settings
+
+# Time-series rollups for trend charts.
+# Decisions count towards the day of their decision_date, reviews towards
+# the day they were recorded. The write paths upsert deltas into "day"
+# buckets in their own transaction; compact() later folds days older than
+# ROLLUP_DAILY_RETENTION_DAYS into "month" buckets, and /analytics/timeseries
+# reads only this table.
+
+GRANULARITIES = ("day", "week", "month")
+KEY_COLUMNS = ("user_id", "category", "granularity", "bucket_start")
+MEASURES = ("decisions", "confidence_sum", "reviews", "outcome_sum")
+
+def bucket_start(when: datetime, granularity: str):
+    day = datetime(when.year, when.month, when.day)
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    return datetime(when.year, when.month, 1)
+
+def decision_delta(user_id: int, category, decision_date: datetime, confidence_score, sign: int = 1):
+    return {
+        "user_id": user_id,
+        "category": category or "",
+        "granularity": "day",
+        "bucket_start": bucket_start(decision_date, "day"),
+        "decisions": sign,
+        "confidence_sum": sign * (confidence_score or 0),
+    }
+
+def review_delta(user_id: int, category, reviewed_at: datetime, outcome_rating, sign: int = 1):
+    return {
+        "user_id": user_id,
+        "category": category or "",
+        "granularity": "day",
+        "bucket_start": bucket_start(reviewed_at, "day"),
+        "reviews": sign,
+        "outcome_sum": sign * (outcome_rating or 0),
+    }
+
+def edit_deltas(user_id: int, old, new: models.Decision):
+    # `old` carries the pre-update confidence_score, category, decision_date
+    # and (if reviewed) reviewed_at/outcome_rating
+    deltas = []
+    if old.decision_date is not None:
+        deltas.append(decision_delta(user_id, old.category, old.decision_date, old.confidence_score, -1))
+    if new.decision_date is not None:
+        deltas.append(decision_delta(user_id, new.category, new.decision_date, new.confidence_score))
+    if old.reviewed_at is not None and (old.category or "") != (new.category or ""):
+        deltas.append(review_delta(user_id, old.category, old.reviewed_at, old.outcome_rating, -1))
+        deltas.append(review_delta(user_id, new.category, old.reviewed_at, old.outcome_rating))
+    return deltas
+
+def _accumulate(merged: dict, delta: dict):
+    key = tuple(delta[name] for name in KEY_COLUMNS)
+    row = merged.setdefault(key, dict(zip(KEY_COLUMNS, key), **{name: 0 for name in MEASURES}))
+    for name in MEASURES:
+        row[name] += delta.get(name, 0)
+
+def _merge(deltas):
+    merged = {}
+    for delta in deltas:
+        _accumulate(merged, delta)
+    # Opposite deltas on the same bucket (e.g. a title-only edit) cancel out
+    return [row for row in merged.values() if any(row[name] for name in MEASURES)]
+
+async def _apply_batched(db: AsyncSession, rows, batch_size: int = 500):
+    for start in range(0, len(rows), batch_size):
+        await apply(db, rows[start:start + batch_size])
+
+async def apply(db: AsyncSession, deltas):
+    # One multi-row INSERT ... ON CONFLICT DO UPDATE adding onto existing buckets
+    rows = _merge(deltas)
+    if not rows:
+        return
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    rollup = models.DecisionRollup
+    stmt = dialect.insert(rollup).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(KEY_COLUMNS),
+        set_={name: getattr(rollup, name) + stmt.excluded[name] for name in MEASURES}
+    )
+    await db.execute(stmt)
+
+def compaction_cutoff(now: datetime = None):
+    # Day buckets before this are folded into months. It is a month
+    # boundary so no month ends up split.
+    now = now or datetime.utcnow()
+    return bucket_start(now - timedelta(days=settings.ROLLUP_DAILY_RETENTION_DAYS), "month")
+
+def fold_old(deltas, now: datetime = None):
+    # Day deltas for already-compacted history, moved to their month bucket
+    # (used for history written after the fact, e.g. by archive.py)
+    cutoff = compaction_cutoff(now)
+    folded = []
+    for delta in deltas:
+        if delta["granularity"] == "day" and delta["bucket_start"] < cutoff:
+            delta = dict(delta, granularity="month", bucket_start=bucket_start(delta["bucket_start"], "month"))
+        folded.append(delta)
+    return _merge(folded)
+
+async def compact(db: AsyncSession, now: datetime = None):
+    # Fold day buckets before the retention cutoff into month buckets
+    cutoff = compaction_cutoff(now)
+    rollup = models.DecisionRollup
+    old_days = (rollup.granularity == "day", rollup.bucket_start < cutoff)
+
+    result = await db.stream(
+        select(rollup).filter(*old_days).execution_options(yield_per=1000)
+    )
+    merged = {}
+    folded = 0
+    async for row in result.scalars():
+        _accumulate(merged, dict(
+            {name: getattr(row, name) for name in KEY_COLUMNS + MEASURES},
+            granularity="month",
+            bucket_start=bucket_start(row.bucket_start, "month"),
+        ))
+        folded += 1
+    await db.execute(delete(rollup).filter(*old_days).execution_options(synchronize_session=False))
+    await _apply_batched(db, _merge(merged.values()))
+    # Buckets emptied by edits (all measures back to zero)
+    await db.execute(
+        delete(rollup)
+        .filter(*(getattr(rollup, name) == 0 for name in MEASURES))
+        .execution_options(synchronize_session=False)
+    )
+    return folded
+
+async def run_compaction():
+    async with AsyncSessionLocal() as db:
+        folded = await compact(db)
+        await db.commit()
+    return folded
+
+async def rebuild(db: AsyncSession, user_id=None):
+    # Cold path: recompute day buckets from decisions and reviews. Caller commits.
+    clear = delete(models.DecisionRollup)
+    decisions = select(
+        models.Decision.user_id, models.Decision.category,
+        models.Decision.decision_date, models.Decision.confidence_score
+    ).filter(models.Decision.decision_date.isnot(None))
+    reviews = (
+        select(
+            models.Decision.user_id, models.Decision.category,
+            models.Review.reviewed_at, models.Review.outcome_rating
+        )
+        .join(models.Review, models.Review.decision_id == models.Decision.id)
+        .filter(models.Review.reviewed_at.isnot(None))
+    )
+    if user_id is not None:
+        clear = clear.filter(models.DecisionRollup.user_id == user_id)
+        decisions = decisions.filter(models.Decision.user_id == user_id)
+        reviews = reviews.filter(models.Decision.user_id == user_id)
+    await db.execute(clear.execution_options(synchronize_session=False))
+
+    merged = {}
+    result = await db.stream(decisions.execution_options(yield_per=1000))
+    async for row in result:
+        _accumulate(merged, decision_delta(*row))
+    result = await db.stream(reviews.execution_options(yield_per=1000))
+    async for row in result:
+        _accumulate(merged, review_delta(*row))
+    rows = _merge(merged.values())
+    await _apply_batched(db, rows)
+    return len(rows)
+
+async def read_series(db: AsyncSession, user_id: int, granularity: str,
+                      start: datetime = None, end: datetime = None,
+                      category: str = None, by_category: bool = False, extra=()):
+    # extra: additional bucket rows (dicts) to merge in, e.g. archived history
+    rollup = models.DecisionRollup
+    query = select(rollup).filter(rollup.user_id == user_id)
+    if start is not None:
+        # Month buckets start on the 1st, so widen the lower bound to match
+        query = query.filter(rollup.bucket_start >= bucket_start(start, "month"))
+    if end is not None:
+        query = query.filter(rollup.bucket_start < end)
+    if category is not None:
+        query = query.filter(rollup.category == category)
+    result = await db.execute(query)
+    rows = [{name: getattr(row, name) for name in KEY_COLUMNS + MEASURES} for row in result.scalars()]
+    for row in extra:
+        if start is not None and row["bucket_start"] < bucket_start(start, "month"):
+            continue
+        if end is not None and row["bucket_start"] >= end:
+            continue
+        if category is not None and row["category"] != category:
+            continue
+        rows.append(row)
+
+    points = {}
+    for row in rows:
+        # Compacted history only has monthly resolution
+        point_granularity = "month" if row["granularity"] == "month" else granularity
+        bucket = bucket_start(row["bucket_start"], point_granularity)
+        if start is not None and bucket < bucket_start(start, point_granularity):
+            continue
+        key = (bucket, row["category"] if by_category else None)
+        point = points.setdefault(key, dict({name: 0 for name in MEASURES}, granularity=point_granularity))
+        for name in MEASURES:
+            point[name] += row[name]
+
+    series = []
+    for (bucket, point_category), point in sorted(points.items(), key=lambda item: (item[0][0], item[0][1] or "")):
+        entry = {
+            "bucket": bucket,
+            "granularity": point["granularity"],
+            "decisions": point["decisions"],
+            "reviews": point["reviews"],
+            "average_confidence": round(point["confidence_sum"] / point["decisions"], 1) if point["decisions"] else None,
+            "average_outcome": round(point["outcome_sum"] / point["reviews"], 1) if point["reviews"] else None,
+        }
+        if not entry["decisions"] and not entry["reviews"]:
+            continue
+        if by_category:
+            entry["category"] = point_category
+        series.append(entry)
+    return series
+
+if __name__ == "__main__":
+    async def main():
+        async with AsyncSessionLocal() as db:
+            buckets = await rebuild(db)
+            await db.commit()
+        print(f"Rebuilt {buckets} rollup bucket(s)")
+    asyncio.run(main())
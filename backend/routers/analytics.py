@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func
-import models, database, auth_utils
+from sqlalchemy import extract, func
+from typing import Optional
+from datetime import datetime
+import models, database, auth_utils, stats, calibration, rollups, etags, events, archive, encoding
 
 router = APIRouter(
     prefix="/analytics",
@@ -11,42 +14,118 @@ router = APIRouter(
 
 @router.get("/overview")
 async def get_analytics(
+    request: Request,
+    response: Response,
+    include_archived: bool = False,
+    db: AsyncSession = Depends(auth_utils.get_read_db),
+    current_user: models.User = Depends(auth_utils.get_current_user)
+):
+    # Served from the per-user running totals (a single primary-key lookup)
+    not_modified = await etags.check_not_modified(request, response, db, current_user)
+    if not_modified:
+        return not_modified
+    if include_archived:
+        # Archived totals come from the archive manifest, no segment reads
+        totals = await stats.get_totals(db, current_user.id)
+        archived = archive.totals(current_user.id)
+        return encoding.respond(
+            stats.overview_of({name: totals[name] + archived[name] for name in stats.STAT_COLUMNS}), response
+        )
+    return encoding.respond(await stats.get_overview(db, current_user.id), response)
+
+@router.get("/stream")
+async def stream_analytics(
     db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(auth_utils.get_current_user)
 ):
-    # Total decisions
-    result = await db.execute(
-        select(func.count(models.Decision.id)).filter(models.Decision.user_id == current_user.id)
-    )
-    total_decisions = result.scalar()
-    
-    # Reviewed vs Pending
-    result = await db.execute(
-        select(func.count(models.Decision.id))
-        .filter(models.Decision.user_id == current_user.id, models.Decision.decision_quality.isnot(None))
+    # Server-Sent Events: a snapshot of the overview, then the deltas the
+    # write handlers publish (see events.py). Subscribing before the snapshot
+    # means no write can fall between the two; clients compare `version`.
+    # The request session (used for auth) is released right away so an open
+    # stream never pins a pooled connection; each lookup below is short-lived.
+    await db.close()
+    user_id = current_user.id
+    subscriber = events.hub.subscribe(user_id)
+    try:
+        async with database.read_sessionmaker(user_id)() as read_db:
+            overview = await stats.get_overview(read_db, user_id)
+            row = await read_db.get(models.UserStats, user_id)
+    except Exception:
+        events.hub.unsubscribe(subscriber)
+        raise
+    snapshot = {"version": row.data_version if row is not None else 0, "overview": overview}
+
+    async def current_version():
+        async with database.read_sessionmaker(user_id)() as read_db:
+            row = await read_db.get(models.UserStats, user_id)
+            return row.data_version if row is not None else 0
+
+    return StreamingResponse(
+        events.stream(subscriber, events.hub, snapshot, current_version, database.settings.EVENT_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-    reviewed = result.scalar()
-    pending = total_decisions - reviewed
-    
-    # Avg Confidence vs Avg Outcome
-    # We need to join with Review to get outcome
-    res_conf = await db.execute(
-        select(func.avg(models.Decision.confidence_score))
-        .filter(models.Decision.user_id == current_user.id)
+
+def calibration_query(user_id: int):
+    # Reviewed decisions grouped into (confidence, rating, category, year, count)
+    year = extract("year", models.Decision.decision_date)
+    return (
+        select(
+            models.Decision.confidence_score,
+            models.Review.outcome_rating,
+            models.Decision.category,
+            year,
+            func.count()
+        )
+        .join(models.Review, models.Review.decision_id == models.Decision.id)
+        .filter(
+            models.Decision.user_id == user_id,
+            models.Decision.confidence_score.isnot(None),
+            models.Review.outcome_rating.isnot(None)
+        )
+        .group_by(models.Decision.confidence_score, models.Review.outcome_rating, models.Decision.category, year)
     )
-    avg_confidence = res_conf.scalar() or 0
-    
-    res_outcome = await db.execute(
-        select(func.avg(models.Review.outcome_rating))
-        .join(models.Decision)
-        .filter(models.Decision.user_id == current_user.id)
+
+@router.get("/calibration")
+async def get_calibration(
+    request: Request,
+    response: Response,
+    include_archived: bool = False,
+    db: AsyncSession = Depends(auth_utils.get_read_db),
+    current_user: models.User = Depends(auth_utils.get_current_user)
+):
+    # One grouped query over reviewed decisions, then vectorized maths on
+    # the groups (see calibration.py)
+    not_modified = await etags.check_not_modified(request, response, db, current_user)
+    if not_modified:
+        return not_modified
+    result = await db.execute(calibration_query(current_user.id))
+    rows = result.all()
+    if include_archived:
+        rows += await archive.calibration_rows(current_user.id)
+    return encoding.respond(calibration.compute(*calibration.to_arrays(rows)), response)
+
+@router.get("/timeseries")
+async def get_timeseries(
+    request: Request,
+    response: Response,
+    granularity: str = Query("day", pattern="^(day|week|month)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    category: Optional[str] = None,
+    by_category: bool = False,
+    include_archived: bool = False,
+    db: AsyncSession = Depends(auth_utils.get_read_db),
+    current_user: models.User = Depends(auth_utils.get_current_user)
+):
+    # Reads only the pre-aggregated rollups; history older than the daily
+    # retention window comes back at monthly resolution
+    not_modified = await etags.check_not_modified(request, response, db, current_user)
+    if not_modified:
+        return not_modified
+    extra = await archive.rollup_rows(current_user.id) if include_archived else ()
+    series = await rollups.read_series(
+        db, current_user.id, granularity,
+        start=start, end=end, category=category, by_category=by_category, extra=extra
     )
-    avg_outcome = res_outcome.scalar() or 0
-    
-    return {
-        "total_decisions": total_decisions,
-        "reviewed_decisions": reviewed,
-        "pending_decisions": pending,
-        "average_confidence": round(avg_confidence, 1),
-        "average_outcome": round(avg_outcome, 1)
-    }
+    return encoding.respond(series, response)
@@ -3,7 +3,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from datetime import timedelta
-import models, schemas, database, auth_utils
+import models, schemas, database, auth_utils, stats
 
 router = APIRouter(
     prefix="/auth",
@@ -19,9 +19,11 @@ async def register(user: schemas.UserCreate, db: AsyncSession = Depends(database
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create user
-    hashed_password = auth_utils.get_password_hash(user.password)
+    hashed_password = await auth_utils.get_password_hash_async(user.password)
     new_user = models.User(email=user.email, name=user.name, password_hash=hashed_password)
     db.add(new_user)
+    await db.flush()
+    stats.create(db, new_user.id)
     await db.commit()
     await db.refresh(new_user)
     
@@ -37,7 +39,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSessi
     result = await db.execute(select(models.User).filter(models.User.email == form_data.username))
     user = result.scalars().first()
     
-    if not user or not auth_utils.verify_password(form_data.password, user.password_hash):
+    if not user or not await auth_utils.verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
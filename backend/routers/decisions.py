@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from typing import List
+from sqlalchemy import insert, update, tuple_, case, false
+from pydantic import ValidationError
+from typing import List, Optional
+from collections import namedtuple
 from datetime import datetime
-import models, schemas, database, auth_utils
+import json
+import models, schemas, database, auth_utils, stats, rollups, search, pagination, reminders, export, etags, scoring, similarity, events, archive, encoding
 
 router = APIRouter(
     prefix="/decisions",
@@ -29,9 +35,14 @@ async def get_decision_or_404(id: int, user: models.User, db: AsyncSession):
 @router.post("/", response_model=schemas.Decision)
 async def create_decision(
     decision: schemas.DecisionCreate,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(auth_utils.get_current_user)
 ):
+    # Single transaction: the flush inserts the decision and its children
+    # (ids come back via RETURNING) and the response is built from these
+    # in-memory objects, so nothing is re-fetched. The similarity index is
+    # updated after the response has gone out.
     db_decision = models.Decision(
         user_id=current_user.id,
         title=decision.title,
@@ -40,82 +51,424 @@ async def create_decision(
         confidence_score=decision.confidence_score,
         expected_outcome=decision.expected_outcome,
         decision_date=decision.decision_date or datetime.utcnow(),
-        review_date=decision.review_date
+        review_date=decision.review_date,
+        options=[
+            models.Option(option_name=opt.option_name, reasoning=opt.reasoning)
+            for opt in decision.options
+        ],
+        assumptions=[
+            models.Assumption(assumption_text=asm.assumption_text, status=asm.status)
+            for asm in decision.assumptions
+        ],
+        review=None
     )
     db.add(db_decision)
+    await db.flush()
+
+    totals = await stats.add_decisions(db, current_user.id, 1, db_decision.confidence_score)
+    await rollups.apply(db, [rollups.decision_delta(
+        current_user.id, db_decision.category, db_decision.decision_date, db_decision.confidence_score
+    )])
+    await search.refresh(db, [db_decision.id])
+    if db_decision.review_date is not None:
+        await reminders.notify(db, [(db_decision.id, db_decision.review_date)])
     await db.commit()
-    await db.refresh(db_decision)
-
-    # Add options
-    for opt in decision.options:
-        db_option = models.Option(
-            decision_id=db_decision.id,
-            option_name=opt.option_name,
-            reasoning=opt.reasoning
+    reminders.scheduler.schedule(db_decision.id, db_decision.review_date)
+    events.publish_delta(current_user.id, "decision.created", totals, decision=_event_summary(db_decision))
+    background_tasks.add_task(similarity.refresh_in_background, current_user.id, [db_decision.id])
+    return db_decision
+
+def _parse_bulk_item(item):
+    # Returns a DecisionCreate, or an error message for the per-item report
+    if not isinstance(item, dict):
+        return "Item must be an object"
+    try:
+        return schemas.DecisionCreate(**item)
+    except ValidationError as e:
+        return "; ".join(
+            f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
         )
-        db.add(db_option)
-    
-    # Add assumptions
-    for asm in decision.assumptions:
-        db_asm = models.Assumption(
-            decision_id=db_decision.id,
-            assumption_text=asm.assumption_text,
-            status=asm.status
+
+async def _read_bulk_items(request: Request):
+    # Yields (index, DecisionCreate | error message). NDJSON bodies are parsed
+    # line by line as they arrive; anything else must be a JSON array.
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        async def lines():
+            buffer = b""
+            async for chunk in request.stream():
+                buffer += chunk
+                *complete, buffer = buffer.split(b"\n")
+                for line in complete:
+                    yield line
+            yield buffer
+
+        index = 0
+        async for line in lines():
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                yield index, "Invalid JSON"
+            else:
+                yield index, _parse_bulk_item(item)
+            index += 1
+        return
+
+    try:
+        items = await request.json()
+    except ValueError:
+        items = None
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    for index, item in enumerate(items):
+        yield index, _parse_bulk_item(item)
+
+async def _insert_returning(db: AsyncSession, model, rows):
+    # Multi-row INSERT ... RETURNING the new rows in parameter order, as one
+    # statement on every dialect. sort_by_parameter_order would need an
+    # insert sentinel; without one (SQLite) SQLAlchemy falls back to an
+    # INSERT per row. Ids are handed out in VALUES order within a statement
+    # (SQLite rowids under its single writer, Postgres sequence calls), so
+    # sorting on the primary key restores the order instead. render_nulls
+    # keeps rows with and without a NULL value in the same statement (the
+    # ORM otherwise batches rows by which keys are non-NULL).
+    result = await db.execute(insert(model).returning(model).execution_options(render_nulls=True), rows)
+    return sorted(result.scalars().all(), key=lambda row: row.id)
+
+async def _insert_decision_chunk(db: AsyncSession, user: models.User, chunk, background_tasks: BackgroundTasks):
+    # One transaction per chunk: a multi-row INSERT ... RETURNING for the
+    # decisions, then one multi-row INSERT each for options and assumptions.
+    now = datetime.utcnow()
+    rows = [
+        dict(
+            user_id=user.id,
+            title=d.title,
+            category=d.category,
+            description=d.description,
+            confidence_score=d.confidence_score,
+            expected_outcome=d.expected_outcome,
+            decision_date=d.decision_date or now,
+            review_date=d.review_date
         )
-        db.add(db_asm)
-    
-    await db.commit()
-    # Re-fetch with relationships
-    return await get_decision_or_404(db_decision.id, current_user, db)
+        for _, d in chunk
+    ]
+    try:
+        ids = [decision.id for decision in await _insert_returning(db, models.Decision, rows)]
+
+        options = [
+            dict(decision_id=decision_id, option_name=opt.option_name, reasoning=opt.reasoning)
+            for decision_id, (_, d) in zip(ids, chunk) for opt in d.options
+        ]
+        if options:
+            await db.execute(insert(models.Option).execution_options(render_nulls=True), options)
+        assumptions = [
+            dict(decision_id=decision_id, assumption_text=asm.assumption_text, status=asm.status or "pending")
+            for decision_id, (_, d) in zip(ids, chunk) for asm in d.assumptions
+        ]
+        if assumptions:
+            await db.execute(insert(models.Assumption).execution_options(render_nulls=True), assumptions)
+
+        totals = await stats.add_decisions(db, user.id, len(ids), sum(row["confidence_score"] for row in rows))
+        await rollups.apply(db, [
+            rollups.decision_delta(user.id, row["category"], row["decision_date"], row["confidence_score"])
+            for row in rows
+        ])
+        await search.refresh(db, ids)
+        await reminders.notify(db, [
+            (decision_id, row["review_date"]) for decision_id, row in zip(ids, rows) if row["review_date"]
+        ])
+        await db.commit()
+    except SQLAlchemyError as e:
+        await db.rollback()
+        message = f"Chunk failed: {e.__class__.__name__}"
+        return [schemas.BulkItemResult(index=index, error=message) for index, _ in chunk]
+
+    for decision_id, row in zip(ids, rows):
+        reminders.scheduler.schedule(decision_id, row["review_date"])
+    events.publish_delta(user.id, "decisions.created", totals, ids=ids)
+    background_tasks.add_task(similarity.refresh_in_background, user.id, ids)
+    return [schemas.BulkItemResult(index=index, id=decision_id) for (index, _), decision_id in zip(chunk, ids)]
+
+@router.post("/bulk", response_model=schemas.BulkResult)
+async def create_decisions_bulk(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth_utils.get_current_user)
+):
+    # Accepts a JSON array or an NDJSON stream (Content-Type: application/x-ndjson)
+    # of DecisionCreate payloads and reports success or failure per item.
+    chunk_size = database.settings.BULK_CHUNK_SIZE
+    results = []
+    chunk = []
+    async for index, item in _read_bulk_items(request):
+        if isinstance(item, str):
+            results.append(schemas.BulkItemResult(index=index, error=item))
+            continue
+        chunk.append((index, item))
+        if len(chunk) >= chunk_size:
+            results.extend(await _insert_decision_chunk(db, current_user, chunk, background_tasks))
+            chunk = []
+    if chunk:
+        results.extend(await _insert_decision_chunk(db, current_user, chunk, background_tasks))
+
+    results.sort(key=lambda r: r.index)
+    created = sum(1 for r in results if r.error is None)
+    return schemas.BulkResult(created=created, failed=len(results) - created, results=results)
+
+MAX_PAGE_SIZE = 500
+
+# Scalar columns that may be requested through `fields=`
+LISTABLE_FIELDS = (
+    "id", "user_id", "title", "category", "description", "confidence_score",
+    "expected_outcome", "decision_date", "review_date", "created_at",
+    "decision_quality", "outcome_quality",
+)
+SUMMARY_FIELDS = tuple(schemas.DecisionSummary.model_fields)
+
+def _event_summary(decision):
+    return {field: getattr(decision, field) for field in SUMMARY_FIELDS}
 
 @router.get("/", response_model=List[schemas.Decision])
 async def get_decisions(
-    skip: int = 0,
-    limit: int = 100,
-    db: AsyncSession = Depends(database.get_db),
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: str = Query("full", pattern="^(full|summary)$"),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(auth_utils.get_read_db),
     current_user: models.User = Depends(auth_utils.get_current_user)
 ):
-    result = await db.execute(
-        select(models.Decision)
-        .filter(models.Decision.user_id == current_user.id)
-        .options(
+    # Newest first. Pass the X-Next-Cursor header of one page as `cursor` to
+    # get the next; `skip` still works but costs O(skip) on deep pages.
+    # `view=summary` (schemas.DecisionSummary) or `fields=a,b,c` select only
+    # those columns and skip loading options/assumptions/review.
+    not_modified = await etags.check_not_modified(request, response, db, current_user)
+    if not_modified:
+        return not_modified
+
+    # Empty entries (`fields=,`, a trailing comma) are ignored; nothing left
+    # means the view's usual fields
+    projected = [name.strip() for name in (fields or "").split(",") if name.strip()] or None
+    if projected:
+        unknown = [name for name in projected if name not in LISTABLE_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    elif view == "summary":
+        projected = list(SUMMARY_FIELDS)
+
+    if projected is None:
+        query = select(models.Decision).options(
             selectinload(models.Decision.options),
             selectinload(models.Decision.assumptions),
             selectinload(models.Decision.review)
         )
-        .offset(skip)
+    else:
+        # decision_date and id are always read for the cursor
+        columns = dict.fromkeys(projected + ["decision_date", "id"])
+        query = select(*(getattr(models.Decision, name) for name in columns))
+
+    query = (
+        query
+        .filter(models.Decision.user_id == current_user.id)
+        .order_by(models.Decision.decision_date.desc(), models.Decision.id.desc())
         .limit(limit)
     )
-    return result.scalars().all()
+    if cursor:
+        try:
+            after_date, after_id = pagination.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if after_date is None:
+            # Only a row without a date can produce this, and those no longer
+            # exist (migrations.py backfills them); nothing sorts after it
+            query = query.filter(false())
+        else:
+            query = query.filter(
+                tuple_(models.Decision.decision_date, models.Decision.id) < tuple_(after_date, after_id)
+            )
+    else:
+        query = query.offset(skip)
+
+    result = await db.execute(query)
+    decisions = result.scalars().all() if projected is None else result.all()
+    headers = dict(response.headers)
+    if decisions and len(decisions) == limit:
+        last = decisions[-1]
+        headers["X-Next-Cursor"] = pagination.encode_cursor(last.decision_date, last.id)
+
+    if projected is None:
+        response.headers.update(headers)
+        return decisions
+    # Plain column values: orjson renders them without a pydantic round trip
+    return encoding.FastJSONResponse(
+        [{name: row._mapping[name] for name in projected} for row in decisions], headers=headers
+    )
+
+@router.get("/export")
+async def export_decisions(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    current_user: models.User = Depends(auth_utils.get_current_user)
+):
+    # Streams every decision of the user; see export.py
+    sessions = database.read_sessionmaker(current_user.id)
+    if format == "csv":
+        body, media_type = export.stream_csv(current_user.id, sessions), "text/csv"
+    else:
+        body, media_type = export.stream_ndjson(current_user.id, sessions), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="decisions.{format}"'}
+    )
+
+@router.get("/search", response_model=List[schemas.SearchHit])
+async def search_decisions(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(auth_utils.get_read_db),
+    current_user: models.User = Depends(auth_utils.get_current_user)
+):
+    # Ranked full-text search with highlighted snippets; see search.py
+    return await search.search(db, current_user.id, q, limit=limit, offset=offset)
+
+@router.post("/similar", response_model=List[schemas.SimilarDecision])
+async def similar_to_draft(
+    draft: schemas.SimilarQuery,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(auth_utils.get_read_db),
+    current_user: models.User = Depends(auth_utils.get_current_user)
+):
+    # For a decision being drafted: nothing is stored (see similarity.py)
+    text = similarity.decision_text(
+        draft.title, draft.description,
+        [(opt.option_name, opt.reasoning) for opt in draft.options],
+        [asm.assumption_text for asm in draft.assumptions]
+    )
+    hits = await similarity.similar(db, current_user.id, text, limit)
+    return await similarity.describe(db, current_user.id, hits)
+
+@router.get("/{id}/similar", response_model=List[schemas.SimilarDecision])
+async def similar_to_decision(
+    id: int,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(auth_utils.get_read_db),
+    current_user: models.User = Depends(auth_utils.get_current_user)
+):
+    text = await similarity.decision_text_for(db, current_user.id, id)
+    if text is None:
+        raise HTTPException(status_code=404, detail="Decision not found")
+    hits = await similarity.similar(db, current_user.id, text, limit, exclude=id)
+    return await similarity.describe(db, current_user.id, hits)
 
 @router.get("/{id}", response_model=schemas.Decision)
 async def get_decision(
     id: int,
-    db: AsyncSession = Depends(database.get_db),
+    request: Request,
+    response: Response,
+    include_archived: bool = False,
+    db: AsyncSession = Depends(auth_utils.get_read_db),
     current_user: models.User = Depends(auth_utils.get_current_user)
 ):
-    return await get_decision_or_404(id, current_user, db)
+    not_modified = await etags.check_not_modified(request, response, db, current_user)
+    if not_modified:
+        return not_modified
+    try:
+        return await get_decision_or_404(id, current_user, db)
+    except HTTPException:
+        if not include_archived:
+            raise
+    # Not in the hot tables: look in cold storage (see archive.py)
+    archived = await archive.get_decision(current_user.id, id)
+    if archived is None:
+        raise HTTPException(status_code=404, detail="Decision not found")
+    return archived
+
+# Pre-update values behind the stats and rollup deltas of an edit
+PriorValues = namedtuple("PriorValues", "confidence_score category decision_date reviewed_at outcome_rating")
+
+async def _update_returning_prior(db: AsyncSession, id: int, user_id: int, changes: dict):
+    # UPDATE ... RETURNING the new row plus the values it had before. The
+    # ownership check is part of the predicate: no row back means not found
+    # (or not the user's). Postgres does it in one statement, reading the
+    # old values from a locked snapshot of the row joined in FROM. SQLite
+    # cannot return FROM columns, so it reads them first in the same
+    # transaction (in-process, no extra network round trip).
+    owned = (models.Decision.id == id, models.Decision.user_id == user_id)
+    old_columns = (models.Decision.confidence_score, models.Decision.category, models.Decision.decision_date)
+    statement = update(models.Decision).where(*owned).values(**changes)
+    loads = (
+        selectinload(models.Decision.options),
+        selectinload(models.Decision.assumptions),
+        selectinload(models.Decision.review)
+    )
+    if db.bind.dialect.name == "postgresql":
+        prior = select(models.Decision.id, *old_columns).where(*owned).with_for_update().subquery("prior")
+        result = await db.execute(
+            statement.where(models.Decision.id == prior.c.id)
+            .returning(models.Decision, prior.c.confidence_score, prior.c.category, prior.c.decision_date)
+            .options(*loads)
+            .execution_options(populate_existing=True)
+        )
+        row = result.first()
+        if row is None:
+            return None, None
+        db_decision, *old = row
+    else:
+        old = (await db.execute(select(*old_columns).where(*owned))).first()
+        if old is None:
+            return None, None
+        result = await db.execute(
+            statement.returning(models.Decision).options(*loads).execution_options(populate_existing=True)
+        )
+        db_decision = result.scalars().first()
+    # The edit never touches the review, so the loaded one is the old one
+    review = db_decision.review
+    return db_decision, PriorValues(
+        *old, review.reviewed_at if review else None, review.outcome_rating if review else None
+    )
 
 @router.put("/{id}", response_model=schemas.Decision)
 async def update_decision(
     id: int,
-    decision_update: schemas.DecisionBase,
+    decision_update: schemas.DecisionUpdate,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(auth_utils.get_current_user)
 ):
-    db_decision = await get_decision_or_404(id, current_user, db)
-    
-    for key, value in decision_update.dict(exclude_unset=True).items():
-        setattr(db_decision, key, value)
-    
+    changes = decision_update.model_dump(exclude_unset=True)
+    if not changes:
+        return await get_decision_or_404(id, current_user, db)
+
+    db_decision, old = await _update_returning_prior(db, id, current_user.id, changes)
+    if db_decision is None:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Decision not found")
+
+    totals = await stats.change_confidence(db, current_user.id, (db_decision.confidence_score or 0) - (old.confidence_score or 0))
+    await rollups.apply(db, rollups.edit_deltas(current_user.id, old, db_decision))
+    if changes.keys() & {"title", "description", "expected_outcome"}:
+        await search.refresh(db, [id])
+    if "review_date" in changes:
+        await reminders.notify(db, [(id, db_decision.review_date)])
     await db.commit()
-    await db.refresh(db_decision)
+    if "review_date" in changes:
+        reminders.scheduler.schedule(id, db_decision.review_date)
+    events.publish_delta(current_user.id, "decision.updated", totals, decision=_event_summary(db_decision))
+    if changes.keys() & {"title", "description"}:
+        background_tasks.add_task(similarity.refresh_in_background, current_user.id, [id])
     return db_decision
 
 @router.post("/{id}/assumptions", response_model=schemas.Assumption)
 async def add_assumption(
     id: int,
     assumption: schemas.AssumptionCreate,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(auth_utils.get_current_user)
 ):
@@ -128,10 +481,87 @@ async def add_assumption(
         status=assumption.status
     )
     db.add(db_assumption)
+    await db.flush()
+    await search.refresh(db, [id])
+    totals = await stats.bump_version(db, current_user.id)
     await db.commit()
     await db.refresh(db_assumption)
+    events.publish_delta(current_user.id, "assumptions.created", totals, decision_id=id, ids=[db_assumption.id])
+    background_tasks.add_task(similarity.refresh_in_background, current_user.id, [id])
     return db_assumption
 
+@router.post("/{id}/assumptions/bulk", response_model=List[schemas.Assumption])
+async def add_assumptions_bulk(
+    id: int,
+    assumptions: List[schemas.AssumptionCreate],
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth_utils.get_current_user)
+):
+    # One ownership check and one multi-row INSERT ... RETURNING
+    if len(assumptions) > database.settings.BULK_CHUNK_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {database.settings.BULK_CHUNK_SIZE} assumptions per request")
+    owned = await db.execute(
+        select(models.Decision.id).filter(models.Decision.id == id, models.Decision.user_id == current_user.id)
+    )
+    if owned.first() is None:
+        raise HTTPException(status_code=404, detail="Decision not found")
+    if not assumptions:
+        return []
+
+    created = await _insert_returning(db, models.Assumption, [
+        dict(decision_id=id, assumption_text=a.assumption_text, status=a.status or "pending")
+        for a in assumptions
+    ])
+    await search.refresh(db, [id])
+    totals = await stats.bump_version(db, current_user.id)
+    await db.commit()
+    events.publish_delta(current_user.id, "assumptions.created", totals, decision_id=id, ids=[a.id for a in created])
+    background_tasks.add_task(similarity.refresh_in_background, current_user.id, [id])
+    return created
+
+@router.patch("/assumptions", response_model=schemas.AssumptionBatchResult)
+async def update_assumption_statuses(
+    updates: List[schemas.AssumptionStatusUpdate],
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth_utils.get_current_user)
+):
+    # A single UPDATE ... WHERE id IN (...) AND decision_id IN (<owned>)
+    # RETURNING id; ids it did not return don't exist or aren't the user's.
+    # If an id is listed twice, the last status wins.
+    if len(updates) > database.settings.BULK_CHUNK_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {database.settings.BULK_CHUNK_SIZE} updates per request")
+    statuses = {u.id: u.status for u in updates}
+    updated = {}
+    if statuses:
+        owned_decisions = select(models.Decision.id).filter(models.Decision.user_id == current_user.id)
+        result = await db.execute(
+            update(models.Assumption)
+            .where(
+                models.Assumption.id.in_(list(statuses)),
+                models.Assumption.decision_id.in_(owned_decisions)
+            )
+            .values(status=case(statuses, value=models.Assumption.id))
+            .returning(models.Assumption.id, models.Assumption.status)
+            .execution_options(synchronize_session=False)
+        )
+        updated = dict(result.all())
+    if updated:
+        totals = await stats.bump_version(db, current_user.id)
+        await db.commit()
+        events.publish_delta(current_user.id, "assumptions.resolved", totals, assumptions=[
+            {"id": assumption_id, "status": new_status} for assumption_id, new_status in updated.items()
+        ])
+
+    results = [
+        schemas.AssumptionUpdateResult(id=u.id, status=updated[u.id]) if u.id in updated
+        else schemas.AssumptionUpdateResult(id=u.id, error="Assumption not found")
+        for u in updates
+    ]
+    return schemas.AssumptionBatchResult(
+        updated=len(updated), failed=sum(1 for r in results if r.error), results=results
+    )
+
 @router.patch("/assumptions/{assumption_id}", response_model=schemas.Assumption)
 async def update_assumption_status(
     assumption_id: int,
@@ -150,8 +580,12 @@ async def update_assumption_status(
         raise HTTPException(status_code=404, detail="Assumption not found")
     
     db_assumption.status = update.status
+    totals = await stats.bump_version(db, current_user.id)
     await db.commit()
     await db.refresh(db_assumption)
+    events.publish_delta(current_user.id, "assumptions.resolved", totals, assumptions=[
+        {"id": db_assumption.id, "status": db_assumption.status}
+    ])
     return db_assumption
 
 @router.post("/{id}/review", response_model=schemas.Review)
@@ -174,32 +608,24 @@ async def review_decision(
     )
     db.add(db_review)
     
-    # Logic: Calculate Decision Quality
-    # Simple logic: 
-    # High Confidence (>=80) + High Rating (>=4) = Good Decision
-    # High Confidence (>=80) + Low Rating (<=2) = Poor Decision (Overconfidence)
-    # Low Confidence (<=40) + High Rating (>=4) = Poor Decision (Underconfidence/Luck)
-    # Low Confidence (<=40) + Low Rating (<=2) = Good Decision (Calibrated)
-    # Else: Mixed/Neutral
-    
-    conf = db_decision.confidence_score
-    rating = review.outcome_rating
-    
-    quality = "Neutral"
-    outcome_q = "Average"
-    
-    if rating >= 4:
-        outcome_q = "Good"
-        if conf >= 70: quality = "Good"
-        elif conf <= 40: quality = "Poor" # Luck
-    elif rating <= 2:
-        outcome_q = "Poor"
-        if conf >= 70: quality = "Poor" # Overconfidence
-        elif conf <= 40: quality = "Good" # Calibrated caution
-        
-    db_decision.decision_quality = quality
-    db_decision.outcome_quality = outcome_q
-    
+    # Decision quality from the current scoring rule (see scoring.py)
+    rule = scoring.get_rule()
+    db_decision.decision_quality, db_decision.outcome_quality = rule.score(
+        db_decision.confidence_score, review.outcome_rating
+    )
+    db_decision.scoring_version = rule.version
+
+    await db.flush()
+    totals = await stats.add_review(db, current_user.id, review.outcome_rating)
+    await rollups.apply(db, [rollups.review_delta(
+        current_user.id, db_decision.category, db_review.reviewed_at, review.outcome_rating
+    )])
+    await search.refresh(db, [id])
     await db.commit()
+    reminders.scheduler.cancel(id)
     await db.refresh(db_review)
+    events.publish_delta(current_user.id, "review.recorded", totals, decision_id=id,
+                         outcome_rating=db_review.outcome_rating,
+                         decision_quality=db_decision.decision_quality,
+                         outcome_quality=db_decision.outcome_quality)
     return db_review
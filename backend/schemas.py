@@ -51,6 +51,19 @@ class AssumptionCreate(AssumptionBase):
 class AssumptionUpdate(BaseModel):
     status: str
 
+class AssumptionStatusUpdate(AssumptionUpdate):
+    id: int
+
+class AssumptionUpdateResult(BaseModel):
+    id: int
+    status: Optional[str] = None
+    error: Optional[str] = None
+
+class AssumptionBatchResult(BaseModel):
+    updated: int
+    failed: int
+    results: List[AssumptionUpdateResult]
+
 class Assumption(AssumptionBase):
     id: int
     decision_id: int
@@ -89,6 +102,11 @@ class DecisionCreate(DecisionBase):
     options: List[OptionCreate] = []
     assumptions: List[AssumptionCreate] = []
 
+# PUT body: decision_date may be left out but not cleared, it is the
+# keyset pagination key
+class DecisionUpdate(DecisionBase):
+    decision_date: datetime = None
+
 class Decision(DecisionBase):
     id: int
     user_id: int
@@ -102,3 +120,56 @@ class Decision(DecisionBase):
     
     class Config:
         from_attributes = True
+
+# Slim listing row for GET /decisions/?view=summary
+class DecisionSummary(BaseModel):
+    id: int
+    title: str
+    category: str
+    confidence_score: int
+    decision_date: Optional[datetime] = None
+    review_date: Optional[datetime] = None
+    decision_quality: Optional[str] = None
+    outcome_quality: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+# Bulk ingestion
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkItemResult]
+
+# Search
+class SearchHit(BaseModel):
+    id: int
+    title: str
+    category: Optional[str] = None
+    decision_date: Optional[datetime] = None
+    rank: float
+    snippet: Optional[str] = None
+
+# Similar decisions
+class SimilarQuery(BaseModel):
+    title: str
+    description: Optional[str] = None
+    options: List[OptionCreate] = []
+    assumptions: List[AssumptionCreate] = []
+
+class SimilarDecision(BaseModel):
+    id: int
+    title: str
+    category: Optional[str] = None
+    decision_date: Optional[datetime] = None
+    confidence_score: Optional[int] = None
+    decision_quality: Optional[str] = None
+    outcome_quality: Optional[str] = None
+    outcome_rating: Optional[int] = None
+    lessons_learned: Optional[str] = None
+    score: float
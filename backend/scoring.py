@@ -0,0 +1,218 @@
+import argparse
+import asyncio
+import time
+from datetime import datetime
+import numpy as np
+from sqlalchemy import select, update, func, values, column, Integer, String, exists, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+import models, stats
+from database import AsyncSessionLocal, settings
+
+# Decision quality scoring.
+# A rule maps (confidence_score, outcome_rating) to decision_quality and
+# outcome_quality. Rules are versioned: review_decision scores with the
+# current one (settings.SCORING_RULE_VERSION) and stamps the version on the
+# row, and rescore() brings older rows up to date in short keyset-paginated
+# chunks, one set-based UPDATE per chunk. Progress lives in rescore_runs,
+# so an interrupted run picks up where it stopped.
+#
+# To tune thresholds, register a new version and point the setting at it:
+#
+#   register(QualityRule(version=2, high_confidence=75, low_confidence=35))
+
+class QualityRule:
+    def __init__(self, version: int, high_confidence: int = 70, low_confidence: int = 40,
+                 good_rating: int = 4, poor_rating: int = 2):
+        self.version = version
+        self.high_confidence = high_confidence
+        self.low_confidence = low_confidence
+        self.good_rating = good_rating
+        self.poor_rating = poor_rating
+
+    def score_arrays(self, confidence, rating):
+        # High confidence + good outcome = Good decision; + poor outcome =
+        # Poor (overconfidence). Low confidence + good outcome = Poor (luck);
+        # + poor outcome = Good (calibrated caution). Everything else Neutral.
+        confidence = np.asarray(confidence, dtype=np.float64)
+        rating = np.asarray(rating, dtype=np.float64)
+        good = rating >= self.good_rating
+        poor = rating <= self.poor_rating
+        high = confidence >= self.high_confidence
+        low = confidence <= self.low_confidence
+        outcome = np.select([good, poor], ["Good", "Poor"], "Average")
+        quality = np.select(
+            [good & high, good & low, poor & high, poor & low],
+            ["Good", "Poor", "Poor", "Good"],
+            "Neutral"
+        )
+        return quality, outcome
+
+    def score(self, confidence: int, rating: int):
+        quality, outcome = self.score_arrays([confidence], [rating])
+        return str(quality[0]), str(outcome[0])
+
+RULES = {}
+
+def register(rule: QualityRule):
+    RULES[rule.version] = rule
+    return rule
+
+def get_rule(version: int = None):
+    version = settings.SCORING_RULE_VERSION if version is None else version
+    if version not in RULES:
+        raise ValueError(f"Unknown scoring rule version {version}")
+    return RULES[version]
+
+register(QualityRule(version=1))
+
+# Batch re-scoring
+
+def _reviewed(query):
+    return query.join(models.Review, models.Review.decision_id == models.Decision.id)
+
+async def _open_run(db: AsyncSession, rule: QualityRule, restart: bool):
+    result = await db.execute(
+        select(models.RescoreRun)
+        .filter(models.RescoreRun.rule_version == rule.version, models.RescoreRun.status == "running")
+        .order_by(models.RescoreRun.id.desc())
+    )
+    runs = result.scalars().all()
+    if runs and not restart:
+        run = runs[0]
+    else:
+        for stale in runs:
+            stale.status = "abandoned"
+        total = (await db.execute(_reviewed(select(func.count(models.Decision.id))))).scalar()
+        run = models.RescoreRun(rule_version=rule.version, total=total, last_decision_id=0,
+                                processed=0, changed=0, status="running")
+        db.add(run)
+    await db.commit()
+    return run
+
+async def _rescore_chunk(db: AsyncSession, rule: QualityRule, after_id: int, chunk_size: int):
+    result = await db.execute(
+        _reviewed(select(
+            models.Decision.id, models.Decision.user_id,
+            models.Decision.confidence_score, models.Review.outcome_rating,
+            models.Decision.decision_quality, models.Decision.outcome_quality,
+            models.Decision.scoring_version,
+        ))
+        .filter(models.Decision.id > after_id)
+        .order_by(models.Decision.id)
+        .limit(chunk_size)
+    )
+    rows = result.all()
+    if not rows:
+        return None, 0, 0
+
+    ids, user_ids, confidence, rating, old_quality, old_outcome, old_version = zip(*rows)
+    quality, outcome = rule.score_arrays(
+        [np.nan if c is None else c for c in confidence],
+        [np.nan if r is None else r for r in rating]
+    )
+    changed = (
+        (quality != np.array(old_quality, dtype=object))
+        | (outcome != np.array(old_outcome, dtype=object))
+        | (np.array(old_version, dtype=object) != rule.version)
+    )
+    changed_rows = [
+        (ids[i], str(quality[i]), str(outcome[i])) for i in np.flatnonzero(changed)
+    ]
+    if changed_rows:
+        scored = values(
+            column("id", Integer), column("decision_quality", String), column("outcome_quality", String),
+            name="scored"
+        ).data(changed_rows).cte("scored")
+        await db.execute(
+            update(models.Decision)
+            .where(models.Decision.id == scored.c.id)
+            .values(
+                decision_quality=scored.c.decision_quality,
+                outcome_quality=scored.c.outcome_quality,
+                scoring_version=rule.version,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await stats.bump_versions(db, {user_ids[i] for i in np.flatnonzero(changed)})
+    return ids[-1], len(rows), len(changed_rows)
+
+async def rescore(version: int = None, chunk_size: int = None, restart: bool = False,
+                  pause_seconds: float = 0.0):
+    # Each chunk is its own short transaction (rows, user_stats bumps and the
+    # progress record together), so no lock on decisions outlives a chunk
+    rule = get_rule(version)
+    chunk_size = chunk_size or settings.RESCORE_CHUNK_SIZE
+    async with AsyncSessionLocal() as db:
+        run = await _open_run(db, rule, restart)
+    print(f"--- [RESCORE] Run {run.id} (rule v{rule.version}) from decision {run.last_decision_id}, "
+          f"{run.processed}/{run.total} done ---")
+
+    started = time.perf_counter()
+    processed_before = run.processed
+    last_report = started
+    while True:
+        async with AsyncSessionLocal() as db:
+            run = await db.get(models.RescoreRun, run.id)
+            last_id, processed, changed = await _rescore_chunk(db, rule, run.last_decision_id, chunk_size)
+            run.updated_at = datetime.utcnow()
+            if last_id is None:
+                run.status = "done"
+                run.finished_at = run.updated_at
+                await db.commit()
+                break
+            run.last_decision_id = last_id
+            run.processed += processed
+            run.changed += changed
+            await db.commit()
+
+        now = time.perf_counter()
+        if now - last_report >= 5:
+            rate = (run.processed - processed_before) / (now - started)
+            remaining = max(run.total - run.processed, 0)
+            print(f"--- [RESCORE] {run.processed}/{run.total} ({run.changed} changed), "
+                  f"{rate:,.0f} rows/s, ~{remaining / rate if rate else 0:.0f}s left ---")
+            last_report = now
+        if pause_seconds:
+            await asyncio.sleep(pause_seconds)
+
+    print(f"--- [RESCORE] Run {run.id} done: {run.processed} scored, {run.changed} changed "
+          f"in {time.perf_counter() - started:.1f}s ---")
+    return run
+
+async def run_pending():
+    # Scheduled by the leader at startup: resume an interrupted run, or start
+    # one if any reviewed decision was scored by another rule version
+    rule = get_rule()
+    async with AsyncSessionLocal() as db:
+        unfinished = (await db.execute(
+            select(models.RescoreRun.id)
+            .filter(models.RescoreRun.rule_version == rule.version, models.RescoreRun.status == "running")
+        )).first()
+        outdated = (await db.execute(select(exists(
+            _reviewed(select(models.Decision.id)).filter(or_(
+                models.Decision.scoring_version.is_(None),
+                models.Decision.scoring_version != rule.version
+            ))
+        )))).scalar()
+    if unfinished or outdated:
+        await rescore(rule.version)
+
+async def print_status():
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(models.RescoreRun).order_by(models.RescoreRun.id))
+        for run in result.scalars():
+            print(f"Run {run.id}: rule v{run.rule_version} {run.status} | {run.processed}/{run.total} "
+                  f"({run.changed} changed) | last decision {run.last_decision_id} | updated {run.updated_at}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score reviewed decisions with a scoring rule")
+    parser.add_argument("--version", type=int, help="rule version (default: SCORING_RULE_VERSION)")
+    parser.add_argument("--chunk-size", type=int)
+    parser.add_argument("--restart", action="store_true", help="start over instead of resuming")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between chunks")
+    parser.add_argument("--status", action="store_true", help="list runs and exit")
+    args = parser.parse_args()
+    if args.status:
+        asyncio.run(print_status())
+    else:
+        asyncio.run(rescore(args.version, args.chunk_size, args.restart, args.pause))
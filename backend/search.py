@@ -0,0 +1,156 @@
+import asyncio
+from sqlalchemy import DDL, event, text, bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from database import AsyncSessionLocal, Base
+
+# Full-text search over a user's decisions, options, assumptions and reviews.
+# Postgres: decisions.search_vector (weighted tsvector, GIN index).
+# SQLite: an FTS5 table keyed by decision id (rowid).
+# Both are refreshed by the write paths via refresh(db, ids), in the same
+# transaction as the change.
+
+SNIPPET_START = "<mark>"
+SNIPPET_STOP = "</mark>"
+
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS decision_search USING fts5("
+        "title, description, expected_outcome, options, assumptions, lessons, "
+        "user_id UNINDEXED, tokenize = 'porter unicode61')"
+    ).execute_if(dialect="sqlite"),
+)
+
+_PG_REFRESH = text("""
+    UPDATE decisions SET search_vector =
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '') || ' ' || coalesce(expected_outcome, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce((
+            SELECT lessons_learned FROM reviews WHERE reviews.decision_id = decisions.id LIMIT 1
+        ), '')), 'B') ||
+        setweight(to_tsvector('english',
+            coalesce((
+                SELECT string_agg(coalesce(option_name, '') || ' ' || coalesce(reasoning, ''), ' ')
+                FROM options WHERE options.decision_id = decisions.id
+            ), '') || ' ' ||
+            coalesce((
+                SELECT string_agg(assumption_text, ' ')
+                FROM assumptions WHERE assumptions.decision_id = decisions.id
+            ), '')
+        ), 'C')
+    WHERE id IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+_SQLITE_DELETE = text(
+    "DELETE FROM decision_search WHERE rowid IN :ids"
+).bindparams(bindparam("ids", expanding=True))
+
+_SQLITE_INSERT = text("""
+    INSERT INTO decision_search
+        (rowid, title, description, expected_outcome, options, assumptions, lessons, user_id)
+    SELECT d.id, d.title, d.description, d.expected_outcome,
+        (SELECT group_concat(coalesce(o.option_name, '') || ' ' || coalesce(o.reasoning, ''), ' ')
+         FROM options o WHERE o.decision_id = d.id),
+        (SELECT group_concat(a.assumption_text, ' ')
+         FROM assumptions a WHERE a.decision_id = d.id),
+        (SELECT r.lessons_learned FROM reviews r WHERE r.decision_id = d.id LIMIT 1),
+        d.user_id
+    FROM decisions d WHERE d.id IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+# Ranked matches first, headlines only for the page being returned
+_PG_SEARCH = text(f"""
+    SELECT hit.id, hit.title, hit.category, hit.decision_date, hit.rank,
+        ts_headline('english',
+            concat_ws(' ', hit.title, hit.description, hit.expected_outcome,
+                (SELECT lessons_learned FROM reviews WHERE reviews.decision_id = hit.id LIMIT 1),
+                (SELECT string_agg(concat_ws(' ', option_name, reasoning), ' ')
+                 FROM options WHERE options.decision_id = hit.id),
+                (SELECT string_agg(assumption_text, ' ')
+                 FROM assumptions WHERE assumptions.decision_id = hit.id)),
+            websearch_to_tsquery('english', :q),
+            'StartSel={SNIPPET_START}, StopSel={SNIPPET_STOP}, MaxFragments=2, MaxWords=20, MinWords=5'
+        ) AS snippet
+    FROM (
+        SELECT d.id, d.title, d.category, d.decision_date, d.description, d.expected_outcome,
+            ts_rank_cd(d.search_vector, websearch_to_tsquery('english', :q)) AS rank
+        FROM decisions d
+        WHERE d.user_id = :user_id AND d.search_vector @@ websearch_to_tsquery('english', :q)
+        ORDER BY rank DESC, d.id DESC
+        LIMIT :limit OFFSET :offset
+    ) AS hit
+    ORDER BY hit.rank DESC, hit.id DESC
+""")
+
+# bm25() is lower-is-better; weights follow the FTS5 column order
+_SQLITE_SEARCH = text(f"""
+    SELECT d.id, d.title, d.category, d.decision_date,
+        -bm25(decision_search, 10.0, 4.0, 4.0, 2.0, 2.0, 4.0, 0.0) AS rank,
+        snippet(decision_search, -1, '{SNIPPET_START}', '{SNIPPET_STOP}', '…', 16) AS snippet
+    FROM decision_search
+    JOIN decisions d ON d.id = decision_search.rowid
+    WHERE decision_search MATCH :q AND decision_search.user_id = :user_id
+    ORDER BY rank DESC, d.id DESC
+    LIMIT :limit OFFSET :offset
+""")
+
+def _is_postgres(db: AsyncSession):
+    return db.bind.dialect.name == "postgresql"
+
+def _fts5_query(q: str):
+    # Quote every term so user input can't inject FTS5 syntax; terms are ANDed
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+async def refresh(db: AsyncSession, decision_ids):
+    decision_ids = list(decision_ids)
+    if not decision_ids:
+        return
+    if _is_postgres(db):
+        await db.execute(_PG_REFRESH, {"ids": decision_ids})
+    else:
+        await db.execute(_SQLITE_DELETE, {"ids": decision_ids})
+        await db.execute(_SQLITE_INSERT, {"ids": decision_ids})
+
+async def search(db: AsyncSession, user_id: int, q: str, limit: int = 20, offset: int = 0):
+    params = {"user_id": user_id, "limit": limit, "offset": offset}
+    if _is_postgres(db):
+        result = await db.execute(_PG_SEARCH, dict(params, q=q))
+    else:
+        query = _fts5_query(q)
+        if not query:
+            return []
+        result = await db.execute(_SQLITE_SEARCH, dict(params, q=query))
+    return [dict(row._mapping) for row in result]
+
+async def rebuild(db: AsyncSession, batch_size: int = 1000):
+    # Backfill every decision's search document. Caller commits.
+    result = await db.stream(select(models.Decision.id).execution_options(yield_per=batch_size))
+    ids = [decision_id async for decision_id in result.scalars()]
+    for start in range(0, len(ids), batch_size):
+        await refresh(db, ids[start:start + batch_size])
+    return len(ids)
+
+_MISSING = {
+    "postgresql": text("SELECT id FROM decisions WHERE search_vector IS NULL ORDER BY id"),
+    "sqlite": text("SELECT id FROM decisions WHERE id NOT IN (SELECT rowid FROM decision_search) ORDER BY id"),
+}
+
+def backfill(conn, batch_size: int = 1000):
+    # Index the decisions that have no search document yet, e.g. rows from
+    # before search existed (see migrations.py). Takes a sync connection;
+    # caller commits.
+    ids = conn.execute(_MISSING[conn.dialect.name]).scalars().all()
+    for start in range(0, len(ids), batch_size):
+        batch = {"ids": ids[start:start + batch_size]}
+        conn.execute(_PG_REFRESH if conn.dialect.name == "postgresql" else _SQLITE_INSERT, batch)
+    return len(ids)
+
+if __name__ == "__main__":
+    async def main():
+        async with AsyncSessionLocal() as db:
+            count = await rebuild(db)
+            await db.commit()
+        print(f"Indexed {count} decision(s)")
+    asyncio.run(main())
@@ -0,0 +1,199 @@
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import select, func, text, insert
+import models, stats, rollups, search, auth_utils, scoring, migrations
+from database import engine, AsyncSessionLocal
+
+# Deterministic synthetic data loader for production-scale testing.
+#
+#   python seed.py --users 5000 --decisions 2000000 --workers 8
+#
+# Users get a heavy-tailed number of decisions and a personal calibration
+# bias; outcomes are correlated with confidence through that bias, so the
+# calibration and quality analytics have something to find. The same
+# --seed always produces the same rows (chunks are seeded independently,
+# so the output does not depend on --workers).
+#
+# Decision ids are assigned up front so options, assumptions and reviews can
+# be written without RETURNING. Postgres loads each chunk with COPY on its
+# own connection, --workers chunks at a time; SQLite (one writer) uses
+# batched executemany. Derived tables (user_stats, decision_rollups and,
+# unless --skip-search, the search index) are rebuilt at the end.
+
+ANCHOR = datetime(2025, 1, 1)   # fixed "now" so runs are reproducible
+CATEGORIES = np.array(["Career", "Finance", "Health", "Personal", "Business", "Education", "Relationships"])
+CATEGORY_WEIGHTS = np.array([0.22, 0.2, 0.12, 0.18, 0.14, 0.09, 0.05])
+PASSWORD = "password123"
+
+def plan_users(rng: np.random.Generator, users: int, decisions: int):
+    # Heavy-tailed activity: a few users own a large share of the decisions
+    weights = rng.lognormal(mean=0.0, sigma=1.2, size=users)
+    counts = rng.multinomial(decisions, weights / weights.sum())
+    owners = np.repeat(np.arange(users), counts)
+    # Positive bias = overconfident: outcomes lag behind stated confidence
+    bias = rng.normal(0.0, 0.15, size=users)
+    return owners, bias
+
+def generate_chunk(seed: int, chunk_index: int, first_id: int, owners, user_ids, bias, years: int):
+    # Rows for decisions [first_id, first_id + len(owners)); numpy does the
+    # sampling, the loops below only assemble tuples
+    rng = np.random.default_rng([seed, chunk_index])
+    n = len(owners)
+    span_minutes = years * 365 * 24 * 60
+    decision_dates = [ANCHOR - timedelta(minutes=int(m)) for m in rng.integers(1, span_minutes, size=n)]
+    categories = rng.choice(CATEGORIES, size=n, p=CATEGORY_WEIGHTS)
+    confidence = np.clip(np.rint(rng.beta(4, 2.2, size=n) * 100), 5, 99).astype(int)
+    review_after = rng.integers(14, 180, size=n)
+    review_lag = rng.integers(0, 30, size=n)
+    reviewed_draw = rng.random(size=n)
+    latent = confidence / 100 - bias[owners] + rng.normal(0, 0.18, size=n)
+    ratings = np.clip(np.rint(1 + 4 * latent), 1, 5).astype(int)
+    rule = scoring.get_rule()
+    qualities, outcomes = rule.score_arrays(confidence, ratings)
+    option_counts = rng.integers(1, 5, size=n)
+    assumption_counts = rng.integers(0, 4, size=n)
+    assumption_truth = rng.random(size=int(assumption_counts.sum()))
+
+    decisions, options, assumptions, reviews = [], [], [], []
+    a = 0
+    for i in range(n):
+        decision_id = first_id + i
+        decided = decision_dates[i]
+        review_date = decided + timedelta(days=int(review_after[i]))
+        reviewed_at = review_date + timedelta(days=int(review_lag[i]))
+        reviewed = reviewed_at < ANCHOR and reviewed_draw[i] < 0.7
+        category = str(categories[i])
+        conf = int(confidence[i])
+        quality = outcome = version = None
+        if reviewed:
+            quality, outcome, version = str(qualities[i]), str(outcomes[i]), rule.version
+            reviews.append((decision_id, int(ratings[i]), None, f"Lesson from decision {decision_id}.", reviewed_at))
+        decisions.append((
+            decision_id, int(user_ids[owners[i]]), f"{category} decision #{decision_id}", category,
+            f"Synthetic {category.lower()} decision generated by seed.py.", conf,
+            "An outcome in line with the stated confidence.", decided, review_date, decided,
+            quality, outcome, version,
+        ))
+        for k in range(option_counts[i]):
+            options.append((decision_id, f"Option {k + 1}", f"Reasoning for option {k + 1}."))
+        for k in range(assumption_counts[i]):
+            status = "pending"
+            if reviewed:
+                status = "true" if assumption_truth[a] < 0.6 else "false"
+            assumptions.append((decision_id, f"Assumption {k + 1} holds", status))
+            a += 1
+    return decisions, options, assumptions, reviews
+
+DECISION_COLUMNS = (
+    "id", "user_id", "title", "category", "description", "confidence_score", "expected_outcome",
+    "decision_date", "review_date", "created_at", "decision_quality", "outcome_quality", "scoring_version",
+)
+OPTION_COLUMNS = ("decision_id", "option_name", "reasoning")
+ASSUMPTION_COLUMNS = ("decision_id", "assumption_text", "status")
+REVIEW_COLUMNS = ("decision_id", "outcome_rating", "outcome_notes", "lessons_learned", "reviewed_at")
+
+TABLES = (
+    (models.Decision, DECISION_COLUMNS),
+    (models.Option, OPTION_COLUMNS),
+    (models.Assumption, ASSUMPTION_COLUMNS),
+    (models.Review, REVIEW_COLUMNS),
+)
+
+async def write_chunk(rows_by_table):
+    # One transaction per chunk, so a failed run leaves whole chunks behind
+    async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            raw = (await conn.get_raw_connection()).driver_connection
+            for (model, columns), rows in zip(TABLES, rows_by_table):
+                if rows:
+                    await raw.copy_records_to_table(model.__tablename__, records=rows, columns=columns)
+        else:
+            for (model, columns), rows in zip(TABLES, rows_by_table):
+                if rows:
+                    await conn.execute(insert(model.__table__), [dict(zip(columns, row)) for row in rows])
+    return sum(len(rows) for rows in rows_by_table)
+
+async def _next_id(conn, model):
+    return ((await conn.execute(select(func.max(model.id)))).scalar() or 0) + 1
+
+async def _reset_sequences(conn):
+    if conn.dialect.name != "postgresql":
+        return
+    for table in ("users", "decisions"):
+        await conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"coalesce((SELECT max(id) FROM {table}), 1))"
+        ))
+
+async def seed(args):
+    async with engine.begin() as conn:
+        await migrations.create_schema(conn)
+        first_user = await _next_id(conn, models.User)
+        first_decision = await _next_id(conn, models.Decision)
+
+    rng = np.random.default_rng(args.seed)
+    owners, bias = plan_users(rng, args.users, args.decisions)
+    user_ids = np.arange(first_user, first_user + args.users)
+
+    # Everyone shares one password; hashing it per user would dominate the run
+    password_hash = auth_utils.get_password_hash(PASSWORD)
+    created = ANCHOR - timedelta(days=365 * args.years)
+    users = [
+        {"id": int(uid), "name": f"Seed User {uid}", "email": f"seed{args.seed}-{uid}@example.com",
+         "password_hash": password_hash, "created_at": created}
+        for uid in user_ids
+    ]
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        for start in range(0, len(users), args.chunk_size):
+            await conn.execute(insert(models.User.__table__), users[start:start + args.chunk_size])
+    written = len(users)
+
+    parallel = args.workers if engine.dialect.name == "postgresql" else 1
+    pending = set()
+    chunk_starts = range(0, args.decisions, args.chunk_size)
+    for chunk_index, start in enumerate(chunk_starts):
+        rows = generate_chunk(
+            args.seed, chunk_index, first_decision + start,
+            owners[start:start + args.chunk_size], user_ids, bias, args.years
+        )
+        pending.add(asyncio.create_task(write_chunk(rows)))
+        if len(pending) >= parallel:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            written += sum(task.result() for task in done)
+        if chunk_index % 20 == 19:
+            elapsed = time.perf_counter() - started
+            print(f"   {start + args.chunk_size:>10} decisions | {written / elapsed:,.0f} rows/s")
+    if pending:
+        written += sum(task.result() for task in (await asyncio.wait(pending))[0])
+    elapsed = time.perf_counter() - started
+    print(f"Loaded {written:,} rows in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s)")
+
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        await _reset_sequences(conn)
+    async with AsyncSessionLocal() as db:
+        await stats.rebuild(db)
+        buckets = await rollups.rebuild(db)
+        indexed = 0 if args.skip_search else await search.rebuild(db)
+        await db.commit()
+    print(f"Rebuilt stats, {buckets} rollup bucket(s) and {indexed} search document(s) "
+          f"in {time.perf_counter() - started:.1f}s")
+    print(f"Seeded users log in as seed{args.seed}-<id>@example.com / {PASSWORD}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load deterministic synthetic data")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--decisions", type=int, default=100_000)
+    parser.add_argument("--years", type=int, default=3, help="spread decision dates over this many years")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="decisions per chunk/transaction")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent COPY connections (Postgres)")
+    parser.add_argument("--skip-search", action="store_true", help="do not build the search index")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    asyncio.run(seed(parse_args()))
@@ -0,0 +1,376 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import traceback
+import zlib
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from database import AsyncSessionLocal, settings
+
+# "Similar past decisions": per-user hashed TF-IDF vectors, cosine top-k.
+#
+# Text (title, description, options, assumptions) is tokenized and hashed
+# into SIMILARITY_DIMENSIONS buckets (signed hashing trick), giving an
+# L2-normalized term-frequency row per decision. Rows live in per-user
+# memory-mapped files, so a restart only reopens them. IDF comes from the
+# per-user document frequencies at query time, so
+#
+#     score = (TF @ (q * idf^2)) / (row_norms * |q * idf|)
+#
+# is one matrix-vector product; row_norms (|row * idf|) are refreshed
+# whenever the document count has grown by a quarter since they were last
+# computed.
+#
+# Files under SIMILARITY_INDEX_DIR/<user_id>/: tf.f32 (capacity x dims),
+# ids.i64 and norms.f32 (capacity), df.f32 (dims) and meta.json. Writers
+# hold the user's lock file; readers reopen when meta.json changes, so
+# several workers on one host share one index. The database stays the
+# source of truth: a missing index is rebuilt on first use and
+# `python similarity.py` rebuilds everything.
+
+TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i if in into is it its my of on or our so "
+    "that the their then there these this to was we were will with would should could not no "
+    "do does did than too very can just about".split()
+)
+REWEIGHT_GROWTH = 1.25
+OPEN_INDEXES = 256
+
+def tokens(text):
+    return [t for t in TOKEN.findall((text or "").lower()) if t not in STOPWORDS and len(t) > 1]
+
+def decision_text(title, description, options, assumptions):
+    # options: (option_name, reasoning) pairs; assumptions: texts. The title
+    # is repeated so it outweighs the longer free-text fields.
+    parts = [title, title, description]
+    parts.extend(f"{name or ''} {reasoning or ''}" for name, reasoning in options)
+    parts.extend(assumptions)
+    return " ".join(part for part in parts if part)
+
+def vectorize(text: str, dims: int):
+    counts = Counter(tokens(text))
+    row = np.zeros(dims, dtype=np.float32)
+    if not counts:
+        return row
+    hashes = np.fromiter((zlib.crc32(t.encode()) for t in counts), dtype=np.uint32, count=len(counts))
+    weights = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(row, (hashes % dims).astype(np.int64), weights * signs)
+    norm = np.linalg.norm(row)
+    return row / norm if norm else row
+
+@contextmanager
+def _file_lock(path: str):
+    # Blocking exclusive lock; held only for the few ms of an index write
+    with open(path, "a+") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+class UserIndex:
+    def __init__(self, directory: str, dims: int):
+        self.directory = directory
+        self.dims = dims
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._loaded_stamp = None
+        self.count = 0
+        self.capacity = 0
+        self.docs = 0
+        self.weighted_docs = 0
+        self.rows = {}
+        # Queries and writes run in worker threads; one at a time per index
+        self.lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def exists(self):
+        return os.path.exists(self._meta_path)
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self._meta_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _open(self, mode: str):
+        shape = (max(self.capacity, 1),)
+        self.tf = np.memmap(self._path("tf.f32"), dtype=np.float32, mode=mode, shape=shape + (self.dims,))
+        self.ids = np.memmap(self._path("ids.i64"), dtype=np.int64, mode=mode, shape=shape)
+        self.norms = np.memmap(self._path("norms.f32"), dtype=np.float32, mode=mode, shape=shape)
+        self.df = np.memmap(self._path("df.f32"), dtype=np.float32, mode=mode, shape=(self.dims,))
+
+    def refresh(self):
+        # (Re)open if another process (or this one) rewrote the index
+        stamp = self._stamp()
+        if stamp is None or stamp == self._loaded_stamp:
+            return
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        if meta["dims"] != self.dims:
+            raise ValueError("Index was built with different dimensions; rebuild it")
+        self.count, self.capacity = meta["count"], meta["capacity"]
+        self.docs, self.weighted_docs = meta["docs"], meta["weighted_docs"]
+        self._open("r+")
+        self.rows = {int(decision_id): row for row, decision_id in enumerate(self.ids[:self.count])}
+        self._loaded_stamp = stamp
+
+    def _write_meta(self):
+        meta = {
+            "dims": self.dims, "count": self.count, "capacity": self.capacity,
+            "docs": self.docs, "weighted_docs": self.weighted_docs,
+        }
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._meta_path)
+        self._loaded_stamp = self._stamp()
+
+    def _grow(self, needed: int):
+        capacity = max(64, self.capacity)
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+        if self.capacity:
+            old = (self.tf[:self.count].copy(), self.ids[:self.count].copy(), self.norms[:self.count].copy())
+            df = self.df.copy()
+        else:
+            old = (np.empty((0, self.dims)), np.empty(0), np.empty(0))
+            df = np.zeros(self.dims, dtype=np.float32)
+        self.capacity = capacity
+        # New files are written aside and swapped in, so readers that still
+        # map the old ones keep a consistent view until they reopen
+        for name, dtype, shape, data in (
+            ("tf.f32", np.float32, (capacity, self.dims), old[0]),
+            ("ids.i64", np.int64, (capacity,), old[1]),
+            ("norms.f32", np.float32, (capacity,), old[2]),
+            ("df.f32", np.float32, (self.dims,), df),
+        ):
+            tmp = self._path(name + ".tmp")
+            mapped = np.memmap(tmp, dtype=dtype, mode="w+", shape=shape)
+            mapped[:len(data)] = data
+            mapped.flush()
+            del mapped
+            os.replace(tmp, self._path(name))
+        self._open("r+")
+
+    def idf(self):
+        return np.log((1.0 + self.docs) / (1.0 + self.df)) + 1.0
+
+    def _reweight(self):
+        idf2 = self.idf() ** 2
+        self.norms[:self.count] = np.sqrt((self.tf[:self.count] ** 2) @ idf2)
+        self.weighted_docs = self.docs
+
+    def upsert(self, entries):
+        # entries: (decision_id, tf_row) pairs. Caller holds the lock.
+        new = [decision_id for decision_id, _ in entries if decision_id not in self.rows]
+        if self.count + len(new) > self.capacity:
+            self._grow(self.count + len(new))
+        for decision_id, row in entries:
+            index = self.rows.get(decision_id)
+            if index is None:
+                index = self.count
+                self.count += 1
+                self.docs += 1
+                self.rows[decision_id] = index
+                self.ids[index] = decision_id
+            else:
+                self.df -= self.tf[index] != 0
+            self.tf[index] = row
+            self.df += row != 0
+            self.norms[index] = np.sqrt((row ** 2) @ (self.idf() ** 2))
+        if self.docs >= max(self.weighted_docs * REWEIGHT_GROWTH, 8):
+            self._reweight()
+        for array in (self.tf, self.ids, self.norms, self.df):
+            array.flush()
+        self._write_meta()
+
+    def top_k(self, query_row, k: int, exclude=None):
+        if not self.count or not query_row.any():
+            return []
+        idf = self.idf()
+        weighted = query_row * idf
+        query_norm = np.linalg.norm(weighted)
+        scores = (self.tf[:self.count] @ (weighted * idf)) / (np.maximum(self.norms[:self.count], 1e-12) * query_norm)
+        if exclude is not None and exclude in self.rows:
+            scores[self.rows[exclude]] = -np.inf
+        k = min(k, self.count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[i]), float(scores[i])) for i in top if scores[i] > 0]
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+def _user_index(user_id: int):
+    with _indexes_lock:
+        index = _indexes.get(user_id)
+        if index is None:
+            directory = os.path.join(settings.SIMILARITY_INDEX_DIR, str(user_id))
+            index = _indexes[user_id] = UserIndex(directory, settings.SIMILARITY_DIMENSIONS)
+            if len(_indexes) > OPEN_INDEXES:
+                _indexes.popitem(last=False)
+        else:
+            _indexes.move_to_end(user_id)
+    return index
+
+async def _load_texts(db: AsyncSession, user_id: int, decision_ids=None):
+    # {decision_id: text} for the given decisions (or all of the user's)
+    query = select(models.Decision.id, models.Decision.title, models.Decision.description).filter(
+        models.Decision.user_id == user_id
+    )
+    if decision_ids is not None:
+        query = query.filter(models.Decision.id.in_(decision_ids))
+    decisions = {row.id: row for row in (await db.execute(query)).all()}
+    if not decisions:
+        return {}
+    owned = list(decisions)
+    options, assumptions = {}, {}
+    result = await db.execute(
+        select(models.Option.decision_id, models.Option.option_name, models.Option.reasoning)
+        .filter(models.Option.decision_id.in_(owned))
+    )
+    for decision_id, name, reasoning in result:
+        options.setdefault(decision_id, []).append((name, reasoning))
+    result = await db.execute(
+        select(models.Assumption.decision_id, models.Assumption.assumption_text)
+        .filter(models.Assumption.decision_id.in_(owned))
+    )
+    for decision_id, text in result:
+        assumptions.setdefault(decision_id, []).append(text)
+    return {
+        decision_id: decision_text(row.title, row.description, options.get(decision_id, []),
+                                   assumptions.get(decision_id, []))
+        for decision_id, row in decisions.items()
+    }
+
+def _write(index: UserIndex, texts, rebuild: bool = False):
+    os.makedirs(index.directory, exist_ok=True)
+    with index.lock, _file_lock(os.path.join(index.directory, "lock")):
+        if rebuild:
+            for name in ("meta.json", "tf.f32", "ids.i64", "norms.f32", "df.f32"):
+                if os.path.exists(index._path(name)):
+                    os.remove(index._path(name))
+            index.count = index.capacity = index.docs = index.weighted_docs = 0
+            index.rows = {}
+            index._grow(len(texts))
+        else:
+            # Checked under the lock: invalidate() may have dropped the index
+            # since the caller looked. Appending would leave an index of just
+            # these rows; instead the next lookup rebuilds it from the database.
+            index.refresh()
+            if not index.exists():
+                return
+        index.upsert([(decision_id, vectorize(text, index.dims)) for decision_id, text in texts.items()])
+
+def _query(index: UserIndex, text: str, k: int, exclude):
+    with index.lock:
+        index.refresh()
+        return index.top_k(vectorize(text, index.dims), k, exclude)
+
+async def ensure_index(db: AsyncSession, user_id: int):
+    index = _user_index(user_id)
+    if not index.exists():
+        texts = await _load_texts(db, user_id)
+        await asyncio.to_thread(_write, index, texts, True)
+    return index
+
+async def refresh(db: AsyncSession, user_id: int, decision_ids):
+    # The request has already succeeded, so a failure here is only logged;
+    # a rebuild repairs it.
+    try:
+        index = _user_index(user_id)
+        if not index.exists():
+            return  # built from the database on first lookup
+        texts = await _load_texts(db, user_id, list(decision_ids))
+        if texts:
+            await asyncio.to_thread(_write, index, texts)
+    except Exception:
+        traceback.print_exc()
+
+async def refresh_in_background(user_id: int, decision_ids):
+    # What the write paths schedule (BackgroundTasks): runs after the
+    # response is sent, on its own session since the request's is closed
+    async with AsyncSessionLocal() as db:
+        await refresh(db, user_id, decision_ids)
+
+def _drop(index: UserIndex):
+    with index.lock, _file_lock(os.path.join(index.directory, "lock")):
+        if index.exists():
+            os.remove(index._meta_path)
+
+async def invalidate(user_ids):
+    # After bulk removals (archive.py): without meta.json the index counts as
+    # missing and is rebuilt from the database on the next lookup
+    for user_id in user_ids:
+        index = _user_index(user_id)
+        if index.exists():
+            await asyncio.to_thread(_drop, index)
+
+async def similar(db: AsyncSession, user_id: int, text: str, k: int, exclude: int = None):
+    index = await ensure_index(db, user_id)
+    return await asyncio.to_thread(_query, index, text, k, exclude)
+
+async def decision_text_for(db: AsyncSession, user_id: int, decision_id: int):
+    texts = await _load_texts(db, user_id, [decision_id])
+    return texts.get(decision_id)
+
+async def describe(db: AsyncSession, user_id: int, hits):
+    # Hit rows for the response, with the lessons from each review. Indexes
+    # are per user, but ownership is still checked here, not assumed.
+    if not hits:
+        return []
+    scores = dict(hits)
+    result = await db.execute(
+        select(
+            models.Decision.id, models.Decision.title, models.Decision.category,
+            models.Decision.decision_date, models.Decision.confidence_score,
+            models.Decision.decision_quality, models.Decision.outcome_quality,
+            models.Review.outcome_rating, models.Review.lessons_learned,
+        )
+        .outerjoin(models.Review, models.Review.decision_id == models.Decision.id)
+        .filter(models.Decision.id.in_(list(scores)), models.Decision.user_id == user_id)
+    )
+    rows = [dict(row._mapping, score=round(scores[row.id], 4)) for row in result]
+    rows.sort(key=lambda row: -row["score"])
+    return rows
+
+async def rebuild_all():
+    async with AsyncSessionLocal() as db:
+        user_ids = (await db.execute(select(models.User.id))).scalars().all()
+        for user_id in user_ids:
+            texts = await _load_texts(db, user_id)
+            await asyncio.to_thread(_write, _user_index(user_id), texts, True)
+    return len(user_ids)
+
+if __name__ == "__main__":
+    count = asyncio.run(rebuild_all())
+    print(f"Rebuilt similarity indexes for {count} user(s)")
@@ -0,0 +1,171 @@
+import asyncio
+import sys
+from sqlalchemy import select, update, delete, insert, func
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from database import AsyncSessionLocal, note_write
+
+# Per-user running totals for /analytics/overview.
+# Every user gets a row when they register (migrations.py adds one for
+# users who predate the table). The write paths in routers/decisions.py
+# apply deltas in their own transaction; rebuild() recomputes everything
+# from the source tables.
+# Every delta also bumps data_version, which etags.py exposes as the ETag.
+
+STAT_COLUMNS = ("total_decisions", "reviewed_decisions", "confidence_sum", "review_count", "outcome_sum")
+
+async def _apply(db: AsyncSession, user_id: int, **deltas):
+    note_write(user_id)
+    stats = models.UserStats
+    result = await db.execute(
+        update(stats)
+        .where(stats.user_id == user_id)
+        .values(
+            {name: getattr(stats, name) + delta for name, delta in deltas.items()}
+            | {"data_version": stats.data_version + 1}
+        )
+        .returning(*(getattr(stats, name) for name in STAT_COLUMNS + ("data_version",)))
+        .execution_options(synchronize_session=False)
+    )
+    row = result.mappings().first()
+    if row is None:
+        # No row yet (user predates the stats table): the pending write is
+        # already flushed, so a rebuild picks it up.
+        return (await rebuild(db, user_id))[0]
+    return dict(row)
+
+def create(db: AsyncSession, user_id: int):
+    # A new user's zero totals, in the registration transaction
+    db.add(models.UserStats(user_id=user_id, total_decisions=0, reviewed_decisions=0, confidence_sum=0,
+                            review_count=0, outcome_sum=0, data_version=0))
+
+# The helpers below return the updated totals (plus data_version), which
+# overview_of() turns into the /analytics/overview shape
+
+async def add_decisions(db: AsyncSession, user_id: int, count: int, confidence_sum: int):
+    return await _apply(db, user_id, total_decisions=count, confidence_sum=confidence_sum)
+
+async def change_confidence(db: AsyncSession, user_id: int, delta: int):
+    # Applied on every edit, even with a zero delta, so the version moves
+    return await _apply(db, user_id, confidence_sum=delta)
+
+async def bump_version(db: AsyncSession, user_id: int):
+    return await _apply(db, user_id)
+
+async def bump_versions(db: AsyncSession, user_ids):
+    # Invalidates ETags for many users at once (e.g. after a re-score)
+    user_ids = list(user_ids)
+    for user_id in user_ids:
+        note_write(user_id)
+    if user_ids:
+        await db.execute(
+            update(models.UserStats)
+            .where(models.UserStats.user_id.in_(user_ids))
+            .values(data_version=models.UserStats.data_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+async def add_review(db: AsyncSession, user_id: int, outcome_rating: int):
+    return await _apply(db, user_id, reviewed_decisions=1, review_count=1, outcome_sum=outcome_rating)
+
+async def subtract(db: AsyncSession, user_id: int, totals: dict):
+    # Takes rows moved out of the hot tables (archive.py) off the totals
+    return await _apply(db, user_id, **{name: -totals[name] for name in STAT_COLUMNS})
+
+def overview_of(row):
+    total = row["total_decisions"]
+    reviewed = row["reviewed_decisions"]
+    avg_confidence = row["confidence_sum"] / total if total else 0
+    avg_outcome = row["outcome_sum"] / row["review_count"] if row["review_count"] else 0
+    return {
+        "total_decisions": total,
+        "reviewed_decisions": reviewed,
+        "pending_decisions": total - reviewed,
+        "average_confidence": round(avg_confidence, 1),
+        "average_outcome": round(avg_outcome, 1)
+    }
+
+async def get_totals(db: AsyncSession, user_id: int):
+    row = await db.get(models.UserStats, user_id)
+    if row is None:
+        # Not there yet (e.g. a replica still catching up): compute it, but
+        # leave storing it to the write paths; reads never write
+        rows = await compute(db, user_id)
+        return rows[0] if rows else dict.fromkeys(STAT_COLUMNS, 0)
+    # Usually already in the identity map from the ETag check
+    return {name: getattr(row, name) for name in STAT_COLUMNS}
+
+async def get_overview(db: AsyncSession, user_id: int):
+    return overview_of(await get_totals(db, user_id))
+
+def _grouped_query(user_id=None):
+    # One pass over users -> decisions -> reviews. Each decision has at most
+    # one review, so the outer join does not inflate the decision counts.
+    query = (
+        select(
+            models.User.id.label("user_id"),
+            func.count(models.Decision.id).label("total_decisions"),
+            func.count(models.Decision.decision_quality).label("reviewed_decisions"),
+            func.coalesce(func.sum(models.Decision.confidence_score), 0).label("confidence_sum"),
+            func.count(models.Review.id).label("review_count"),
+            func.coalesce(func.sum(models.Review.outcome_rating), 0).label("outcome_sum"),
+        )
+        .select_from(models.User)
+        .outerjoin(models.Decision, models.Decision.user_id == models.User.id)
+        .outerjoin(models.Review, models.Review.decision_id == models.Decision.id)
+        .group_by(models.User.id)
+    )
+    if user_id is not None:
+        query = query.where(models.User.id == user_id)
+    return query
+
+async def compute(db: AsyncSession, user_id=None):
+    result = await db.execute(_grouped_query(user_id))
+    return [dict(row._mapping) for row in result]
+
+# Recompute stats from scratch for one user (or everyone). Caller commits.
+async def rebuild(db: AsyncSession, user_id=None):
+    rows = await compute(db, user_id)
+    if user_id is not None and not rows:
+        rows = [dict({name: 0 for name in STAT_COLUMNS}, user_id=user_id)]
+
+    # Carry data_version forward (and bump it) so no stale ETag can match
+    versions = select(models.UserStats.user_id, models.UserStats.data_version)
+    clear = delete(models.UserStats)
+    if user_id is not None:
+        versions = versions.where(models.UserStats.user_id == user_id)
+        clear = clear.where(models.UserStats.user_id == user_id)
+    previous = dict((await db.execute(versions)).all())
+    for row in rows:
+        row["data_version"] = previous.get(row["user_id"], 0) + 1
+
+    await db.execute(clear.execution_options(synchronize_session=False))
+    if rows:
+        await db.execute(insert(models.UserStats), rows)
+    return rows
+
+# Users whose stored stats disagree with the source tables
+async def find_drift(db: AsyncSession):
+    expected = {row["user_id"]: row for row in await compute(db)}
+    result = await db.execute(select(models.UserStats))
+    stored = {row.user_id: row for row in result.scalars()}
+
+    drifted = []
+    for user_id, row in expected.items():
+        current = stored.get(user_id)
+        if current is None or any(getattr(current, name) != row[name] for name in STAT_COLUMNS):
+            drifted.append(user_id)
+    return drifted
+
+async def main(check_only: bool):
+    async with AsyncSessionLocal() as db:
+        if check_only:
+            drifted = await find_drift(db)
+            print(f"{len(drifted)} user(s) with drifted stats: {drifted}")
+            return
+        rows = await rebuild(db)
+        await db.commit()
+        print(f"Rebuilt stats for {len(rows)} user(s)")
+
+if __name__ == "__main__":
+    asyncio.run(main("--check" in sys.argv))
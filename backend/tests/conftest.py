@@ -0,0 +1,83 @@
+import contextlib
+import itertools
+import os
+import sys
+import tempfile
+
+# The app reads its settings when database.py is imported: point it at a
+# throwaway SQLite database and directories first.
+#
+#   cd backend && python -m pytest -q
+_tmp = tempfile.mkdtemp(prefix="decision-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ["ARCHIVE_DIR"] = os.path.join(_tmp, "archive")
+os.environ["SIMILARITY_INDEX_DIR"] = os.path.join(_tmp, "similarity_index")
+os.environ["RATE_LIMIT_PER_SECOND"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import pytest
+from sqlalchemy import event
+from main import app
+from database import engine
+
+_emails = itertools.count(1)
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture(scope="session")
+async def client():
+    # One app (startup, schema, leader election) and one database for the
+    # whole run; every test registers its own user
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            yield c
+
+@pytest.fixture
+async def headers(client):
+    email = f"user{next(_emails)}@example.com"
+    response = await client.post("/auth/register", json={"email": email, "name": "Test", "password": "password123"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def decision_payload(**overrides):
+    payload = {
+        "title": "Take the new job",
+        "category": "Career",
+        "description": "Weighing an offer against staying put.",
+        "confidence_score": 70,
+        "expected_outcome": "More interesting work.",
+        "decision_date": "2024-03-01T09:00:00",
+        "options": [{"option_name": "Accept", "reasoning": "Growth."}, {"option_name": "Decline"}],
+        "assumptions": [{"assumption_text": "The team is good"}],
+    }
+    payload.update(overrides)
+    return payload
+
+@pytest.fixture
+def create_decision(client, headers):
+    async def create(**overrides):
+        response = await client.post("/decisions/", json=decision_payload(**overrides), headers=headers)
+        assert response.status_code == 200, response.text
+        return response.json()
+    return create
+
+@contextlib.contextmanager
+def inserts():
+    # INSERT statements sent to the database, by table
+    counts = {}
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        words = statement.split()
+        if words[:2] == ["INSERT", "INTO"]:
+            table = words[2].strip('"')
+            counts[table] = counts.get(table, 0) + 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        yield counts
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
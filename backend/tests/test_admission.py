@@ -0,0 +1,108 @@
+import asyncio
+import anyio
+import pytest
+import admission
+
+pytestmark = pytest.mark.anyio
+
+def _shed(reason):
+    return admission.shed.values.get((("reason", reason),), 0)
+
+async def test_bucket_allows_a_burst_then_refills():
+    buckets = admission.TokenBuckets(rate=20, burst=2)
+    assert buckets.take("a") == buckets.take("a") == 0
+    wait = buckets.take("a")
+    assert 0 < wait <= 0.05
+    assert buckets.take("b") == 0  # buckets are per client
+    await anyio.sleep(0.06)
+    assert buckets.take("a") == 0
+
+def test_rate_zero_disables_the_buckets():
+    buckets = admission.TokenBuckets(rate=0, burst=1)
+    assert all(buckets.take("a") == 0 for _ in range(10))
+    assert buckets.stats() == {"tracked_clients": 0}
+
+def test_bucket_table_is_bounded():
+    buckets = admission.TokenBuckets(rate=1, burst=5, max_keys=10)
+    for n in range(25):
+        buckets.take(f"client{n}")
+    assert buckets.stats()["tracked_clients"] <= 10
+
+async def test_waiters_are_admitted_in_order():
+    limiter = admission.ConcurrencyLimiter(limit=1, max_queued=5)
+    await limiter.acquire(1)
+    order = []
+
+    async def request(name):
+        await limiter.acquire(1)
+        order.append(name)
+
+    async with anyio.create_task_group() as tasks:
+        for name in ("a", "b", "c"):
+            tasks.start_soon(request, name)
+            await anyio.sleep(0.01)
+        assert limiter.stats()["queued"] == 3
+        for _ in range(3):
+            limiter.release()
+            await anyio.sleep(0.01)
+    assert order == ["a", "b", "c"]
+    limiter.release()
+    assert limiter.stats() == {"limit": 1, "in_flight": 0, "queued": 0, "admitted": 4}
+
+async def test_full_queue_and_timeout_are_shed():
+    limiter = admission.ConcurrencyLimiter(limit=1, max_queued=1)
+    await limiter.acquire(1)
+    waiting = asyncio.ensure_future(limiter.acquire(0.05))
+    await anyio.sleep(0.01)
+    with pytest.raises(admission.Shed) as full:
+        await limiter.acquire(1)
+    assert (full.value.reason, full.value.status_code) == ("queue_full", 503)
+    with pytest.raises(admission.Shed) as timed_out:
+        await waiting
+    assert timed_out.value.reason == "queue_timeout" and timed_out.value.retry_after == 1
+    limiter.release()
+    assert limiter.stats()["in_flight"] == 0
+
+async def test_cancelled_waiter_gives_up_its_place():
+    limiter = admission.ConcurrencyLimiter(limit=1, max_queued=5)
+    await limiter.acquire(1)
+    gone = asyncio.ensure_future(limiter.acquire(1))
+    await anyio.sleep(0.01)
+    gone.cancel()
+    await anyio.sleep(0.01)
+    limiter.release()
+    assert limiter.stats()["in_flight"] == 0 and limiter.stats()["queued"] == 0
+
+async def test_rate_limited_requests_get_429(client, headers, monkeypatch):
+    monkeypatch.setattr(admission, "buckets", admission.TokenBuckets(rate=0.5, burst=2))
+    # Until the token has been verified once, the client is keyed by address
+    await client.get("/decisions/", headers=headers)
+    assert admission.client_key({"headers": [(b"authorization", headers["Authorization"].encode())]}).startswith("user:")
+    before = _shed("rate_limited")
+
+    for _ in range(2):
+        assert (await client.get("/decisions/", headers=headers)).status_code == 200
+    response = await client.get("/decisions/", headers=headers)
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2"
+    assert response.json() == {"detail": "Too many requests"}
+    assert _shed("rate_limited") == before + 1
+    # Metrics are never limited
+    assert (await client.get("/metrics")).status_code == 200
+
+def test_unknown_tokens_are_keyed_by_address():
+    scope = {"headers": [(b"authorization", b"Bearer forged")], "client": ("10.0.0.1", 1234)}
+    assert admission.client_key(scope) == "ip:10.0.0.1"
+
+async def test_requests_beyond_the_pool_get_503(client, headers, monkeypatch):
+    limiter = admission.ConcurrencyLimiter(limit=1, max_queued=0)
+    monkeypatch.setattr(admission, "limiter", limiter)
+    await limiter.acquire(1)  # a request in flight
+    try:
+        response = await client.get("/decisions/", headers=headers)
+    finally:
+        limiter.release()
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert (await client.get("/decisions/", headers=headers)).status_code == 200
+    assert limiter.stats()["in_flight"] == 0
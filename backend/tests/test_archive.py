@@ -0,0 +1,98 @@
+import asyncio
+import os
+from datetime import datetime
+import pytest
+from sqlalchemy import select, update
+import archive, models
+from database import AsyncSessionLocal, settings
+
+pytestmark = pytest.mark.anyio
+
+async def _backdate_reviews(decision_ids):
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(models.Review).where(models.Review.decision_id.in_(decision_ids)).values(reviewed_at=datetime(2020, 6, 1))
+        )
+        await db.commit()
+
+async def _reviewed(client, headers, create_decision, **overrides):
+    decision = await create_decision(decision_date="2020-01-15T10:00:00", **overrides)
+    response = await client.post(f"/decisions/{decision['id']}/review", json={"outcome_rating": 4}, headers=headers)
+    assert response.status_code == 200
+    await _backdate_reviews([decision["id"]])
+    return decision["id"]
+
+async def test_round_trip_and_include_archived(client, headers, create_decision):
+    old = [await _reviewed(client, headers, create_decision, title=f"Old {n}", confidence_score=60 + n) for n in range(3)]
+    recent = await create_decision(title="Recent")
+    before = {
+        path: (await client.get(path, headers=headers)).json()
+        for path in [f"/decisions/{old[0]}", "/analytics/overview", "/analytics/calibration",
+                     "/analytics/timeseries?granularity=month"]
+    }
+
+    assert await archive.archive(12) >= 3
+    # Gone from the hot tables...
+    assert (await client.get(f"/decisions/{old[0]}", headers=headers)).status_code == 404
+    assert (await client.get(f"/decisions/{recent['id']}", headers=headers)).status_code == 200
+    hot = (await client.get("/analytics/overview", headers=headers)).json()
+    assert hot["total_decisions"] == 1 and hot["reviewed_decisions"] == 0
+    listed = (await client.get("/decisions/", headers=headers)).json()
+    assert [d["id"] for d in listed] == [recent["id"]]
+
+    # ...and back, unchanged, with include_archived
+    for path, expected in before.items():
+        separator = "&" if "?" in path else "?"
+        response = await client.get(f"{path}{separator}include_archived=true", headers=headers)
+        assert response.status_code == 200
+        assert response.json() == expected, path
+
+    segments = archive.committed_segments()
+    assert segments and all(os.path.exists(os.path.join(settings.ARCHIVE_DIR, s["name"])) for s in segments)
+    # Nothing left to move
+    assert await archive.archive(12) == 0
+
+async def test_rows_edited_while_writing_are_not_lost(client, headers, create_decision, monkeypatch):
+    decision_id = await _reviewed(client, headers, create_decision)
+    assumption_id = (await client.get(f"/decisions/{decision_id}", headers=headers)).json()["assumptions"][0]["id"]
+    loop = asyncio.get_running_loop()
+    write_segment = archive._write_segment
+    edits = []
+
+    def write_while_editing(path, rows):
+        # Runs in a worker thread: the user's edit lands mid-write
+        users = write_segment(path, rows)
+        if not edits:
+            edits.append(asyncio.run_coroutine_threadsafe(client.patch(
+                f"/decisions/assumptions/{assumption_id}", json={"status": "invalidated"}, headers=headers
+            ), loop).result())
+        return users
+
+    monkeypatch.setattr(archive, "_write_segment", write_while_editing)
+    assert await archive.archive(12) == 1
+    assert edits[0].status_code == 200
+
+    archived = (await client.get(f"/decisions/{decision_id}?include_archived=true", headers=headers)).json()
+    assert archived["assumptions"][0]["status"] == "invalidated"
+    names = [s["name"] for s in archive._read_manifest()["segments"]]
+    assert sorted(f for f in os.listdir(settings.ARCHIVE_DIR) if f.endswith(".arrow")) == sorted(names)
+    async with AsyncSessionLocal() as db:
+        assert (await db.execute(select(models.Decision.id).filter(models.Decision.id == decision_id))).first() is None
+
+async def test_interrupted_segment_is_settled(client, headers, create_decision, monkeypatch):
+    decision_id = await _reviewed(client, headers, create_decision)
+
+    async def crash(db, ids):
+        raise RuntimeError("killed mid-run")
+
+    monkeypatch.setattr(archive, "_delete", crash)
+    with pytest.raises(RuntimeError):
+        await archive.archive(12)
+    assert archive._read_manifest()["segments"][-1]["state"] == "written"
+    monkeypatch.undo()
+
+    # The rows are still hot, so the next run discards that file and archives them again
+    assert await archive.archive(12) == 1
+    assert all(s["state"] == "committed" for s in archive._read_manifest()["segments"])
+    response = await client.get(f"/decisions/{decision_id}?include_archived=true", headers=headers)
+    assert response.status_code == 200
@@ -0,0 +1,44 @@
+import pytest
+from conftest import inserts
+
+pytestmark = pytest.mark.anyio
+
+async def test_bulk_assumptions_single_insert(client, headers, create_decision):
+    decision = await create_decision(assumptions=[])
+    payload = [{"assumption_text": f"Assumption {n}"} for n in range(25)]
+    with inserts() as counts:
+        response = await client.post(f"/decisions/{decision['id']}/assumptions/bulk", json=payload, headers=headers)
+    assert response.status_code == 200, response.text
+    assert counts["assumptions"] == 1
+    created = response.json()
+    assert [a["assumption_text"] for a in created] == [a["assumption_text"] for a in payload]
+    assert [a["id"] for a in created] == sorted(a["id"] for a in created)
+    assert all(a["decision_id"] == decision["id"] and a["status"] == "pending" for a in created)
+
+async def test_batch_status_update(client, headers, create_decision):
+    decision = await create_decision(assumptions=[{"assumption_text": f"A{n}"} for n in range(3)])
+    ids = [a["id"] for a in decision["assumptions"]]
+    response = await client.post("/auth/register", json={"email": "assumptions-other@example.com", "name": "Other",
+                                                         "password": "password123"})
+    other = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    theirs = (await client.post("/decisions/", json={
+        "title": "Theirs", "category": "Finance", "confidence_score": 50, "assumptions": [{"assumption_text": "T"}]
+    }, headers=other)).json()["assumptions"][0]["id"]
+
+    response = await client.patch("/decisions/assumptions", json=[
+        {"id": ids[0], "status": "true"},
+        {"id": ids[1], "status": "false"},
+        {"id": theirs, "status": "true"},
+        {"id": 10**9, "status": "true"},
+        {"id": ids[0], "status": "false"},
+    ], headers=headers)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["updated"] == 2 and body["failed"] == 2
+    assert [r.get("error") is None for r in body["results"]] == [True, True, False, False, True]
+
+    statuses = {a["id"]: a["status"] for a in (await client.get(f"/decisions/{decision['id']}", headers=headers)).json()["assumptions"]}
+    # The last status listed for an id wins; untouched ones stay pending
+    assert statuses == {ids[0]: "false", ids[1]: "false", ids[2]: "pending"}
+    other_decision = (await client.get("/decisions/", headers=other)).json()[0]
+    assert other_decision["assumptions"][0]["status"] == "pending"
@@ -0,0 +1,36 @@
+import pytest
+from conftest import decision_payload, inserts
+
+pytestmark = pytest.mark.anyio
+
+async def test_bulk_decisions_insert_once_per_table(client, headers):
+    payload = [
+        decision_payload(title=f"Bulk {n}", confidence_score=n, review_date="2030-01-01T00:00:00")
+        for n in range(60)
+    ]
+    with inserts() as counts:
+        response = await client.post("/decisions/bulk", json=payload, headers=headers)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["created"] == 60 and body["failed"] == 0
+    assert counts["decisions"] == 1
+    assert counts["options"] == 1
+    assert counts["assumptions"] == 1
+
+    # Ids come back in request order, with the children attached to the right row
+    for result in body["results"][::15]:
+        decision = (await client.get(f"/decisions/{result['id']}", headers=headers)).json()
+        assert decision["title"] == f"Bulk {result['index']}"
+        assert decision["confidence_score"] == result["index"]
+        assert [o["option_name"] for o in decision["options"]] == ["Accept", "Decline"]
+
+async def test_bulk_statement_count_does_not_grow_with_size(client, headers):
+    # The user's first write also creates their user_stats row
+    await client.post("/decisions/bulk", json=[decision_payload()], headers=headers)
+    queries = []
+    for size in (5, 50):
+        payload = [decision_payload(title=f"Sized {n}") for n in range(size)]
+        response = await client.post("/decisions/bulk", json=payload, headers=headers)
+        assert response.status_code == 200
+        queries.append(int(response.headers["x-db-queries"]))
+    assert queries[0] == queries[1]
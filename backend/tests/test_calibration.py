@@ -0,0 +1,62 @@
+import random
+import time
+from collections import Counter
+from datetime import datetime
+import pytest
+from sqlalchemy import insert, select
+import calibration, models
+from routers import analytics
+from database import AsyncSessionLocal
+
+pytestmark = pytest.mark.anyio
+
+CATEGORIES = ("Career", "Finance", "Health", None)
+
+def _rows(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [
+        (rng.randint(0, 100), rng.randint(1, 5), rng.choice(CATEGORIES), rng.choice((2023, 2024, None)))
+        for _ in range(n)
+    ]
+
+def test_groups_give_the_same_result_as_rows():
+    rows = _rows(2000)
+    per_row = calibration.compute(*calibration.to_arrays([row + (1,) for row in rows]))
+    grouped = calibration.compute(*calibration.to_arrays([row + (count,) for row, count in Counter(rows).items()]))
+    assert grouped == per_row
+    assert grouped["count"] == 2000
+    assert [row["category"] for row in grouped["by_category"]] == ["Career", "Finance", "Health", "Uncategorized"]
+    assert [row["year"] for row in grouped["by_year"]] == [2023, 2024]
+
+def test_no_reviews():
+    assert calibration.compute(*calibration.to_arrays([]))["count"] == 0
+
+async def test_endpoint_overhead_within_budget_at_100k_reviews(client, headers, create_decision):
+    user_id = (await create_decision())["user_id"]
+    rng = random.Random(3)
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(models.Decision), [
+            dict(user_id=user_id, title="Bulk", category=rng.choice(CATEGORIES[:3]),
+                 confidence_score=rng.randint(0, 100), decision_date=datetime(rng.choice((2023, 2024)), 6, 1))
+            for _ in range(100_000)
+        ])
+        ids = (await db.execute(select(models.Decision.id).filter(models.Decision.user_id == user_id))).scalars().all()
+        await db.execute(insert(models.Review), [
+            dict(decision_id=decision_id, outcome_rating=rng.randint(1, 5)) for decision_id in ids
+        ])
+        await db.commit()
+
+    # The grouped scan itself is the database's work; everything the
+    # endpoint adds on top of it has to fit in the budget
+    scans, requests = [], []
+    for _ in range(5):
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            await db.execute(analytics.calibration_query(user_id))
+            scans.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        response = await client.get("/analytics/calibration", headers=headers)
+        requests.append(time.perf_counter() - started)
+        assert response.status_code == 200
+    assert response.json()["count"] == len(ids)
+    assert min(requests) - min(scans) < 0.05, (requests, scans)
@@ -0,0 +1,112 @@
+import gzip
+import brotli
+import httpx
+import msgpack
+import pytest
+from fastapi.responses import PlainTextResponse
+import encoding
+
+pytestmark = pytest.mark.anyio
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, "json"),
+    ("application/json", "json"),
+    ("application/msgpack", "msgpack"),
+    ("application/x-msgpack", "msgpack"),
+    ("application/json, application/msgpack;q=0.5", "json"),
+    ("application/json;q=0.5, application/msgpack", "msgpack"),
+    ("*/*", "json"),
+    ("application/msgpack;q=0", "json"),
+])
+def test_negotiate_format(accept, expected):
+    assert encoding.negotiate_format(accept) == expected
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    (None, None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("*", "br"),
+    ("br;q=0, gzip;q=0", None),
+])
+def test_negotiate_encoding(accept_encoding, expected):
+    assert encoding.negotiate_encoding(accept_encoding) == expected
+
+async def test_msgpack_matches_json(client, headers, create_decision):
+    decision = await create_decision()
+    msgpack_headers = dict(headers, Accept="application/msgpack")
+    for path in (
+        f"/decisions/{decision['id']}",                        # response_model, transcoded
+        "/decisions/?fields=id,title,decision_date",           # FastJSONResponse
+        "/analytics/overview",
+    ):
+        as_json = await client.get(path, headers=headers)
+        as_msgpack = await client.get(path, headers=msgpack_headers)
+        assert as_json.headers["content-type"].startswith("application/json")
+        assert as_msgpack.headers["content-type"] == encoding.MSGPACK
+        assert msgpack.unpackb(as_msgpack.content) == as_json.json()
+        assert "Accept" in as_msgpack.headers["vary"]
+
+async def test_msgpack_has_its_own_etag(client, headers, create_decision):
+    await create_decision()
+    as_json = await client.get("/analytics/overview", headers=headers)
+    as_msgpack = await client.get("/analytics/overview", headers=dict(headers, Accept="application/msgpack"))
+    assert as_msgpack.headers["etag"] == as_json.headers["etag"][:-1] + '-msgpack"'
+    response = await client.get("/analytics/overview", headers=dict(
+        headers, Accept="application/msgpack", **{"If-None-Match": as_json.headers["etag"]}
+    ))
+    assert response.status_code == 200
+
+async def test_large_responses_are_compressed(client, headers, create_decision):
+    for n in range(10):
+        await create_decision(title=f"Decision {n}")
+    plain = await client.get("/decisions/", headers=dict(headers, **{"Accept-Encoding": "identity"}))
+    assert "content-encoding" not in plain.headers
+    assert len(plain.content) >= encoding.settings.COMPRESSION_MIN_BYTES
+
+    for accept_encoding, coding in (("gzip", "gzip"), ("gzip, br", "br"), ("br;q=0.1, gzip", "gzip")):
+        response = await client.get("/decisions/", headers=dict(headers, **{"Accept-Encoding": accept_encoding}))
+        assert response.headers["content-encoding"] == coding
+        assert int(response.headers["content-length"]) < len(plain.content)
+        assert response.json() == plain.json()
+        assert "Accept-Encoding" in response.headers["vary"]
+
+async def test_small_responses_and_not_modified_are_not_compressed(client, headers, create_decision):
+    await create_decision()
+    response = await client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+    tag = (await client.get("/decisions/", headers=headers)).headers["etag"]
+    response = await client.get("/decisions/", headers=dict(headers, **{"Accept-Encoding": "gzip", "If-None-Match": tag}))
+    assert response.status_code == 304
+    assert "content-encoding" not in response.headers
+
+def _app(body: bytes, content_type: str = "application/json"):
+    return encoding.EncodingMiddleware(PlainTextResponse(body, media_type=content_type), minimum_size=100)
+
+async def _get(app, accept_encoding: str):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        return await c.get("/", headers={"Accept-Encoding": accept_encoding})
+
+async def test_compression_threshold():
+    below = await _get(_app(b"x" * 99), "gzip")
+    assert "content-encoding" not in below.headers
+    assert below.content == b"x" * 99
+
+    at = await _get(_app(b"x" * 100), "gzip")
+    assert at.headers["content-encoding"] == "gzip"
+    assert at.content == b"x" * 100
+
+    brotli_body = await _get(_app(b"y" * 500), "br")
+    assert brotli_body.headers["content-encoding"] == "br"
+    assert brotli_body.content == b"y" * 500
+
+async def test_only_compressible_types_are_compressed():
+    response = await _get(_app(b"\x89PNG" + b"\x00" * 500, "image/png"), "gzip")
+    assert "content-encoding" not in response.headers
+
+def test_compress_round_trip():
+    body = b'{"decisions": []}' * 100
+    assert gzip.decompress(encoding.compress(body, "gzip")) == body
+    assert brotli.decompress(encoding.compress(body, "br")) == body
@@ -0,0 +1,65 @@
+import pytest
+from conftest import decision_payload
+
+pytestmark = pytest.mark.anyio
+
+PATHS = ("/analytics/overview", "/analytics/calibration", "/analytics/timeseries", "/decisions/")
+
+async def _etags(client, headers):
+    tags = {}
+    for path in PATHS:
+        response = await client.get(path, headers=headers)
+        assert response.status_code == 200, response.text
+        tags[path] = response.headers["etag"]
+    return tags
+
+async def _revalidate(client, headers, tags):
+    # Status of each path when the client sends its earlier tag
+    statuses = set()
+    for path, tag in tags.items():
+        response = await client.get(path, headers=dict(headers, **{"If-None-Match": tag}))
+        if response.status_code == 304:
+            assert response.content == b""
+            assert response.headers["etag"] == tag
+        statuses.add(response.status_code)
+    return statuses
+
+async def test_unchanged_data_is_not_modified(client, headers, create_decision):
+    await create_decision()
+    tags = await _etags(client, headers)
+    assert await _revalidate(client, headers, tags) == {304}
+    # A list of candidates, and the weak/strong forms, match too
+    tag = tags["/analytics/overview"]
+    response = await client.get(
+        "/analytics/overview", headers=dict(headers, **{"If-None-Match": f'"other", {tag.removeprefix("W/")}'})
+    )
+    assert response.status_code == 304
+
+async def test_writes_invalidate(client, headers, create_decision):
+    decision = await create_decision()
+    writes = [
+        lambda: client.post("/decisions/", json=decision_payload(title="Another"), headers=headers),
+        lambda: client.put(f"/decisions/{decision['id']}", json={"title": "Renamed", "category": "Career",
+                                                                   "confidence_score": 40}, headers=headers),
+        lambda: client.patch(f"/decisions/assumptions/{decision['assumptions'][0]['id']}",
+                             json={"status": "validated"}, headers=headers),
+        lambda: client.post(f"/decisions/{decision['id']}/review", json={"outcome_rating": 4}, headers=headers),
+    ]
+    for write in writes:
+        tags = await _etags(client, headers)
+        response = await write()
+        assert response.status_code == 200
+        assert await _revalidate(client, headers, tags) == {200}
+        assert not set(tags.values()) & set((await _etags(client, headers)).values())
+
+async def test_other_users_writes_do_not_invalidate(client, headers, create_decision):
+    await create_decision()
+    tags = await _etags(client, headers)
+    response = await client.post("/auth/register", json={"email": "etag-other@example.com", "name": "Other",
+                                                         "password": "password123"})
+    other = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    await client.post("/decisions/", json={"title": "Theirs", "category": "Finance", "confidence_score": 50},
+                      headers=other)
+    assert await _revalidate(client, headers, tags) == {304}
+    response = await client.get("/analytics/overview", headers=dict(other, **{"If-None-Match": tags["/analytics/overview"]}))
+    assert response.status_code == 200
@@ -0,0 +1,81 @@
+import json
+import anyio
+import pytest
+import events, models
+from database import AsyncSessionLocal
+from routers import analytics
+
+pytestmark = pytest.mark.anyio
+
+def _parse(chunk):
+    fields = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+    return fields.get("event"), json.loads(fields["data"]) if "data" in fields else None
+
+async def _next(body, seconds: float = 5):
+    with anyio.fail_after(seconds):
+        return await body.__anext__()
+
+async def _version():
+    return 7
+
+def test_format_event():
+    assert events.format_event("decision.created", {"id": 1}, 3) == 'id: 3\nevent: decision.created\ndata: {"id": 1}\n\n'
+
+async def test_events_reach_only_that_users_streams():
+    hub = events.EventHub(10)
+    mine, also_mine, theirs = hub.subscribe(1), hub.subscribe(1), hub.subscribe(2)
+    hub.publish(1, "decision.created", {"id": 5})
+    hub.publish(3, "decision.created", {"id": 6})  # nobody listening
+    assert mine.queue.get_nowait() == also_mine.queue.get_nowait() == (1, "decision.created", {"id": 5})
+    assert theirs.queue.empty()
+    assert hub.stats() == {"subscribers": 3, "published": 1, "dropped": 0}
+
+async def test_slow_consumer_is_dropped_and_told_to_resync():
+    hub = events.EventHub(2)
+    subscriber = hub.subscribe(1)
+    body = events.stream(subscriber, hub, {"version": 0}, _version, heartbeat_seconds=5)
+    assert await _next(body) == "retry: 3000\n\n"
+    assert _parse(await _next(body)) == ("snapshot", {"version": 0})
+    for n in range(3):
+        hub.publish(1, "decision.created", {"id": n})
+    assert hub.stats() == {"subscribers": 0, "published": 3, "dropped": 1}
+
+    # What was queued is still delivered, then the stream ends
+    assert [_parse(await _next(body)) for _ in range(3)] == [
+        ("decision.created", {"id": 0}), ("decision.created", {"id": 1}), ("resync", {"reason": "slow consumer"}),
+    ]
+    with pytest.raises(StopAsyncIteration):
+        await _next(body)
+
+async def test_idle_stream_sends_version_heartbeats():
+    hub = events.EventHub(10)
+    subscriber = hub.subscribe(1)
+    body = events.stream(subscriber, hub, {"version": 0}, _version, heartbeat_seconds=0.05)
+    await _next(body)
+    await _next(body)
+    assert _parse(await _next(body)) == ("version", {"version": 7})
+    await body.aclose()
+    assert hub.stats()["subscribers"] == 0
+
+async def test_stream_endpoint_sends_snapshot_then_deltas(client, headers, create_decision):
+    first = await create_decision(confidence_score=40)
+    async with AsyncSessionLocal() as db:
+        user = await db.get(models.User, first["user_id"])
+        response = await analytics.stream_analytics(db=db, current_user=user)
+    assert response.media_type == "text/event-stream"
+    body = response.body_iterator
+    subscribers = events.hub.stats()["subscribers"]
+    try:
+        await _next(body)
+        event_type, snapshot = _parse(await _next(body))
+        assert event_type == "snapshot" and snapshot["overview"]["total_decisions"] == 1
+
+        second = await create_decision(confidence_score=60)
+        event_type, delta = _parse(await _next(body))
+        assert event_type == "decision.created" and delta["decision"]["id"] == second["id"]
+        assert delta["version"] == snapshot["version"] + 1
+        assert delta["overview"]["total_decisions"] == 2 and delta["overview"]["average_confidence"] == 50.0
+    finally:
+        await body.aclose()
+    # Disconnecting unsubscribes
+    assert events.hub.stats()["subscribers"] == subscribers - 1
@@ -0,0 +1,92 @@
+import os
+import anyio
+import pytest
+import leader
+from database import settings
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def lock_file(tmp_path, monkeypatch):
+    # Separate from the lock the test app's own election holds
+    path = str(tmp_path / "test.leader")
+    monkeypatch.setattr(settings, "LEADER_LOCK_FILE", path)
+    return path
+
+class Worker:
+    def __init__(self):
+        self.events = []
+        self.election = leader.LeaderElection(self.elected, self.demoted, poll_seconds=0.02)
+
+    async def elected(self):
+        self.events.append("elected")
+
+    async def demoted(self):
+        self.events.append("demoted")
+
+async def _wait_for(condition, seconds: float = 5):
+    with anyio.fail_after(seconds):
+        while not condition():
+            await anyio.sleep(0.01)
+
+async def test_file_lock_is_exclusive(lock_file):
+    first, second = leader.FileLock(lock_file), leader.FileLock(lock_file)
+    assert await first.acquire()
+    assert not await second.acquire()
+    with open(lock_file) as file:
+        assert file.read() == str(os.getpid())
+    await first.release()
+    assert await second.acquire()
+    await second.release()
+
+async def test_one_leader_and_failover(lock_file):
+    a, b = Worker(), Worker()
+    await a.election.start()
+    await b.election.start()
+    try:
+        assert a.election.is_leader and not b.election.is_leader
+        assert a.events == ["elected"] and b.events == []
+
+        # The leader's process dies: it stops polling and the OS drops its lock
+        a.election._task.cancel()
+        await a.election._lock.release()
+        await _wait_for(lambda: b.election.is_leader)
+        assert b.events == ["elected"]
+
+        # Had it survived, its next poll would notice the lock is gone
+        await a.election._attempt()
+        assert not a.election.is_leader
+        assert a.events == ["elected", "demoted"]
+    finally:
+        await a.election.stop()
+        await b.election.stop()
+    assert b.events == ["elected", "demoted"]
+
+async def test_stopping_the_leader_hands_over(lock_file):
+    a, b = Worker(), Worker()
+    await a.election.start()
+    await b.election.start()
+    await a.election.stop()
+    try:
+        await _wait_for(lambda: b.election.is_leader)
+    finally:
+        await b.election.stop()
+
+async def test_startup_lock_serializes_schema_setup(lock_file):
+    order = []
+
+    async def start(name):
+        async with leader.startup_lock(poll_seconds=0.01):
+            order.append(f"{name} in")
+            await anyio.sleep(0.05)
+            order.append(f"{name} out")
+
+    async with anyio.create_task_group() as tasks:
+        tasks.start_soon(start, "a")
+        tasks.start_soon(start, "b")
+    assert order in (["a in", "a out", "b in", "b out"], ["b in", "b out", "a in", "a out"])
+
+async def test_app_worker_leads_and_runs_the_jobs(client):
+    import main
+    assert main.election.is_leader
+    assert main.scheduler.state == 1  # running, not paused
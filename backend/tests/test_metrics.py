@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy import select
+import metrics, models
+from database import AsyncSessionLocal
+
+pytestmark = pytest.mark.anyio
+
+def _route(metric, route):
+    return metric.values.get((("route", route),), 0)
+
+def test_in_lists_share_one_shape():
+    assert metrics.statement_shape("SELECT a FROM t WHERE id IN (?, ?, ?)") == \
+        metrics.statement_shape("SELECT a\n  FROM t WHERE id IN (?)") == "SELECT a FROM t WHERE id IN (?)"
+    assert metrics.statement_shape("SELECT a FROM t WHERE id IN ($1, $2)") == "SELECT a FROM t WHERE id IN (?)"
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, route="/x")
+    samples = {(name, labels[-1][1] if name.endswith("_bucket") else None): value
+               for name, labels, value in histogram.samples()}
+    assert samples[("latency_seconds_bucket", "0.1")] == 1
+    assert samples[("latency_seconds_bucket", "1.0")] == 2
+    assert samples[("latency_seconds_bucket", "+Inf")] == 3
+    assert samples[("latency_seconds_count", None)] == 3
+
+async def test_requests_are_counted_by_route(client, headers, create_decision):
+    decision = await create_decision()
+    before = _route(metrics.db_queries, "/decisions/{id}")
+    response = await client.get(f"/decisions/{decision['id']}", headers=headers)
+    assert response.status_code == 200
+    queries = int(response.headers["x-db-queries"])
+    assert queries > 0
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert _route(metrics.db_queries, "/decisions/{id}") - before == queries
+
+async def test_repeated_statement_shapes_are_flagged(client, create_decision, capsys):
+    # One lookup per row, the way a lazy-load loop would issue them
+    ids = [(await create_decision())["id"] for _ in range(6)]
+    token = metrics.start_request()
+    try:
+        async with AsyncSessionLocal() as db:
+            for decision_id in ids:
+                await db.execute(select(models.Decision.title).filter(models.Decision.id == decision_id))
+    finally:
+        stats = metrics.finish_request(token)
+    assert stats.queries == 6
+    assert list(stats.repeated_shapes(5).values()) == [6]
+
+    metrics.observe_request("GET", "/loop", 200, 0.01, stats, n_plus_one_threshold=5)
+    assert _route(metrics.db_n_plus_one, "/loop") == 1
+    assert "Possible N+1 on GET /loop: 6x SELECT decisions.title" in capsys.readouterr().out
+    metrics.observe_request("GET", "/loop", 200, 0.01, stats, n_plus_one_threshold=7)
+    assert _route(metrics.db_n_plus_one, "/loop") == 1
+
+async def test_metrics_endpoint_renders_prometheus_text(client, headers):
+    await client.get("/decisions/", headers=headers)
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert "# TYPE db_queries_total counter" in text
+    assert 'db_queries_total{route="/decisions/"}' in text
+    assert 'http_requests_total{method="GET",route="/decisions/",status="200"}' in text
+    assert "# TYPE db_pool_checkout_wait_seconds histogram" in text
+    assert 'db_pool_size{pool="primary"}' in text
+
+async def test_listing_query_count_does_not_grow_with_rows(client, headers, create_decision):
+    queries = []
+    for added, rows in ((2, 2), (10, 12)):
+        for _ in range(added):
+            await create_decision()
+        response = await client.get("/decisions/", headers=headers)
+        assert len(response.json()) == rows
+        queries.append(int(response.headers["x-db-queries"]))
+    assert queries[0] == queries[1]
@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import delete, select
+import migrations, models
+from database import AsyncSessionLocal, engine
+
+pytestmark = pytest.mark.anyio
+
+async def _stats_row(user_id: int):
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(models.UserStats).filter(models.UserStats.user_id == user_id))).scalars().first()
+
+async def test_overview_tracks_writes(client, headers, create_decision):
+    overview = (await client.get("/analytics/overview", headers=headers)).json()
+    assert overview == {"total_decisions": 0, "reviewed_decisions": 0, "pending_decisions": 0,
+                        "average_confidence": 0, "average_outcome": 0}
+    first = await create_decision(confidence_score=80)
+    await create_decision(confidence_score=40)
+    await client.post(f"/decisions/{first['id']}/review", json={"outcome_rating": 4}, headers=headers)
+    await client.put(f"/decisions/{first['id']}", json={"title": "Edited", "category": "Career",
+                                                         "confidence_score": 90}, headers=headers)
+    overview = (await client.get("/analytics/overview", headers=headers)).json()
+    assert overview == {"total_decisions": 2, "reviewed_decisions": 1, "pending_decisions": 1,
+                        "average_confidence": 65.0, "average_outcome": 4.0}
+
+async def test_registration_creates_the_stats_row(client, headers):
+    response = await client.post("/decisions/", json={"title": "T", "category": "Career", "confidence_score": 10},
+                                 headers=headers)
+    user_id = response.json()["user_id"]
+    row = await _stats_row(user_id)
+    assert row is not None and row.total_decisions == 1
+
+async def test_missing_row_is_computed_without_writing(client, headers, create_decision):
+    decision = await create_decision(confidence_score=70)
+    user_id = decision["user_id"]
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(models.UserStats).where(models.UserStats.user_id == user_id))
+        await db.commit()
+
+    response = await client.get("/analytics/overview", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["total_decisions"] == 1
+    assert response.json()["average_confidence"] == 70.0
+    assert await _stats_row(user_id) is None
+
+    # The startup backfill stores it
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations._backfill_user_stats)
+    row = await _stats_row(user_id)
+    assert row.total_decisions == 1 and row.confidence_sum == 70 and row.data_version == 1
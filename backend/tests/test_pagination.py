@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import insert
+import migrations, models, pagination
+from database import AsyncSessionLocal, engine
+
+pytestmark = pytest.mark.anyio
+
+async def _walk(client, headers, limit: int):
+    # Every page of GET /decisions/ following X-Next-Cursor
+    pages = []
+    params = {"limit": limit, "fields": "id,decision_date"}
+    while True:
+        response = await client.get("/decisions/", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        pages.append(response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            return pages
+        params["cursor"] = cursor
+
+def _newest_first(rows):
+    return sorted(rows, key=lambda row: (row["decision_date"], row["id"]), reverse=True)
+
+def test_cursor_round_trip():
+    cursor = pagination.encode_cursor(None, 7)
+    assert pagination.decode_cursor(cursor) == (None, 7)
+    with pytest.raises(ValueError):
+        pagination.decode_cursor("not-a-cursor")
+
+async def test_duplicate_dates_page_without_gaps(client, headers, create_decision):
+    # Ties on decision_date are broken by id, so no row is skipped or repeated
+    for n in range(7):
+        await create_decision(title=f"Same day {n}", decision_date="2024-05-01T12:00:00")
+    for n in range(3):
+        await create_decision(title=f"Other day {n}", decision_date=f"2024-0{n + 2}-01T12:00:00")
+
+    pages = await _walk(client, headers, limit=3)
+    rows = [row for page in pages for row in page]
+    assert len(rows) == 10
+    assert len({row["id"] for row in rows}) == 10
+    assert rows == _newest_first(rows)
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+
+async def test_null_dates_are_backfilled_and_paged(client, headers, create_decision):
+    # Rows written before PUT refused a null decision_date
+    created = [await create_decision(title=f"Dated {n}") for n in range(3)]
+    user_id = created[0]["user_id"]
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(models.Decision), [
+            dict(user_id=user_id, title=f"Undated {n}", category="Career", confidence_score=50, decision_date=None)
+            for n in range(2)
+        ])
+        await db.commit()
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations._backfill_decision_dates)
+
+    pages = await _walk(client, headers, limit=2)
+    rows = [row for page in pages for row in page]
+    assert len({row["id"] for row in rows}) == 5
+    assert all(row["decision_date"] is not None for row in rows)
+    assert rows == _newest_first(rows)
+
+async def test_null_date_cursor_ends_the_listing(client, headers, create_decision):
+    await create_decision()
+    cursor = pagination.encode_cursor(None, 10**9)
+    response = await client.get("/decisions/", params={"cursor": cursor}, headers=headers)
+    assert response.status_code == 200
+    assert response.json() == []
+
+async def test_put_cannot_clear_decision_date(client, headers, create_decision):
+    decision = await create_decision()
+    body = {"title": "Renamed", "category": "Career", "confidence_score": 60, "decision_date": None}
+    response = await client.put(f"/decisions/{decision['id']}", json=body, headers=headers)
+    assert response.status_code == 422
+
+    del body["decision_date"]
+    response = await client.put(f"/decisions/{decision['id']}", json=body, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["decision_date"] == decision["decision_date"]
+
+@pytest.mark.parametrize("params", [
+    {"limit": -1}, {"limit": 0}, {"limit": 501}, {"skip": -1},
+    {"limit": -1, "view": "summary"}, {"limit": 0, "fields": "id,title"},
+])
+async def test_page_size_is_bounded(client, headers, params):
+    response = await client.get("/decisions/", params=params, headers=headers)
+    assert response.status_code == 422
+
+async def test_summary_view_pages_by_cursor(client, headers, create_decision):
+    for n in range(5):
+        await create_decision(title=f"Summary {n}", decision_date="2024-07-01T00:00:00")
+    response = await client.get("/decisions/", params={"view": "summary", "limit": 3}, headers=headers)
+    assert len(response.json()) == 3
+    response = await client.get("/decisions/", params={"view": "summary", "limit": 3,
+                                                       "cursor": response.headers["x-next-cursor"]}, headers=headers)
+    assert len(response.json()) == 2
+    assert "x-next-cursor" not in response.headers
@@ -0,0 +1,68 @@
+import threading
+import anyio
+import pytest
+from fastapi import HTTPException
+import auth_utils
+
+pytestmark = pytest.mark.anyio
+
+async def test_concurrency_cap_and_metrics():
+    pool = auth_utils.PasswordWorkerPool(size=2, max_pending=3)
+    release = threading.Event()
+    peak = []
+
+    def work():
+        peak.append(pool.running)
+        release.wait(5)
+        return "hashed"
+
+    results = []
+
+    async def call():
+        results.append(await pool.run(work))
+
+    try:
+        async with anyio.create_task_group() as tasks:
+            for _ in range(3):
+                tasks.start_soon(call)
+            with anyio.fail_after(5):
+                while pool.running < 2:
+                    await anyio.sleep(0.01)
+            # Two on the workers, one queued behind them, and no room for more
+            assert pool.stats()["pending"] == 3
+            with pytest.raises(HTTPException) as rejected:
+                await pool.run(work)
+            assert rejected.value.status_code == 503
+            await anyio.sleep(0.05)
+            release.set()
+    finally:
+        pool.shutdown()
+
+    assert results == ["hashed"] * 3
+    assert max(peak) <= 2
+    stats = pool.stats()
+    assert stats["pending"] == stats["running"] == 0
+    assert stats["completed"] == 3 and stats["rejected"] == 1 and stats["failed"] == 0
+    # The queued call waited for a worker; the first two ran for the pause
+    assert stats["wait_seconds_total"] >= 0.05
+    assert stats["run_seconds_max"] >= 0.05
+
+async def test_failures_are_not_counted_as_completed():
+    pool = auth_utils.PasswordWorkerPool(size=1, max_pending=4)
+
+    def broken():
+        raise ValueError("bad hash")
+
+    try:
+        with pytest.raises(ValueError):
+            await pool.run(broken)
+        assert await pool.run(auth_utils.verify_password, "password123", auth_utils.get_password_hash("password123"))
+    finally:
+        pool.shutdown()
+    assert pool.stats()["completed"] == 1
+    assert pool.stats()["failed"] == 1
+
+async def test_pool_metrics_are_exported(client):
+    text = (await client.get("/metrics")).text
+    for name in ("completed", "failed", "rejected", "pending", "wait_seconds_total"):
+        assert f"password_pool_{name}" in text
@@ -0,0 +1,58 @@
+import time
+import pytest
+from sqlalchemy import event, select
+import auth_utils, models
+from database import AsyncSessionLocal, engine
+
+pytestmark = pytest.mark.anyio
+
+def _user(email):
+    return models.User(id=1, email=email, name="Cached")
+
+def test_lru_evicts_least_recently_used():
+    cache = auth_utils.PrincipalCache(max_size=2, ttl_seconds=60)
+    cache.put("a", _user("a@example.com"))
+    cache.put("b", _user("b@example.com"))
+    assert cache.get("a") is not None
+    cache.put("c", _user("c@example.com"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1, "evictions": 1}
+
+def test_entry_never_outlives_its_token():
+    cache = auth_utils.PrincipalCache(max_size=10, ttl_seconds=60)
+    cache.put("expired", _user("x@example.com"), token_exp=int(time.time()) - 1)
+    assert cache.get("expired") is None
+    cache = auth_utils.PrincipalCache(max_size=10, ttl_seconds=0)
+    cache.put("stale", _user("y@example.com"))
+    assert cache.get("stale") is None
+    assert cache.stats()["size"] == 0
+
+async def test_cached_principal_skips_the_user_lookup(client, headers):
+    lookups = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT") and "FROM users" in statement:
+            lookups.append(statement)
+
+    await client.get("/decisions/", headers=headers)
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        for _ in range(3):
+            assert (await client.get("/decisions/", headers=headers)).status_code == 200
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+    assert lookups == []
+
+async def test_user_update_drops_cached_principal(client, headers, create_decision):
+    user_id = (await create_decision())["user_id"]
+    token = headers["Authorization"].split()[1]
+    assert auth_utils.principal_cache.peek(token) is not None
+
+    async with AsyncSessionLocal() as db:
+        user = (await db.execute(select(models.User).filter(models.User.id == user_id))).scalars().one()
+        user.name = "Renamed"
+        await db.commit()
+    assert auth_utils.principal_cache.peek(token) is None
+    assert (await client.get("/decisions/", headers=headers)).status_code == 200
+    assert auth_utils.principal_cache.peek(token).name == "Renamed"
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+import anyio
+import pytest
+from sqlalchemy import func, select
+import models, reminders
+from database import AsyncSessionLocal
+
+pytestmark = pytest.mark.anyio
+
+def _in(seconds: float):
+    return (datetime.utcnow() + timedelta(seconds=seconds)).isoformat()
+
+@pytest.fixture
+def reminded(monkeypatch):
+    # Decision ids the running scheduler reminds about
+    ids = []
+
+    async def record(decision_ids):
+        ids.extend(decision_ids)
+        return len(decision_ids)
+
+    monkeypatch.setattr(reminders, "send_reminders", record)
+    return ids
+
+async def _wait_for(condition, seconds: float = 5):
+    with anyio.fail_after(seconds):
+        while not condition():
+            await anyio.sleep(0.02)
+
+async def test_scheduler_runs_on_the_leader(client):
+    assert reminders.scheduler.running
+
+async def test_due_review_is_reminded_within_seconds(client, create_decision, reminded):
+    decision = await create_decision(review_date=_in(0.3))
+    await _wait_for(lambda: decision["id"] in reminded)
+    assert reminded.count(decision["id"]) == 1
+
+async def test_edit_and_review_update_the_heap(client, headers, create_decision, reminded):
+    moved = await create_decision(review_date=_in(0.3))
+    response = await client.put(f"/decisions/{moved['id']}", json={
+        "title": moved["title"], "category": moved["category"], "confidence_score": 50,
+        "review_date": _in(3600),
+    }, headers=headers)
+    assert response.status_code == 200
+    reviewed = await create_decision(review_date=_in(0.3))
+    await client.post(f"/decisions/{reviewed['id']}/review", json={"outcome_rating": 4}, headers=headers)
+    control = await create_decision(review_date=_in(0.4))
+
+    await _wait_for(lambda: control["id"] in reminded)
+    assert moved["id"] not in reminded and reviewed["id"] not in reminded
+    assert reminders.scheduler._due[moved["id"]] > datetime.utcnow()
+    assert reviewed["id"] not in reminders.scheduler._due
+
+async def test_follower_writes_reach_the_leader_through_the_outbox(client, create_decision, monkeypatch):
+    # Written on a worker that is not running the heap
+    monkeypatch.setattr(reminders, "scheduler", reminders.ReviewScheduler())
+    decision = await create_decision(review_date=_in(3600))
+    monkeypatch.undo()
+    assert decision["id"] not in reminders.scheduler._due
+
+    await reminders.scheduler.poll_outbox()
+    assert decision["id"] in reminders.scheduler._due
+    async with AsyncSessionLocal() as db:
+        assert (await db.execute(select(func.count()).select_from(models.ReminderOutbox))).scalar() == 0
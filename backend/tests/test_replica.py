@@ -0,0 +1,64 @@
+import sqlite3
+import anyio
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+import database
+from database import AsyncSessionLocal, engine, settings
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def replica(client, tmp_path, monkeypatch):
+    # A second SQLite file standing in for READ_DATABASE_URL
+    path = str(tmp_path / "replica.db")
+    read_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    monkeypatch.setattr(database, "read_engine", read_engine)
+    monkeypatch.setattr(database, "ReadSessionLocal",
+                        sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False))
+
+    def sync(title=None):
+        # Replicate the primary, then optionally make the copy distinguishable
+        with sqlite3.connect(engine.url.database) as source, sqlite3.connect(path) as target:
+            source.backup(target)
+            if title is not None:
+                target.execute("UPDATE decisions SET title = ?", (title,))
+    yield sync
+    await read_engine.dispose()
+
+def test_without_a_replica_reads_use_the_primary(monkeypatch):
+    monkeypatch.setattr(database, "read_engine", engine)
+    assert database.read_sessionmaker() is AsyncSessionLocal
+    assert database.read_sessionmaker(1) is AsyncSessionLocal
+
+async def test_recent_writers_read_from_the_primary(replica, monkeypatch):
+    monkeypatch.setattr(settings, "READ_YOUR_WRITES_SECONDS", 0.2)
+    database.note_write(-1)
+    assert database.read_sessionmaker(-1) is AsyncSessionLocal
+    assert database.read_sessionmaker(-2) is database.ReadSessionLocal
+    assert database.read_sessionmaker() is database.ReadSessionLocal
+    await anyio.sleep(0.3)
+    assert database.read_sessionmaker(-1) is database.ReadSessionLocal
+    assert -1 not in database._recent_writes
+
+async def test_reads_go_to_the_replica_outside_the_window(client, headers, create_decision, replica, monkeypatch):
+    monkeypatch.setattr(settings, "READ_YOUR_WRITES_SECONDS", 0.2)
+    decision = await create_decision(title="Written to the primary")
+    replica(title="Read from the replica")
+
+    # Just wrote: the replica may lag, so reads stay on the primary
+    response = await client.get(f"/decisions/{decision['id']}", headers=headers)
+    assert response.json()["title"] == "Written to the primary"
+
+    await anyio.sleep(0.3)
+    response = await client.get(f"/decisions/{decision['id']}", headers=headers)
+    assert response.json()["title"] == "Read from the replica"
+    response = await client.get("/decisions/", headers=headers)
+    assert [row["title"] for row in response.json()] == ["Read from the replica"]
+
+    # Another write opens a new window
+    await client.put(f"/decisions/{decision['id']}", json={
+        "title": "Edited on the primary", "category": decision["category"], "confidence_score": 50,
+    }, headers=headers)
+    response = await client.get(f"/decisions/{decision['id']}", headers=headers)
+    assert response.json()["title"] == "Edited on the primary"
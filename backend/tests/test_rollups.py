@@ -0,0 +1,85 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import event
+import rollups
+from database import AsyncSessionLocal, engine
+
+pytestmark = pytest.mark.anyio
+
+async def _series(client, headers, **params):
+    response = await client.get("/analytics/timeseries", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+async def _history(client, headers, create_decision):
+    # Monday and Wednesday of one week, then a Wednesday two weeks later
+    first = await create_decision(decision_date="2024-03-04T10:00:00", confidence_score=40)
+    await create_decision(decision_date="2024-03-06T10:00:00", confidence_score=60, category="Finance")
+    await create_decision(decision_date="2024-03-20T10:00:00", confidence_score=80)
+    await client.post(f"/decisions/{first['id']}/review", json={"outcome_rating": 4}, headers=headers)
+    return first
+
+async def test_buckets_by_granularity_and_category(client, headers, create_decision):
+    await _history(client, headers, create_decision)
+
+    weeks = [row for row in await _series(client, headers, granularity="week") if row["decisions"]]
+    assert [(row["bucket"], row["decisions"], row["average_confidence"]) for row in weeks] == [
+        ("2024-03-04T00:00:00", 2, 50.0), ("2024-03-18T00:00:00", 1, 80.0),
+    ]
+    months = await _series(client, headers, granularity="month", start="2024-03-01T00:00:00", end="2024-04-01T00:00:00")
+    assert [(row["decisions"], row["average_confidence"]) for row in months] == [(3, 60.0)]
+    by_category = await _series(client, headers, granularity="month", by_category="true", end="2024-04-01T00:00:00")
+    assert {row["category"]: row["decisions"] for row in by_category} == {"Career": 2, "Finance": 1}
+    finance = await _series(client, headers, granularity="day", category="Finance")
+    assert [(row["bucket"], row["decisions"]) for row in finance] == [("2024-03-06T00:00:00", 1)]
+
+    # The review counts towards the day it was recorded
+    today = datetime.utcnow().strftime("%Y-%m-%dT00:00:00")
+    reviews = [row for row in await _series(client, headers, granularity="day") if row["reviews"]]
+    assert [(row["bucket"], row["reviews"], row["average_outcome"]) for row in reviews] == [(today, 1, 4.0)]
+
+async def test_timeseries_reads_only_the_rollups(client, headers, create_decision):
+    await _history(client, headers, create_decision)
+    tables = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        tables.extend(word for word in statement.split() if word.strip('"') in ("decisions", "reviews"))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        await _series(client, headers, granularity="week", by_category="true")
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+    assert tables == []
+
+async def test_write_paths_match_a_rebuild(client, headers, create_decision):
+    first = await _history(client, headers, create_decision)
+    user_id = first["user_id"]
+    moved = await create_decision(decision_date="2024-05-02T10:00:00", confidence_score=30)
+    await client.put(f"/decisions/{moved['id']}", json={
+        "title": moved["title"], "category": "Health", "confidence_score": 90, "decision_date": "2024-06-02T10:00:00",
+    }, headers=headers)
+    await client.put(f"/decisions/{first['id']}", json={
+        "title": first["title"], "category": "Finance", "confidence_score": 45,
+    }, headers=headers)
+
+    maintained = await _series(client, headers, granularity="day", by_category="true")
+    async with AsyncSessionLocal() as db:
+        await rollups.rebuild(db, user_id)
+        await db.commit()
+    assert await _series(client, headers, granularity="day", by_category="true") == maintained
+
+async def test_compaction_folds_old_days_into_months(client, headers, create_decision):
+    await _history(client, headers, create_decision)
+    before = await _series(client, headers, granularity="month", end="2024-04-01T00:00:00")
+
+    async with AsyncSessionLocal() as db:
+        assert await rollups.compact(db, now=datetime(2024, 9, 1)) > 0
+        await db.commit()
+
+    # Same totals, but the old history now only has monthly resolution
+    assert await _series(client, headers, granularity="month", end="2024-04-01T00:00:00") == before
+    days = await _series(client, headers, granularity="day", end="2024-04-01T00:00:00")
+    assert [(row["bucket"], row["granularity"], row["decisions"]) for row in days] == [
+        ("2024-03-01T00:00:00", "month", 3),
+    ]
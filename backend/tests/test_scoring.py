@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import select
+import models, scoring
+from database import AsyncSessionLocal
+
+pytestmark = pytest.mark.anyio
+
+def test_rule_quadrants():
+    rule = scoring.get_rule(1)
+    assert rule.score(90, 5) == ("Good", "Good")
+    assert rule.score(90, 1) == ("Poor", "Poor")
+    assert rule.score(20, 5) == ("Poor", "Good")
+    assert rule.score(20, 1) == ("Good", "Poor")
+    assert rule.score(55, 3) == ("Neutral", "Average")
+
+async def test_interrupted_rescore_resumes(client, headers, create_decision, monkeypatch):
+    ids = []
+    for confidence in (30, 45, 60, 72, 80, 95):
+        decision = await create_decision(confidence_score=confidence)
+        await client.post(f"/decisions/{decision['id']}/review", json={"outcome_rating": 5}, headers=headers)
+        ids.append(decision["id"])
+
+    # Only this user's rows: other tests share the database
+    user_id = decision["user_id"]
+    reviewed = scoring._reviewed
+    monkeypatch.setattr(scoring, "_reviewed", lambda query: reviewed(query).filter(models.Decision.user_id == user_id))
+    rule = scoring.QualityRule(version=2, high_confidence=50, low_confidence=20)
+    monkeypatch.setitem(scoring.RULES, 2, rule)
+    rescore_chunk = scoring._rescore_chunk
+    calls = []
+
+    async def fail_on_third(db, rule, after_id, chunk_size):
+        calls.append(after_id)
+        if len(calls) == 3:
+            raise RuntimeError("worker restarted")
+        return await rescore_chunk(db, rule, after_id, chunk_size)
+
+    monkeypatch.setattr(scoring, "_rescore_chunk", fail_on_third)
+    with pytest.raises(RuntimeError):
+        await scoring.rescore(version=2, chunk_size=2)
+
+    async with AsyncSessionLocal() as db:
+        interrupted = (await db.execute(
+            select(models.RescoreRun).filter(models.RescoreRun.rule_version == 2)
+        )).scalars().one()
+    assert interrupted.status == "running"
+    assert interrupted.total == 6
+    assert interrupted.processed == 4 and interrupted.last_decision_id == ids[3] == calls[2]
+
+    # The next run picks up after the last committed chunk instead of starting over
+    calls.clear()
+    monkeypatch.setattr(scoring, "_rescore_chunk", lambda *args: calls.append(args[2]) or rescore_chunk(*args))
+    run = await scoring.rescore(version=2, chunk_size=2)
+    assert run.id == interrupted.id
+    assert calls[0] == interrupted.last_decision_id
+    assert calls[:2] == [ids[3], ids[5]]
+    assert run.status == "done"
+    assert run.processed == run.total == 6
+
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(models.Decision.confidence_score, models.Decision.decision_quality, models.Decision.scoring_version)
+            .filter(models.Decision.user_id == user_id)
+        )).all()
+    assert {version for _, _, version in rows} == {2}
+    assert all(quality == rule.score(confidence, 5)[0] for confidence, quality, _ in rows)
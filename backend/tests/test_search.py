@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import insert, inspect
+import migrations, models
+from database import AsyncSessionLocal, engine
+
+pytestmark = pytest.mark.anyio
+
+async def _search(client, headers, q, **params):
+    response = await client.get("/decisions/search", params=dict(params, q=q), headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+async def test_every_field_is_searchable(client, headers, create_decision):
+    decision = await create_decision(
+        title="Relocate to Zanzibar",
+        description="The quokka office is closing.",
+        expected_outcome="Better marimba lessons.",
+        options=[{"option_name": "Go", "reasoning": "The kestrel project needs me."}],
+        assumptions=[{"assumption_text": "Visa paperwork is quick as a pangolin."}],
+    )
+    await client.post(f"/decisions/{decision['id']}/review",
+                      json={"outcome_rating": 4, "lessons_learned": "Pack the ocarina."}, headers=headers)
+    for term in ("zanzibar", "quokka", "marimba", "kestrel", "pangolin", "ocarina"):
+        assert [hit["id"] for hit in await _search(client, headers, term)] == [decision["id"]], term
+
+async def test_ranked_and_highlighted(client, headers, create_decision):
+    in_body = await create_decision(title="Something else", description="A note about the trebuchet.")
+    in_title = await create_decision(title="Build a trebuchet")
+    hits = await _search(client, headers, "trebuchet")
+    assert [hit["id"] for hit in hits] == [in_title["id"], in_body["id"]]
+    assert hits[0]["rank"] > hits[1]["rank"]
+    assert "<mark>" in hits[1]["snippet"] and "trebuchet" in hits[1]["snippet"].lower()
+
+async def test_pages_and_ownership(client, headers, create_decision):
+    ids = {(await create_decision(title=f"Harpsichord purchase {n}"))["id"] for n in range(5)}
+    first = await _search(client, headers, "harpsichord", limit=3)
+    rest = await _search(client, headers, "harpsichord", limit=3, offset=3)
+    assert len(first) == 3 and len(rest) == 2
+    assert {hit["id"] for hit in first + rest} == ids
+
+    response = await client.post("/auth/register", json={"email": "search-other@example.com", "name": "Other",
+                                                         "password": "password123"})
+    other = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert await _search(client, other, "harpsichord") == []
+
+async def test_query_syntax_is_not_interpreted(client, headers, create_decision):
+    await create_decision(title="Learn the theremin")
+    for q in ('theremin OR "', "theremin*)", "NEAR(theremin"):
+        await _search(client, headers, q)
+
+async def test_edit_refreshes_the_document(client, headers, create_decision):
+    decision = await create_decision(title="Adopt a greyhound")
+    response = await client.put(f"/decisions/{decision['id']}", json={
+        "title": "Adopt a whippet", "category": decision["category"], "confidence_score": 50,
+    }, headers=headers)
+    assert response.status_code == 200
+    assert await _search(client, headers, "greyhound") == []
+    assert [hit["id"] for hit in await _search(client, headers, "whippet")] == [decision["id"]]
+
+async def test_existing_decisions_are_indexed_on_upgrade(client, headers, create_decision):
+    user_id = (await create_decision())["user_id"]
+    async with AsyncSessionLocal() as db:
+        # Written without a search document, like rows from before search existed
+        await db.execute(insert(models.Decision), [dict(user_id=user_id, title="Restore a gramophone",
+                                                        category="Personal", confidence_score=50)])
+        await db.commit()
+    assert await _search(client, headers, "gramophone") == []
+
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations._index_existing_decisions)
+        columns = await conn.run_sync(lambda sync: {c["name"] for c in inspect(sync).get_columns("decisions")})
+    assert len(await _search(client, headers, "gramophone")) == 1
+    # Only Postgres keeps the document on the decisions row
+    assert ("search_vector" in columns) == (engine.dialect.name == "postgresql")
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+import similarity
+
+pytestmark = pytest.mark.anyio
+
+async def _decision(create_decision, title, **overrides):
+    # Only the given text, not the shared default description and options
+    fields = dict(description=None, expected_outcome=None, options=[], assumptions=[])
+    return await create_decision(title=title, **dict(fields, **overrides))
+
+async def _similar(client, headers, decision_id, **params):
+    response = await client.get(f"/decisions/{decision_id}/similar", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_vectors_are_normalized_and_ignore_stopwords():
+    dims = 512
+    row = similarity.vectorize("Move to the coast and buy a sailboat", dims)
+    assert np.isclose(np.linalg.norm(row), 1.0)
+    assert np.array_equal(row, similarity.vectorize("move coast, buy sailboat!", dims))
+    assert not similarity.vectorize("the and of a", dims).any()
+
+def test_index_grows_and_finds_the_closest_row(tmp_path):
+    index = similarity.UserIndex(str(tmp_path), 256)
+    texts = {n: f"topic{n} detail{n} note{n}" for n in range(1, 101)}
+    similarity._write(index, texts, rebuild=True)
+    assert index.count == 100 and index.capacity == 128
+
+    hits = similarity._query(index, "topic42 detail42", 3, None)
+    assert hits[0][0] == 42
+    assert all(hit[0] != 42 for hit in similarity._query(index, "topic42 detail42", 3, 42))
+    # A second reader (another worker) sees the same rows
+    assert similarity._query(similarity.UserIndex(str(tmp_path), 256), "note7", 1, None)[0][0] == 7
+
+async def test_similar_to_a_decision(client, headers, create_decision):
+    target = await _decision(create_decision, "Buy a sailboat for weekend sailing")
+    close = await _decision(create_decision, "Sell the sailboat after one sailing season")
+    await _decision(create_decision, "Switch accountants for the tax return")
+    await client.post(f"/decisions/{close['id']}/review",
+                      json={"outcome_rating": 2, "lessons_learned": "Marinas are expensive."}, headers=headers)
+
+    hits = await _similar(client, headers, target["id"])
+    assert [hit["id"] for hit in hits] == [close["id"]]
+    assert hits[0]["lessons_learned"] == "Marinas are expensive." and hits[0]["outcome_rating"] == 2
+    assert 0 < hits[0]["score"] <= 1
+
+async def test_similar_to_a_draft(client, headers, create_decision):
+    kept = await _decision(create_decision, "Adopt a rescue greyhound",
+                           assumptions=[{"assumption_text": "The flat allows dogs"}])
+    await _decision(create_decision, "Repaint the kitchen")
+    response = await client.post("/decisions/similar", json={
+        "title": "Adopt a second dog", "assumptions": [{"assumption_text": "Greyhound gets along with dogs"}],
+    }, headers=headers)
+    assert response.status_code == 200, response.text
+    assert [hit["id"] for hit in response.json()] == [kept["id"]]
+    # Drafts are not stored
+    assert len((await client.get("/decisions/", headers=headers)).json()) == 2
+
+async def test_writes_keep_the_index_current(client, headers, create_decision):
+    target = await _decision(create_decision, "Learn the cello")
+    assert await _similar(client, headers, target["id"]) == []  # builds the index
+
+    added = await _decision(create_decision, "Buy a cello bow")
+    assert [hit["id"] for hit in await _similar(client, headers, target["id"])] == [added["id"]]
+
+    await client.put(f"/decisions/{added['id']}", json={
+        "title": "Buy a mountain bike", "category": added["category"], "confidence_score": 50,
+    }, headers=headers)
+    assert await _similar(client, headers, target["id"]) == []
+
+async def test_dropped_index_is_rebuilt_from_the_database(client, headers, create_decision):
+    target = await _decision(create_decision, "Plant an orchard of plum trees")
+    other = await _decision(create_decision, "Prune the plum trees")
+    before = await _similar(client, headers, target["id"])
+    await similarity.invalidate([target["user_id"]])
+    assert not similarity._user_index(target["user_id"]).exists()
+    assert await _similar(client, headers, target["id"]) == before
+    assert [hit["id"] for hit in before] == [other["id"]]
+
+async def test_other_users_decisions_are_not_visible(client, headers, create_decision):
+    mine = await _decision(create_decision, "Take up falconry")
+    response = await client.post("/auth/register", json={"email": "similar-other@example.com", "name": "Other",
+                                                         "password": "password123"})
+    other = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    response = await client.get(f"/decisions/{mine['id']}/similar", headers=other)
+    assert response.status_code == 404
+    response = await client.post("/decisions/similar", json={"title": "Take up falconry"}, headers=other)
+    assert response.json() == []
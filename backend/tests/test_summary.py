@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import event
+from database import engine
+
+pytestmark = pytest.mark.anyio
+
+async def _list(client, headers, **params):
+    return await client.get("/decisions/", params=params, headers=headers)
+
+async def test_summary_view_skips_relationships(client, headers, create_decision):
+    await create_decision()
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        response = await _list(client, headers, view="summary")
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    assert set(response.json()[0]) == {
+        "id", "title", "category", "confidence_score", "decision_date", "review_date",
+        "decision_quality", "outcome_quality",
+    }
+    assert not any(table in statement for statement in statements for table in ("options", "assumptions", "reviews"))
+
+async def test_fields_select_only_those_columns(client, headers, create_decision):
+    decision = await create_decision()
+    response = await _list(client, headers, fields="title, confidence_score")
+    assert response.json() == [{"title": decision["title"], "confidence_score": decision["confidence_score"]}]
+
+@pytest.mark.parametrize("fields", [",", " , ,", "title,,"])
+async def test_empty_field_entries_are_ignored(client, headers, create_decision, fields):
+    await create_decision()
+    response = await _list(client, headers, fields=fields)
+    assert response.status_code == 200, response.text
+    row = response.json()[0]
+    if fields.strip(" ,"):
+        assert list(row) == ["title"]
+    else:
+        # Nothing left: the full view, as if `fields` was not sent
+        assert "options" in row
+
+async def test_empty_fields_fall_back_to_the_summary_view(client, headers, create_decision):
+    await create_decision()
+    response = await _list(client, headers, view="summary", fields=",")
+    assert response.status_code == 200
+    assert "options" not in response.json()[0] and "title" in response.json()[0]
+
+async def test_unknown_fields_are_rejected(client, headers):
+    response = await _list(client, headers, fields="title,password_hash,")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: password_hash"
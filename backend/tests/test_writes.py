@@ -0,0 +1,88 @@
+import contextlib
+import pytest
+from sqlalchemy import event
+import similarity
+from database import engine
+
+pytestmark = pytest.mark.anyio
+
+@contextlib.contextmanager
+def statements():
+    # SQL sent to the database, whitespace-normalised
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(" ".join(statement.split()))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield seen
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+def _edit(decision, **changes):
+    # PUT replaces title, category and confidence_score: send them all
+    body = {name: decision[name] for name in ("title", "category", "confidence_score")}
+    body.update(changes)
+    return body
+
+async def test_edit_is_a_single_owned_update(client, headers, create_decision):
+    decision = await create_decision()
+    await client.put(f"/decisions/{decision['id']}", json=_edit(decision, title="Warm"), headers=headers)
+    with statements() as seen:
+        response = await client.put(f"/decisions/{decision['id']}", json=_edit(decision, title="Renamed"), headers=headers)
+    assert response.status_code == 200
+    assert response.json()["title"] == "Renamed"
+    touching = [s for s in seen if s.startswith(("SELECT", "UPDATE")) and "decisions" in s.split(" WHERE")[0]]
+    update = next(s for s in touching if s.startswith("UPDATE decisions"))
+    assert "user_id" in update.split(" WHERE", 1)[1]
+    if engine.dialect.name == "postgresql":
+        # The old values come back from the UPDATE itself
+        assert touching[0] is update
+    else:
+        # SQLite reads them first; nothing else before the write
+        assert touching.index(update) == 1
+
+async def test_edit_moving_totals_updates_the_overview(client, headers, create_decision):
+    decision = await create_decision(confidence_score=40)
+    await create_decision(confidence_score=60)
+    response = await client.put(f"/decisions/{decision['id']}", json=_edit(decision, category="Finance",
+                                                                            confidence_score=80), headers=headers)
+    assert response.status_code == 200
+    overview = (await client.get("/analytics/overview", headers=headers)).json()
+    assert overview["average_confidence"] == 70.0
+    series = (await client.get("/analytics/timeseries", params={"granularity": "month", "by_category": "true"},
+                               headers=headers)).json()
+    assert {row["category"] for row in series} == {"Career", "Finance"}
+
+async def test_edit_of_someone_elses_decision_is_not_found(client, headers, create_decision):
+    decision = await create_decision(title="Mine")
+    response = await client.post("/auth/register", json={"email": "writes-other@example.com", "name": "Other",
+                                                         "password": "password123"})
+    other = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    response = await client.put(f"/decisions/{decision['id']}", json=_edit(decision, title="Theirs now"), headers=other)
+    assert response.status_code == 404
+    assert (await client.get(f"/decisions/{decision['id']}", headers=headers)).json()["title"] == "Mine"
+    response = await client.put("/decisions/999999999", json=_edit(decision), headers=headers)
+    assert response.status_code == 404
+
+async def test_similarity_refresh_runs_after_the_response(client, headers, create_decision, monkeypatch):
+    calls = []
+
+    async def record(user_id, decision_ids):
+        calls.append((user_id, list(decision_ids)))
+
+    monkeypatch.setattr(similarity, "refresh_in_background", record)
+    decision = await create_decision()
+    await client.put(f"/decisions/{decision['id']}", json=_edit(decision, title="Retitled"), headers=headers)
+    await client.put(f"/decisions/{decision['id']}", json=_edit(decision, confidence_score=10), headers=headers)
+    # Create, then both edits
+    assert calls == [(decision["user_id"], [decision["id"]])] * 3
+
+async def test_new_decisions_reach_the_similarity_index(client, headers, create_decision):
+    first = await create_decision(title="Move to Lisbon for the remote role")
+    await create_decision(title="Buy a bicycle", description="Commute.")
+    assert (await client.get(f"/decisions/{first['id']}/similar", headers=headers)).status_code == 200
+    later = await create_decision(title="Move to Lisbon or Porto", description="Remote role relocation.")
+    hits = (await client.get(f"/decisions/{first['id']}/similar", headers=headers)).json()
+    assert hits[0]["id"] == later["id"]